@@ -0,0 +1,74 @@
+import random
+import sys
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Order, OrderLine
+from domain.services import WarehouseService
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM
+from infrastructure.repositories import LoadingStrategy
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import measure, print_table
+
+INSERT_CHUNK = 50_000
+
+def setup(warehouses: int, skus: int, warehouses_per_sku: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9}
+            for w in range(1, warehouses + 1)
+        ])
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"SKU {p}", "quantity": 0, "price": 1.0}
+            for p in range(1, skus + 1)
+        ])
+        batch = []
+        for p in range(1, skus + 1):
+            for w in rng.sample(range(1, warehouses + 1), warehouses_per_sku):
+                batch.append({"product_id": p, "warehouse_id": w, "quantity": rng.randint(1, 20), "reserved_quantity": 0})
+            if len(batch) >= INSERT_CHUNK:
+                connection.execute(insert(StockItemORM), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(StockItemORM), batch)
+    return sessionmaker(bind=engine)
+
+def main(argv):
+    warehouses = int(argv[0]) if len(argv) > 0 else 1_000
+    skus = int(argv[1]) if len(argv) > 1 else 100_000
+    warehouses_per_sku = int(argv[2]) if len(argv) > 2 else 3
+    lines_per_order = 10
+    session_factory = setup(warehouses, skus, warehouses_per_sku)
+    rng = random.Random(7)
+
+    results = []
+    with SqlAlchemyUnitOfWork(session_factory(), LoadingStrategy.RAW) as uow:
+        service = WarehouseService(uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements)
+
+        def allocate():
+            order = Order(id=None, lines=[
+                OrderLine(product=Product(id=rng.randint(1, skus), name="", quantity=0, price=0.0), quantity=1)
+                for _ in range(lines_per_order)
+            ])
+            try:
+                service.allocate_order(order)
+            except ValueError:
+                pass
+
+        started = time.perf_counter()
+        stats = measure(allocate, 1_000)
+        results.append({
+            "warehouses": warehouses,
+            "skus": skus,
+            "stock_items": skus * warehouses_per_sku,
+            "lines_per_order": lines_per_order,
+            **stats,
+            "orders_per_second": 1_000 / (time.perf_counter() - started),
+        })
+    print_table("Order allocation latency", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
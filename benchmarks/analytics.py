@@ -0,0 +1,115 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from domain.models import MovementType
+from infrastructure.analytics import (
+    load_movement_columns, load_stock_columns, product_totals, product_turnover, warehouse_totals
+)
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM, StockMovementORM
+from infrastructure.repositories import (
+    SqlAlchemyStockItemRepository, SqlAlchemyStockMovementRepository, LoadingStrategy
+)
+from .common import print_table
+
+WAREHOUSES = 100
+PRODUCTS = 10_000
+DAYS = 90
+INSERT_CHUNK = 100_000
+MOVEMENT_TYPES = [MovementType.RECEIPT, MovementType.SHIPMENT, MovementType.TRANSFER]
+
+def populate(engine, movements: int) -> datetime:
+    rng = random.Random(movements)
+    until = datetime(2026, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9}
+            for w in range(1, WAREHOUSES + 1)
+        ])
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": rng.uniform(1, 1000)}
+            for p in range(1, PRODUCTS + 1)
+        ])
+        connection.execute(insert(StockItemORM), [
+            {"product_id": p, "warehouse_id": w, "quantity": rng.randint(0, 500), "reserved_quantity": 0}
+            for p in range(1, PRODUCTS + 1)
+            for w in rng.sample(range(1, WAREHOUSES + 1), 5)
+        ])
+        for start in range(0, movements, INSERT_CHUNK):
+            batch = []
+            for _ in range(min(INSERT_CHUNK, movements - start)):
+                movement_type = rng.choice(MOVEMENT_TYPES)
+                batch.append({
+                    "product_id": rng.randint(1, PRODUCTS),
+                    "source_warehouse_id": None if movement_type is MovementType.RECEIPT else rng.randint(1, WAREHOUSES),
+                    "destination_warehouse_id": None if movement_type is MovementType.SHIPMENT else rng.randint(1, WAREHOUSES),
+                    "quantity": rng.randint(1, 20),
+                    "movement_type": movement_type,
+                    "timestamp": until - timedelta(seconds=rng.randint(0, DAYS * 86400)),
+                })
+            connection.execute(insert(StockMovementORM), batch)
+    return until
+
+def report_with_dataclasses(session: Session, since: datetime, until: datetime) -> dict:
+    by_warehouse = defaultdict(lambda: [0, 0, 0.0])
+    on_hand = defaultdict(int)
+    for stock_item in SqlAlchemyStockItemRepository(session, LoadingStrategy.RAW).iter_all():
+        totals = by_warehouse[stock_item.warehouse.id]
+        totals[0] += stock_item.quantity
+        totals[1] += stock_item.reserved_quantity
+        totals[2] += stock_item.quantity * stock_item.product.price
+        on_hand[stock_item.product.id] += stock_item.quantity
+
+    shipped = defaultdict(int)
+    for movement in SqlAlchemyStockMovementRepository(session, LoadingStrategy.RAW).iter_all():
+        if movement.movement_type is MovementType.SHIPMENT and since <= movement.timestamp < until:
+            shipped[movement.product.id] += movement.quantity
+
+    days = (until - since).days
+    days_of_cover = {
+        product_id: quantity / (shipped[product_id] / days) if shipped[product_id] else float("inf")
+        for product_id, quantity in on_hand.items()
+    }
+    return {"warehouses": len(by_warehouse), "products": len(days_of_cover)}
+
+def report_vectorized(session: Session, since: datetime, until: datetime) -> dict:
+    stock = load_stock_columns(session)
+    by_warehouse = warehouse_totals(stock)
+    product_totals(stock)
+    shipments = load_movement_columns(session, since, until, [MovementType.SHIPMENT])
+    turnover = product_turnover(stock, shipments, (until - since).days)
+    return {"warehouses": len(by_warehouse.keys), "products": len(turnover.product_id)}
+
+def run(movements: int) -> list:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'analytics.db')}")
+        Base.metadata.create_all(engine)
+        until = populate(engine, movements)
+        since = until - timedelta(days=30)
+
+        results = []
+        for path, report in (("dataclass loop", report_with_dataclasses), ("vectorized", report_vectorized)):
+            with Session(engine) as session:
+                started = time.perf_counter()
+                report(session, since, until)
+                elapsed = time.perf_counter() - started
+            results.append({"path": path, "movements": movements, "seconds": elapsed})
+        engine.dispose()
+    for result in results:
+        result["speedup"] = results[0]["seconds"] / result["seconds"]
+    return results
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [10_000_000]
+    results = []
+    for movements in sizes:
+        results.extend(run(movements))
+    print_table("Stock report over movements (per-warehouse totals, value, turnover, days of cover)", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Warehouse
+from domain.services import WarehouseService
+from infrastructure.async_unit_of_work import AsyncSqlAlchemyUnitOfWork
+from infrastructure.orm import Base, ProductORM, WarehouseORM, WarehouseOccupancyORM, StockItemORM
+from infrastructure.repositories import LoadingStrategy
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+
+PRODUCTS = 1_000
+
+def setup(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(WarehouseORM), [{"id": 1, "name": "Moscow", "location": "Moscow", "capacity": 10 ** 9}])
+        connection.execute(insert(WarehouseOccupancyORM), [{"warehouse_id": 1, "occupied": 0}])
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0} for p in range(1, PRODUCTS + 1)
+        ])
+        connection.execute(insert(StockItemORM), [
+            {"product_id": p, "warehouse_id": 1, "quantity": 10 ** 6, "reserved_quantity": 0}
+            for p in range(1, PRODUCTS + 1)
+        ])
+    engine.dispose()
+
+def requests(count: int):
+    rng = random.Random(count)
+    warehouse = Warehouse(id=1, name="Moscow", location="Moscow", capacity=0)
+    return [(Product(id=rng.randint(1, PRODUCTS), name="", quantity=0, price=0.0), warehouse) for _ in range(count)]
+
+def run_sync(path: str, count: int, concurrency: int) -> float:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 60}, pool_size=concurrency)
+    session_factory = sessionmaker(bind=engine)
+
+    def handle(request):
+        product, warehouse = request
+        with SqlAlchemyUnitOfWork(session_factory(), LoadingStrategy.RAW) as uow:
+            service = WarehouseService(uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements)
+            service.reserve_stock(product, warehouse, 1)
+            uow.stock_items.get_by_product_and_warehouse(product.id, warehouse.id)
+            uow.commit()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(handle, requests(count)))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed
+
+async def run_async(path: str, count: int, concurrency: int) -> float:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 60}, pool_size=concurrency)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def handle(request):
+        product, warehouse = request
+        async with limit:
+            async with AsyncSqlAlchemyUnitOfWork(session_factory(), LoadingStrategy.RAW) as uow:
+                service = uow.warehouse_service()
+                await service.reserve_stock(product, warehouse, 1)
+                await uow.stock_items.get_by_product_and_warehouse(product.id, warehouse.id)
+                await uow.commit()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handle(r) for r in requests(count)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed
+
+def main(argv):
+    count = int(argv[0]) if argv else 2_000
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in (8, 64):
+            path = os.path.join(directory, f"bench-{concurrency}.db")
+            setup(path)
+            sync_elapsed = run_sync(path, count, concurrency)
+            async_elapsed = asyncio.run(run_async(path, count, concurrency))
+            for mode, elapsed in (("sync + threads", sync_elapsed), ("asyncio", async_elapsed)):
+                results.append({
+                    "mode": mode,
+                    "concurrency": concurrency,
+                    "requests": count,
+                    "requests_per_second": count / elapsed,
+                })
+    print_table("Concurrent reserve_stock requests", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from infrastructure.cache import AvailabilityCache
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .backends import populate
+from .common import print_table
+from .generator import SCALES, generate
+
+DURATION = 3.0
+
+def summed_in_python(uow, product_id: int) -> int:
+    return sum(
+        si.quantity - si.reserved_quantity for si in uow.stock_items.list_available([product_id])
+    )
+
+def grouped_in_sql(uow, product_id: int) -> int:
+    return uow.stock_items.available_by_product([product_id])[product_id]
+
+# Every read opens its own unit of work, as a storefront request would.
+def run(name: str, session_factory, product_ids, read, cache=None) -> dict:
+    rng = random.Random(0)
+    samples = []
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        product_id = rng.choice(product_ids)
+        started = time.perf_counter()
+        with SqlAlchemyUnitOfWork(session_factory(), availability_cache=cache) as uow:
+            read(uow, product_id)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "path": name,
+        "reads": len(samples),
+        "reads_per_second": len(samples) / sum(samples),
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+    }
+
+def main(argv):
+    scale = argv[0] if argv else "medium"
+    dataset = generate(SCALES[scale])
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        populate(engine, dataset)
+        session_factory = sessionmaker(bind=engine)
+        product_ids = [p.id for p in dataset.products]
+        hot = product_ids[:1000]
+        results = [
+            run("list_available + sum", session_factory, product_ids, summed_in_python),
+            run("available_by_product", session_factory, product_ids, grouped_in_sql),
+            run("cached, 1s ttl, 1k hot products", session_factory, hot, grouped_in_sql, AvailabilityCache(ttl=1.0)),
+        ]
+        engine.dispose()
+    print_table(f"Availability reads per product ({scale})", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,183 @@
+import copy
+import importlib.util
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from domain.services import WarehouseService
+from infrastructure.orm import (
+    Base, ProductORM, WarehouseORM, WarehouseOccupancyORM, StockItemORM, StockMovementORM,
+    OrderORM, OrderLineORM, order_product_associations
+)
+from infrastructure.memory import MemoryStore, MemoryUnitOfWork
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .generator import Dataset
+
+INSERT_CHUNK = 50_000
+TEST_SERVICES = os.path.join(os.path.dirname(__file__), "..", "tests", "test_domain", "test_services.py")
+
+@dataclass
+class Context:
+    dataset: Dataset
+    products: object
+    orders: object
+    warehouses: object
+    stock_items: object
+    stock_movements: object
+    service: WarehouseService
+
+def _context(dataset: Dataset, repositories) -> Context:
+    return Context(
+        dataset=dataset,
+        products=repositories.products,
+        orders=repositories.orders,
+        warehouses=repositories.warehouses,
+        stock_items=repositories.stock_items,
+        stock_movements=repositories.stock_movements,
+        service=WarehouseService(
+            product_repo=repositories.products,
+            order_repo=repositories.orders,
+            warehouse_repo=repositories.warehouses,
+            stock_item_repo=repositories.stock_items,
+            stock_movement_repo=repositories.stock_movements
+        )
+    )
+
+def _chunks(rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        yield rows[start:start + INSERT_CHUNK]
+
+def populate(engine, dataset: Dataset) -> None:
+    occupancy = dataset.occupancy()
+    tables = [
+        (ProductORM, [
+            {"id": p.id, "name": p.name, "quantity": p.quantity, "price": p.price} for p in dataset.products
+        ]),
+        (WarehouseORM, [
+            {"id": w.id, "name": w.name, "location": w.location, "capacity": w.capacity} for w in dataset.warehouses
+        ]),
+        (WarehouseOccupancyORM, [
+            {"warehouse_id": warehouse_id, "occupied": occupied} for warehouse_id, occupied in occupancy.items()
+        ]),
+        (StockItemORM, [
+            {"id": si.id, "product_id": si.product.id, "warehouse_id": si.warehouse.id,
+             "quantity": si.quantity, "reserved_quantity": si.reserved_quantity}
+            for si in dataset.stock_items
+        ]),
+        (StockMovementORM, [
+            {"id": m.id, "product_id": m.product.id,
+             "source_warehouse_id": m.source_warehouse and m.source_warehouse.id,
+             "destination_warehouse_id": m.destination_warehouse and m.destination_warehouse.id,
+             "quantity": m.quantity, "movement_type": m.movement_type, "timestamp": m.timestamp}
+            for m in dataset.movements
+        ]),
+        (OrderORM, [{"id": o.id} for o in dataset.orders]),
+        (order_product_associations, [
+            {"order_id": o.id, "product_id": p.id} for o in dataset.orders for p in o.products
+        ]),
+        (OrderLineORM, [
+            {"order_id": o.id, "product_id": line.product.id, "quantity": line.quantity}
+            for o in dataset.orders for line in o.lines
+        ]),
+    ]
+    with engine.begin() as connection:
+        for table, rows in tables:
+            for chunk in _chunks(rows):
+                connection.execute(insert(table), chunk)
+
+class SqliteBackend:
+    def __init__(self, name: str, path: str = None):
+        self.name = name
+        self.path = path
+
+    @contextmanager
+    def prepare(self, dataset: Dataset):
+        with tempfile.TemporaryDirectory() as directory:
+            url = "sqlite://" if self.path is None else f"sqlite:///{os.path.join(directory, self.path)}"
+            engine = create_engine(url)
+            Base.metadata.create_all(engine)
+            populate(engine, dataset)
+            self.session_factory = sessionmaker(bind=engine)
+            self.dataset = dataset
+            try:
+                yield self
+            finally:
+                engine.dispose()
+
+    # Each scenario runs in its own unit of work that is never committed, so
+    # scenarios see the generated data and not each other's changes.
+    @contextmanager
+    def open(self):
+        with SqlAlchemyUnitOfWork(self.session_factory()) as uow:
+            yield _context(self.dataset, uow)
+
+class MockBackend:
+    name = "mock"
+
+    @contextmanager
+    def prepare(self, dataset: Dataset):
+        spec = importlib.util.spec_from_file_location("benchmark_mocks", TEST_SERVICES)
+        self.mocks = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.mocks)
+        self.dataset = dataset
+        yield self
+
+    @contextmanager
+    def open(self):
+        dataset = copy.deepcopy(self.dataset)
+        repositories = _MockRepositories(self.mocks, dataset)
+        yield _context(dataset, repositories)
+
+class MemoryBackend:
+    name = "memory"
+
+    @contextmanager
+    def prepare(self, dataset: Dataset):
+        self.dataset = dataset
+        self.store = MemoryStore()
+        copied = copy.deepcopy(dataset)
+        for product in copied.products:
+            self.store.insert("products", product)
+        for order in copied.orders:
+            self.store.insert("orders", order)
+        for warehouse in copied.warehouses:
+            self.store.insert_warehouse(warehouse)
+        self.store.occupancy.update(copied.occupancy())
+        for stock_item in copied.stock_items:
+            self.store.insert_stock_item(stock_item)
+        for movement in copied.movements:
+            self.store.insert_movement(movement)
+        yield self
+
+    # Scenarios share one store and are rolled back through its undo log.
+    @contextmanager
+    def open(self):
+        with MemoryUnitOfWork(self.store) as uow:
+            yield _context(self.dataset, uow)
+
+class _MockRepositories:
+    def __init__(self, mocks, dataset: Dataset):
+        self.products = mocks.MockProductRepository()
+        self.orders = mocks.MockOrderRepository()
+        self.warehouses = mocks.MockWarehouseRepository()
+        self.stock_items = mocks.MockStockItemRepository()
+        self.stock_movements = mocks.MockStockMovementRepository()
+        for repository, items in (
+            (self.products, dataset.products),
+            (self.orders, dataset.orders),
+            (self.warehouses, dataset.warehouses),
+            (self.stock_items, dataset.stock_items),
+            (self.stock_movements, dataset.movements),
+        ):
+            for item in items:
+                repository.add(item)
+        self.warehouses.occupancy.update(dataset.occupancy())
+
+BACKENDS = {
+    "sqlite-memory": lambda: SqliteBackend("sqlite-memory"),
+    "sqlite-file": lambda: SqliteBackend("sqlite-file", "bench.db"),
+    "mock": MockBackend,
+    "memory": MemoryBackend,
+}
@@ -0,0 +1,115 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+from domain.exceptions import ConcurrencyConflict
+from domain.models import Product, Warehouse
+from domain.retry import retry_on_conflict
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM
+from infrastructure.repositories import LoadingStrategy
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+
+STOCK = 2_000
+
+# SQLite ignores FOR UPDATE, so the pessimistic path takes the database write
+# lock up front with BEGIN IMMEDIATE, which is the closest SQLite equivalent.
+def _begin_immediate(engine):
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def setup(path: str, pessimistic: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    if pessimistic:
+        _begin_immediate(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM), [{"id": 1, "name": "Laptop", "quantity": 0, "price": 1.0}])
+        connection.execute(insert(WarehouseORM), [{"id": 1, "name": "Moscow", "location": "Moscow", "capacity": 10 ** 9}])
+        connection.execute(insert(StockItemORM), [{"product_id": 1, "warehouse_id": 1, "quantity": STOCK, "reserved_quantity": 0}])
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+def reserve_optimistically(uow, product, warehouse) -> bool:
+    stock_item = uow.session.get(StockItemORM, 1)
+    uow.session.commit()
+    if stock_item.quantity - stock_item.reserved_quantity < 1:
+        return False
+    stock_item.reserved_quantity += 1
+    return True
+
+def reserve_for_update(uow, product, warehouse) -> bool:
+    stock_item = uow.session.scalars(
+        select(StockItemORM).where(StockItemORM.id == 1).with_for_update()
+    ).one()
+    if stock_item.quantity - stock_item.reserved_quantity < 1:
+        return False
+    stock_item.reserved_quantity += 1
+    return True
+
+def reserve_atomically(uow, product, warehouse) -> bool:
+    return uow.stock_items.reserve(product, warehouse, 1) is not None
+
+def run(name: str, reserve, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = setup(os.path.join(directory, "bench.db"), reserve is reserve_for_update)
+        product = Product(id=1, name="Laptop", quantity=0, price=1.0)
+        warehouse = Warehouse(id=1, name="Moscow", location="Moscow", capacity=0)
+        confirmed = []
+        conflicts = []
+
+        @retry_on_conflict(attempts=1_000, base_delay=0.001, max_delay=0.05)
+        def reserve_once() -> bool:
+            with SqlAlchemyUnitOfWork(session_factory(), LoadingStrategy.RAW) as uow:
+                reserved = reserve(uow, product, warehouse)
+                try:
+                    uow.commit()
+                except ConcurrencyConflict:
+                    conflicts.append(1)
+                    raise
+                return reserved
+
+        def worker():
+            while reserve_once():
+                confirmed.append(1)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with session_factory() as session:
+            reserved_in_db = session.get(StockItemORM, 1).reserved_quantity
+    return {
+        "path": name,
+        "threads": threads,
+        "confirmed": len(confirmed),
+        "reserved_in_db": reserved_in_db,
+        "conflicts": len(conflicts),
+        "reservations_per_second": len(confirmed) / elapsed,
+    }
+
+def main(argv):
+    threads = [int(a) for a in argv] or [1, 8]
+    print_table("Single-unit reservations on one contended stock item", [
+        run(name, reserve, count)
+        for count in threads
+        for name, reserve in (
+            ("optimistic retry", reserve_optimistically),
+            ("select for update", reserve_for_update),
+            ("atomic update", reserve_atomically),
+        )
+    ])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
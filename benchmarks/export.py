@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from infrastructure.export import WRITERS, export_movements
+from infrastructure.orm import Base
+from infrastructure.repositories import SqlAlchemyStockMovementRepository, LoadingStrategy
+from .analytics import populate
+from .common import print_table
+
+SUFFIXES = {"csv": ".csv", "jsonl": ".jsonl", "arrow": ".arrow"}
+
+def measure(path: str, rows: int, export) -> dict:
+    started = time.perf_counter()
+    export()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"path": path, "rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed, "peak_mb": peak / 2 ** 20}
+
+def main(argv):
+    movements = int(argv[0]) if argv else 2_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        populate(engine, movements)
+        results = []
+        with Session(engine) as session:
+            repository = SqlAlchemyStockMovementRepository(session, LoadingStrategy.RAW)
+            results.append(measure("repository.list", movements, repository.list))
+            session.expunge_all()
+            for format in WRITERS:
+                path = os.path.join(directory, f"movements{SUFFIXES[format]}")
+                results.append(measure(f"export {format}", movements, lambda: export_movements(session, path)))
+        engine.dispose()
+    print_table(f"Exporting {movements:,} movements from file SQLite", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+from domain.models import Product, Warehouse, StockItem, StockMovement, MovementType, Order, OrderLine
+
+EPOCH = datetime(2026, 1, 1)
+MOVEMENT_TYPES = [MovementType.RECEIPT, MovementType.SHIPMENT, MovementType.TRANSFER]
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    products: int
+    warehouses: int
+    stock_items_per_product: int
+    movements: int
+    orders: int
+    lines_per_order: int = 3
+    seed: int = 0
+
+SCALES = {
+    "tiny": DatasetSpec(products=20, warehouses=3, stock_items_per_product=2, movements=50, orders=10),
+    "small": DatasetSpec(products=1_000, warehouses=10, stock_items_per_product=3, movements=10_000, orders=1_000),
+    "medium": DatasetSpec(products=10_000, warehouses=50, stock_items_per_product=5, movements=200_000, orders=20_000),
+    "large": DatasetSpec(products=100_000, warehouses=200, stock_items_per_product=5, movements=2_000_000, orders=200_000),
+}
+
+@dataclass
+class Dataset:
+    spec: DatasetSpec
+    products: List[Product] = field(default_factory=list)
+    warehouses: List[Warehouse] = field(default_factory=list)
+    stock_items: List[StockItem] = field(default_factory=list)
+    movements: List[StockMovement] = field(default_factory=list)
+    orders: List[Order] = field(default_factory=list)
+
+    def occupancy(self) -> Dict[int, int]:
+        occupied = {w.id: 0 for w in self.warehouses}
+        for stock_item in self.stock_items:
+            occupied[stock_item.warehouse.id] += stock_item.quantity
+        return occupied
+
+# Every entity gets its id up front, so the same spec and seed produce the
+# same rows in every backend and on every run.
+def generate(spec: DatasetSpec) -> Dataset:
+    rng = random.Random(spec.seed)
+    dataset = Dataset(spec)
+    dataset.products = [
+        Product(id=p, name=f"Product {p}", quantity=0, price=round(rng.uniform(1, 1000), 2))
+        for p in range(1, spec.products + 1)
+    ]
+    dataset.warehouses = [
+        Warehouse(id=w, name=f"Warehouse {w}", location=f"City {w % 20}", capacity=10 ** 12)
+        for w in range(1, spec.warehouses + 1)
+    ]
+    per_product = min(spec.stock_items_per_product, spec.warehouses)
+    for product in dataset.products:
+        for warehouse in rng.sample(dataset.warehouses, per_product):
+            dataset.stock_items.append(StockItem(
+                id=len(dataset.stock_items) + 1, product=product, warehouse=warehouse,
+                quantity=rng.randint(1_000, 10_000), reserved_quantity=0
+            ))
+    for m in range(1, spec.movements + 1):
+        movement_type = rng.choice(MOVEMENT_TYPES)
+        dataset.movements.append(StockMovement(
+            id=m,
+            product=rng.choice(dataset.products),
+            source_warehouse=None if movement_type is MovementType.RECEIPT else rng.choice(dataset.warehouses),
+            destination_warehouse=None if movement_type is MovementType.SHIPMENT else rng.choice(dataset.warehouses),
+            quantity=rng.randint(1, 20),
+            movement_type=movement_type,
+            timestamp=EPOCH + timedelta(seconds=m)
+        ))
+    for o in range(1, spec.orders + 1):
+        lines = [
+            OrderLine(product=product, quantity=rng.randint(1, 5))
+            for product in rng.sample(dataset.products, min(spec.lines_per_order, spec.products))
+        ]
+        dataset.orders.append(Order(id=o, products=[line.product for line in lines], lines=lines))
+    return dataset
@@ -0,0 +1,67 @@
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from domain.services import WarehouseService
+from infrastructure.database import create_schema
+from infrastructure.importer import IMPORT_CHUNK_SIZE, import_file
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+
+SERVICE_ROWS = 20_000
+
+def write_catalog(path: str, rows: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow(["name", "quantity", "price"])
+        for i in range(1, rows + 1):
+            price = "free" if i % 1000 == 0 else f"{rng.uniform(1, 5000):.2f}"
+            writer.writerow([f"Product {i}", rng.randint(0, 1000), price])
+
+def run_service(path: str, rows: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    create_schema(engine)
+    started = time.perf_counter()
+    with SqlAlchemyUnitOfWork(sessionmaker(bind=engine)()) as uow:
+        service = WarehouseService(uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements)
+        for i in range(rows):
+            service.create_product(name=f"Product {i}", quantity=1, price=1.0)
+        uow.commit()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return {"path": "create_product", "workers": 1, "rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed}
+
+def run_import(path: str, catalog: str, rows: int, workers: int, chunk_size: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    create_schema(engine)
+    started = time.perf_counter()
+    result = import_file(engine, "products", catalog, chunk_size=chunk_size, workers=workers)
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    assert result.rows == rows
+    return {"path": "importer", "workers": workers, "rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bulk catalog importer")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", default=f"1,{os.cpu_count()}")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = os.path.join(directory, "catalog.csv")
+        write_catalog(catalog, args.rows)
+        results = [run_service(os.path.join(directory, "service.db"), min(args.rows, SERVICE_ROWS))]
+        for workers in (int(w) for w in args.workers.split(",")):
+            database = os.path.join(directory, f"import-{workers}.db")
+            results.append(run_import(database, catalog, args.rows, workers, args.chunk_size))
+            os.remove(database)
+    print_table(f"Importing a {args.rows:,} row catalog into file SQLite", results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+import sys
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM
+from infrastructure.repositories import SqlAlchemyStockItemRepository, LoadingStrategy
+from .common import measure, print_table
+
+WAREHOUSES = 100
+LOOKUPS = 2_000
+INSERT_CHUNK = 50_000
+
+def populate(engine, rows: int) -> int:
+    products = max(1, rows // WAREHOUSES)
+    with engine.begin() as connection:
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9}
+            for w in range(1, WAREHOUSES + 1)
+        ])
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0}
+            for p in range(1, products + 1)
+        ])
+        batch = []
+        for p in range(1, products + 1):
+            for w in range(1, WAREHOUSES + 1):
+                batch.append({"product_id": p, "warehouse_id": w, "quantity": 10, "reserved_quantity": 0})
+                if len(batch) == INSERT_CHUNK:
+                    connection.execute(insert(StockItemORM), batch)
+                    batch = []
+        if batch:
+            connection.execute(insert(StockItemORM), batch)
+    return products
+
+def run(rows: int, indexed: bool) -> dict:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    if not indexed:
+        for index in StockItemORM.__table__.indexes:
+            index.drop(engine)
+    products = populate(engine, rows)
+    rng = random.Random(rows)
+    with Session(engine) as session:
+        repo = SqlAlchemyStockItemRepository(session, LoadingStrategy.RAW)
+        stats = measure(
+            lambda: repo.get_by_product_and_warehouse(
+                rng.randint(1, products), rng.randint(1, WAREHOUSES)
+            ),
+            LOOKUPS if indexed else max(10, LOOKUPS // max(1, rows // 1000)),
+        )
+    return {"rows": rows, "indexed": indexed, **stats}
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [1_000, 10_000, 100_000, 1_000_000]
+    results = []
+    for rows in sizes:
+        results.append(run(rows, indexed=True))
+        if rows <= 100_000:
+            results.append(run(rows, indexed=False))
+    print_table("get_by_product_and_warehouse latency", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
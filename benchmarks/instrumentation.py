@@ -0,0 +1,39 @@
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from domain.services import WarehouseService
+from infrastructure.instrumentation import Instrumentation
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import measure, print_table
+
+def run(iterations: int, instrumented: bool) -> list:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    instrumentation = Instrumentation(exporter=lambda stats: None) if instrumented else None
+    if instrumented:
+        instrumentation.attach(engine)
+    with SqlAlchemyUnitOfWork(sessionmaker(bind=engine)(), instrumentation=instrumentation) as uow:
+        service = WarehouseService(uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements)
+        if instrumented:
+            service = instrumentation.wrap(service, "service")
+        product = service.create_product(name="Laptop", quantity=0, price=1.0)
+        warehouse = service.create_warehouse(name="Moscow", location="Moscow", capacity=10 ** 9)
+        service.add_stock_to_warehouse(product, warehouse, 10 ** 8)
+        operations = {
+            "warehouses.get_occupancy": lambda: uow.warehouses.get_occupancy(warehouse.id),
+            "service.reserve_stock": lambda: service.reserve_stock(product, warehouse, 1),
+        }
+        results = [
+            {"operation": name, "instrumented": instrumented, **measure(operation, iterations)}
+            for name, operation in operations.items()
+        ]
+    engine.dispose()
+    return results
+
+def main(argv):
+    iterations = int(argv[0]) if argv else 20_000
+    print_table("Instrumentation overhead", run(iterations, False) + run(iterations, True))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,77 @@
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from domain.models import MovementType
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM, StockMovementORM
+from infrastructure.repositories import (
+    SqlAlchemyStockItemRepository, SqlAlchemyStockMovementRepository, LoadingStrategy
+)
+from .common import print_table
+
+WAREHOUSES = 100
+INSERT_CHUNK = 50_000
+
+def populate(engine, rows: int) -> None:
+    products = -(-rows // WAREHOUSES)
+    with engine.begin() as connection:
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9}
+            for w in range(1, WAREHOUSES + 1)
+        ])
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0}
+            for p in range(1, products + 1)
+        ])
+        for start in range(0, rows, INSERT_CHUNK):
+            ids = range(start, min(rows, start + INSERT_CHUNK))
+            connection.execute(insert(StockItemORM), [
+                {"product_id": i // WAREHOUSES + 1, "warehouse_id": i % WAREHOUSES + 1,
+                 "quantity": 10, "reserved_quantity": 0}
+                for i in ids
+            ])
+            connection.execute(insert(StockMovementORM), [
+                {"product_id": i % products + 1, "source_warehouse_id": i % WAREHOUSES + 1,
+                 "destination_warehouse_id": (i + 1) % WAREHOUSES + 1, "quantity": 1,
+                 "movement_type": MovementType.TRANSFER, "timestamp": datetime(2026, 1, 1)}
+                for i in ids
+            ])
+
+def measure_list(engine, repository_class, strategy: LoadingStrategy, rows: int) -> dict:
+    with Session(engine) as session:
+        started = time.perf_counter()
+        assert len(repository_class(session, strategy).list()) == rows
+        elapsed = time.perf_counter() - started
+
+    with Session(engine) as session:
+        repository = repository_class(session, strategy)
+        gc.collect()
+        tracemalloc.start()
+        result = repository.list()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+    return {
+        "repository": repository_class.__name__.replace("SqlAlchemy", "").replace("Repository", ""),
+        "strategy": strategy.value,
+        "rows": rows,
+        "bytes_per_row": retained / rows,
+        "us_per_row": elapsed / rows * 1e6,
+    }
+
+def main(argv):
+    rows = int(argv[0]) if argv else 200_000
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    populate(engine, rows)
+    print_table("Memory retained and construction time for list()", [
+        measure_list(engine, repository_class, strategy, rows)
+        for repository_class in (SqlAlchemyStockItemRepository, SqlAlchemyStockMovementRepository)
+        for strategy in LoadingStrategy
+    ])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
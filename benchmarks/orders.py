@@ -0,0 +1,63 @@
+import sys
+import time
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Order
+from infrastructure.orm import Base, ProductORM
+from infrastructure.repositories import SqlAlchemyOrderRepository
+from .common import print_table
+
+PRODUCTS = 1_000
+
+def setup():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0}
+            for p in range(1, PRODUCTS + 1)
+        ])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+    return sessionmaker(bind=engine), statements
+
+def make_orders(count: int, products_per_order: int):
+    return [
+        Order(id=None, products=[
+            Product(id=(o * products_per_order + i) % PRODUCTS + 1, name="", quantity=0, price=0.0)
+            for i in range(products_per_order)
+        ])
+        for o in range(count)
+    ]
+
+def run(orders_count: int, products_per_order: int, mode: str) -> dict:
+    session_factory, statements = setup()
+    orders = make_orders(orders_count, products_per_order)
+    started = time.perf_counter()
+    with session_factory() as session:
+        repo = SqlAlchemyOrderRepository(session)
+        if mode == "add_many":
+            repo.add_many(orders)
+        else:
+            for order in orders:
+                repo.add(order)
+        session.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        "products_per_order": products_per_order,
+        "mode": mode,
+        "orders": orders_count,
+        "statements": len(statements),
+        "orders_per_second": orders_count / elapsed,
+    }
+
+def main(argv):
+    orders_count = int(argv[0]) if argv else 1_000
+    results = []
+    for products_per_order in (1, 10, 100):
+        results.append(run(orders_count, products_per_order, "add"))
+        results.append(run(orders_count, products_per_order, "add_many"))
+    print_table("Order creation", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+import random
+import sys
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Warehouse, ReceiptLine
+from domain.services import WarehouseService
+from infrastructure.orm import Base, ProductORM, WarehouseORM, WarehouseOccupancyORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+
+PRODUCTS = 20_000
+WAREHOUSES = 20
+
+def setup():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0}
+            for p in range(1, PRODUCTS + 1)
+        ])
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9}
+            for w in range(1, WAREHOUSES + 1)
+        ])
+        connection.execute(insert(WarehouseOccupancyORM), [
+            {"warehouse_id": w, "occupied": 0} for w in range(1, WAREHOUSES + 1)
+        ])
+    return sessionmaker(bind=engine)
+
+def receipt_lines(count: int, seed: int):
+    rng = random.Random(seed)
+    warehouses = [Warehouse(id=w, name="", location="", capacity=0) for w in range(1, WAREHOUSES + 1)]
+    return [
+        ReceiptLine(
+            product=Product(id=rng.randint(1, PRODUCTS), name="", quantity=0, price=0.0),
+            warehouse=rng.choice(warehouses),
+            quantity=rng.randint(1, 50)
+        )
+        for _ in range(count)
+    ]
+
+def service_for(uow: SqlAlchemyUnitOfWork) -> WarehouseService:
+    return WarehouseService(uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements)
+
+def run(lines_count: int, batched: bool) -> dict:
+    session_factory = setup()
+    # Pre-load half of the keys so the receipt mixes increments and inserts.
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service_for(uow).receive_stock_batch(receipt_lines(lines_count // 2, seed=1))
+        uow.commit()
+
+    lines = receipt_lines(lines_count, seed=2)
+    started = time.perf_counter()
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = service_for(uow)
+        if batched:
+            service.receive_stock_batch(lines)
+        else:
+            for line in lines:
+                service.add_stock_to_warehouse(line.product, line.warehouse, line.quantity)
+        uow.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        "lines": lines_count,
+        "mode": "receive_stock_batch" if batched else "add_stock_to_warehouse loop",
+        "seconds": elapsed,
+        "lines_per_second": lines_count / elapsed,
+    }
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [5_000, 50_000]
+    results = []
+    for lines_count in sizes:
+        results.append(run(lines_count, batched=False))
+        results.append(run(lines_count, batched=True))
+    print_table("Stock receipt throughput", results)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Warehouse
+from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM
+from infrastructure.repositories import SqlAlchemyStockItemRepository, LoadingStrategy
+from .common import print_table
+
+STOCK = 2_000
+
+def setup(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM), [{"id": 1, "name": "Laptop", "quantity": 0, "price": 1.0}])
+        connection.execute(insert(WarehouseORM), [{"id": 1, "name": "Moscow", "location": "Moscow", "capacity": 10 ** 9}])
+        connection.execute(insert(StockItemORM), [{"product_id": 1, "warehouse_id": 1, "quantity": STOCK, "reserved_quantity": 0}])
+    return sessionmaker(bind=engine)
+
+def reserve_atomically(session, product, warehouse) -> bool:
+    repo = SqlAlchemyStockItemRepository(session, LoadingStrategy.RAW)
+    return repo.reserve(product, warehouse, 1) is not None
+
+def reserve_load_then_mutate(session, product, warehouse) -> bool:
+    repo = SqlAlchemyStockItemRepository(session, LoadingStrategy.RAW)
+    stock_item = repo.get_by_product_and_warehouse(product.id, warehouse.id)
+    try:
+        stock_item.reserve(1)
+    except ValueError:
+        return False
+    session.execute(
+        update(StockItemORM)
+        .where(StockItemORM.id == stock_item.id)
+        .values(reserved_quantity=stock_item.reserved_quantity)
+    )
+    return True
+
+def run(name: str, reserve, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        session_factory = setup(os.path.join(directory, "bench.db"))
+        product = Product(id=1, name="Laptop", quantity=0, price=1.0)
+        warehouse = Warehouse(id=1, name="Moscow", location="Moscow", capacity=0)
+        confirmed = []
+        errors = []
+
+        def worker():
+            while len(confirmed) < STOCK * 1.5:
+                with session_factory() as session:
+                    try:
+                        reserved = reserve(session, product, warehouse)
+                        session.commit()
+                    except OperationalError:
+                        errors.append(1)
+                        continue
+                if not reserved:
+                    return
+                confirmed.append(1)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with session_factory() as session:
+            reserved_in_db = session.get(StockItemORM, 1).reserved_quantity
+    return {
+        "path": name,
+        "threads": threads,
+        "confirmed": len(confirmed),
+        "reserved_in_db": reserved_in_db,
+        "oversold": len(confirmed) - reserved_in_db,
+        "errors": len(errors),
+        "reservations_per_second": len(confirmed) / elapsed,
+    }
+
+def main(argv):
+    threads = int(argv[0]) if argv else 8
+    print_table("Concurrent single-unit reservations", [
+        run("load-then-mutate", reserve_load_then_mutate, threads),
+        run("atomic update", reserve_atomically, threads),
+    ])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import subprocess
+import sys
+from datetime import datetime, timezone
+from dataclasses import asdict, replace
+import sqlalchemy
+from .backends import BACKENDS
+from .common import measure, print_table
+from .generator import SCALES, generate
+from .scenarios import SCENARIOS
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(scale: str, seed: int, backends, patterns, iterations: int) -> dict:
+    spec = replace(SCALES[scale], seed=seed)
+    dataset = generate(spec)
+    names = [name for name in SCENARIOS if any(fnmatch.fnmatch(name, p) for p in patterns)]
+    results = []
+    for backend_name in backends:
+        with BACKENDS[backend_name]().prepare(dataset) as backend:
+            for name in names:
+                rng = random.Random(f"{seed}:{name}")
+                with backend.open() as context:
+                    operation = SCENARIOS[name](context, rng)
+                    operation()
+                    results.append({"backend": backend_name, "scenario": name, **measure(operation, iterations)})
+    return {
+        "metadata": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "scale": scale,
+            "spec": asdict(spec),
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    before = {(r["backend"], r["scenario"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        previous = before.get((result["backend"], result["scenario"]))
+        if previous is None:
+            continue
+        ratio = result["p50_us"] / previous["p50_us"]
+        rows.append({
+            "backend": result["backend"],
+            "scenario": result["scenario"],
+            "baseline_p50_us": previous["p50_us"],
+            "p50_us": result["p50_us"],
+            "ratio": ratio,
+            "status": "regressed" if ratio > 1 + threshold else "improved" if ratio < 1 - threshold else "",
+        })
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the warehouse benchmark suite")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--scenarios", default="*", help="comma separated glob patterns")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.scale, args.seed, args.backends.split(","), args.scenarios.split(","), args.iterations
+    )
+    print_table(f"Benchmarks at {report['metadata']['commit']} ({args.scale})", report["results"])
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            rows = compare(json.load(baseline), report, args.threshold)
+        print_table(f"Compared with {args.compare}", rows)
+        return 1 if any(r["status"] == "regressed" for r in rows) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import random
+from itertools import islice
+from typing import Callable, Dict
+from domain.models import OrderLine, ReceiptLine
+from .backends import Context
+
+SCENARIOS: Dict[str, Callable[[Context, random.Random], Callable[[], object]]] = {}
+
+# A scenario prepares its inputs from the generated data and returns the
+# operation that is timed. Operations are repeatable: each call moves at most
+# a unit or two of stock, far below the generated quantities.
+def scenario(name: str):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+def _consume(iterator, limit: int = 100):
+    for _ in islice(iterator, limit):
+        pass
+
+def _stock_item(context: Context, rng: random.Random):
+    return rng.choice(context.dataset.stock_items)
+
+def _transfer_pair(context: Context, rng: random.Random):
+    stock_item = _stock_item(context, rng)
+    destination = next(w for w in context.dataset.warehouses if w.id != stock_item.warehouse.id)
+    return stock_item.product, stock_item.warehouse, destination
+
+@scenario("service.create_product")
+def create_product(context, rng):
+    return lambda: context.service.create_product(name="Benchmark", quantity=0, price=1.0)
+
+@scenario("service.create_order")
+def create_order(context, rng):
+    products = rng.sample(context.dataset.products, 3)
+    return lambda: context.service.create_order(lines=[OrderLine(product=p, quantity=1) for p in products])
+
+@scenario("service.create_orders")
+def create_orders(context, rng):
+    orders = [rng.sample(context.dataset.products, 3) for _ in range(10)]
+    return lambda: context.service.create_orders(orders)
+
+@scenario("service.create_warehouse")
+def create_warehouse(context, rng):
+    return lambda: context.service.create_warehouse(name="Benchmark", location="Moscow", capacity=1_000)
+
+@scenario("service.add_stock_to_warehouse")
+def add_stock_to_warehouse(context, rng):
+    stock_item = _stock_item(context, rng)
+    return lambda: context.service.add_stock_to_warehouse(stock_item.product, stock_item.warehouse, 1)
+
+@scenario("service.receive_stock_batch")
+def receive_stock_batch(context, rng):
+    lines = [
+        ReceiptLine(product=si.product, warehouse=si.warehouse, quantity=1)
+        for si in rng.sample(context.dataset.stock_items, 10)
+    ]
+    return lambda: context.service.receive_stock_batch(lines)
+
+@scenario("service.transfer_stock")
+def transfer_stock(context, rng):
+    product, source, destination = _transfer_pair(context, rng)
+    return lambda: context.service.transfer_stock(product, source, destination, 1)
+
+@scenario("service.ship_stock")
+def ship_stock(context, rng):
+    stock_item = _stock_item(context, rng)
+    return lambda: context.service.ship_stock(stock_item.product, stock_item.warehouse, 1)
+
+@scenario("service.reserve_stock")
+def reserve_stock(context, rng):
+    stock_item = _stock_item(context, rng)
+    return lambda: context.service.reserve_stock(stock_item.product, stock_item.warehouse, 1)
+
+@scenario("service.release_reserved_stock")
+def release_reserved_stock(context, rng):
+    stock_item = _stock_item(context, rng)
+    context.service.reserve_stock(stock_item.product, stock_item.warehouse, 1_000)
+    return lambda: context.service.release_reserved_stock(stock_item.product, stock_item.warehouse, 1)
+
+@scenario("service.allocate_order")
+def allocate_order(context, rng):
+    order = context.service.create_order(lines=[
+        OrderLine(product=si.product, quantity=1) for si in rng.sample(context.dataset.stock_items, 3)
+    ])
+    return lambda: context.service.allocate_order(order)
+
+@scenario("service.available_quantity")
+def available_quantity(context, rng):
+    return lambda: context.service.available_quantity(rng.choice(context.dataset.products))
+
+@scenario("products.get")
+def get_product(context, rng):
+    return lambda: context.products.get(rng.choice(context.dataset.products).id)
+
+@scenario("products.list")
+def list_products(context, rng):
+    return context.products.list
+
+@scenario("products.iter_all")
+def iter_products(context, rng):
+    return lambda: _consume(context.products.iter_all())
+
+@scenario("orders.get")
+def get_order(context, rng):
+    return lambda: context.orders.get(rng.choice(context.dataset.orders).id)
+
+@scenario("orders.list")
+def list_orders(context, rng):
+    return context.orders.list
+
+@scenario("orders.iter_all")
+def iter_orders(context, rng):
+    return lambda: _consume(context.orders.iter_all())
+
+@scenario("warehouses.get")
+def get_warehouse(context, rng):
+    return lambda: context.warehouses.get(rng.choice(context.dataset.warehouses).id)
+
+@scenario("warehouses.list")
+def list_warehouses(context, rng):
+    return context.warehouses.list
+
+@scenario("warehouses.iter_all")
+def iter_warehouses(context, rng):
+    return lambda: _consume(context.warehouses.iter_all())
+
+@scenario("warehouses.get_occupancy")
+def get_occupancy(context, rng):
+    return lambda: context.warehouses.get_occupancy(rng.choice(context.dataset.warehouses).id)
+
+@scenario("stock_items.get")
+def get_stock_item(context, rng):
+    return lambda: context.stock_items.get(_stock_item(context, rng).id)
+
+@scenario("stock_items.get_by_product_and_warehouse")
+def get_stock_item_by_key(context, rng):
+    def operation():
+        stock_item = _stock_item(context, rng)
+        return context.stock_items.get_by_product_and_warehouse(stock_item.product.id, stock_item.warehouse.id)
+    return operation
+
+@scenario("stock_items.list")
+def list_stock_items(context, rng):
+    return context.stock_items.list
+
+@scenario("stock_items.iter_all")
+def iter_stock_items(context, rng):
+    return lambda: _consume(context.stock_items.iter_all())
+
+@scenario("stock_items.list_available")
+def list_available(context, rng):
+    product_ids = [p.id for p in rng.sample(context.dataset.products, 10)]
+    return lambda: context.stock_items.list_available(product_ids)
+
+@scenario("stock_items.available_by_product")
+def available_by_product(context, rng):
+    product_ids = [p.id for p in rng.sample(context.dataset.products, 10)]
+    return lambda: context.stock_items.available_by_product(product_ids)
+
+@scenario("stock_items.available_by_warehouse")
+def available_by_warehouse(context, rng):
+    warehouse_ids = [w.id for w in context.dataset.warehouses]
+    return lambda: context.stock_items.available_by_warehouse(warehouse_ids)
+
+@scenario("stock_items.available_by_location")
+def available_by_location(context, rng):
+    product_ids = [p.id for p in rng.sample(context.dataset.products, 10)]
+    return lambda: context.stock_items.available_by_location(product_ids)
+
+@scenario("stock_movements.get")
+def get_movement(context, rng):
+    return lambda: context.stock_movements.get(rng.choice(context.dataset.movements).id)
+
+@scenario("stock_movements.list")
+def list_movements(context, rng):
+    return context.stock_movements.list
+
+@scenario("stock_movements.iter_all")
+def iter_movements(context, rng):
+    return lambda: _consume(context.stock_movements.iter_all())
+
+@scenario("stock_movements.list_by_product")
+def list_movements_by_product(context, rng):
+    return lambda: context.stock_movements.list_by_product(rng.choice(context.dataset.products).id)
+
+@scenario("stock_movements.list_by_warehouse")
+def list_movements_by_warehouse(context, rng):
+    return lambda: context.stock_movements.list_by_warehouse(rng.choice(context.dataset.warehouses).id)
+
+@scenario("stock_movements.iter_by_product")
+def iter_movements_by_product(context, rng):
+    return lambda: _consume(context.stock_movements.iter_by_product(rng.choice(context.dataset.products).id))
+
+@scenario("stock_movements.iter_by_warehouse")
+def iter_movements_by_warehouse(context, rng):
+    return lambda: _consume(context.stock_movements.iter_by_warehouse(rng.choice(context.dataset.warehouses).id))
@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from domain.exceptions import ConcurrencyConflict
+from domain.models import Product, Warehouse
+from domain.services import WarehouseService
+from infrastructure.orm import Base, ProductORM, WarehouseORM, WarehouseOccupancyORM, StockItemORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+
+PRODUCTS = 10
+STOCK = 100_000
+TRANSFERS_PER_WORKER = 500
+BATCH_SIZE = 10
+
+def setup(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM), [
+            {"id": p, "name": f"Product {p}", "quantity": 0, "price": 1.0} for p in range(1, PRODUCTS + 1)
+        ])
+        connection.execute(insert(WarehouseORM), [
+            {"id": w, "name": f"Warehouse {w}", "location": "Moscow", "capacity": 10 ** 9} for w in (1, 2)
+        ])
+        connection.execute(insert(WarehouseOccupancyORM), [
+            {"warehouse_id": w, "occupied": PRODUCTS * STOCK} for w in (1, 2)
+        ])
+        connection.execute(insert(StockItemORM), [
+            {"product_id": p, "warehouse_id": w, "quantity": STOCK, "reserved_quantity": 0}
+            for p in range(1, PRODUCTS + 1) for w in (1, 2)
+        ])
+    return engine, sessionmaker(bind=engine)
+
+def transfer_one_by_one(session_factory, products, source, destination):
+    for start in range(0, TRANSFERS_PER_WORKER, BATCH_SIZE):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            service = WarehouseService(
+                uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements
+            )
+            for i in range(start, start + BATCH_SIZE):
+                service.transfer_stock(products[i % PRODUCTS], source, destination, 1)
+            uow.commit()
+
+def transfer_in_locked_batches(session_factory, products, source, destination):
+    for start in range(0, TRANSFERS_PER_WORKER, BATCH_SIZE):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            batch = uow.batch(lock=True)
+            for i in range(start, start + BATCH_SIZE):
+                batch.transfer(products[i % PRODUCTS], source, destination, 1)
+            batch.execute()
+            uow.commit()
+
+def run(name: str, transfer, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine, session_factory = setup(os.path.join(directory, "bench.db"))
+        products = [Product(id=p, name=f"Product {p}", quantity=0, price=1.0) for p in range(1, PRODUCTS + 1)]
+        warehouses = [Warehouse(id=w, name=f"Warehouse {w}", location="Moscow", capacity=10 ** 9) for w in (1, 2)]
+        failures = []
+
+        def worker(index):
+            source, destination = warehouses if index % 2 else reversed(warehouses)
+            try:
+                transfer(session_factory, products, source, destination)
+            except (OperationalError, ConcurrencyConflict) as error:
+                failures.append(error)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    completed = (threads - len(failures)) * TRANSFERS_PER_WORKER
+    return {
+        "path": name,
+        "threads": threads,
+        "failed_workers": len(failures),
+        "transfers": completed,
+        "transfers_per_second": completed / elapsed,
+    }
+
+def main(argv):
+    threads = [int(a) for a in argv] or [2, 8]
+    print_table("Opposing transfers between two warehouses", [
+        run(name, transfer, count)
+        for count in threads
+        for name, transfer in (
+            ("one by one", transfer_one_by_one),
+            ("locked batches", transfer_in_locked_batches),
+        )
+    ])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import func, select
+from domain.models import Product, Warehouse
+from domain.services import WarehouseService
+from infrastructure.movement_writer import MovementWriter
+from infrastructure.orm import StockMovementORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from .common import print_table
+from .transfers import PRODUCTS, setup
+
+TRANSFERS_PER_WORKER = 500
+
+def transfer(session_factory, writer, products, source, destination, samples):
+    for i in range(TRANSFERS_PER_WORKER):
+        started = time.perf_counter()
+        with SqlAlchemyUnitOfWork(session_factory(), movement_writer=writer) as uow:
+            service = WarehouseService(
+                uow.products, uow.orders, uow.warehouses, uow.stock_items, uow.stock_movements
+            )
+            service.transfer_stock(products[i % PRODUCTS], source, destination, 1)
+            uow.commit()
+        samples.append(time.perf_counter() - started)
+
+def run(mode: str, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine, session_factory = setup(os.path.join(directory, "bench.db"))
+        products = [Product(id=p, name=f"Product {p}", quantity=0, price=1.0) for p in range(1, PRODUCTS + 1)]
+        warehouses = [Warehouse(id=w, name=f"Warehouse {w}", location="Moscow", capacity=10 ** 9) for w in (1, 2)]
+        writer = None
+        if mode != "synchronous":
+            writer = MovementWriter(engine, os.path.join(directory, "movements.journal"), fsync=mode == "write-behind")
+            writer.start()
+        samples = []
+
+        def worker(index):
+            source, destination = warehouses if index % 2 else reversed(warehouses)
+            transfer(session_factory, writer, products, source, destination, samples)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if writer is not None:
+            writer.close()
+        with engine.connect() as connection:
+            movements = connection.scalar(select(func.count()).select_from(StockMovementORM))
+        engine.dispose()
+    samples.sort()
+    return {
+        "mode": mode,
+        "threads": threads,
+        "movements": movements,
+        "transfers_per_second": len(samples) / elapsed,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+    }
+
+def main(argv):
+    threads = [int(a) for a in argv] or [1, 4]
+    print_table("Transfers with synchronous and write-behind movement writes", [
+        run(mode, count)
+        for count in threads
+        for mode in ("synchronous", "write-behind", "write-behind without fsync")
+    ])
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from .models import Allocation, OrderLine, StockItem
+
+class CostPolicy(ABC):
+    @abstractmethod
+    def cost(self, stock_item: StockItem) -> float:
+        pass
+
+class MostAvailableFirst(CostPolicy):
+    def cost(self, stock_item: StockItem) -> float:
+        return -(stock_item.quantity - stock_item.reserved_quantity)
+
+class WarehouseCost(CostPolicy):
+    def __init__(self, costs: Dict[int, float], default: float = 0.0):
+        self.costs = costs
+        self.default = default
+
+    def cost(self, stock_item: StockItem) -> float:
+        return self.costs.get(stock_item.warehouse.id, self.default)
+
+class Allocator:
+    def __init__(self, policy: Optional[CostPolicy] = None):
+        self.policy = policy or MostAvailableFirst()
+
+    def plan(self, lines: List[OrderLine], stock_items: List[StockItem]) -> List[Allocation]:
+        candidates: Dict[int, List[StockItem]] = {}
+        for stock_item in stock_items:
+            candidates.setdefault(stock_item.product.id, []).append(stock_item)
+        for items in candidates.values():
+            items.sort(key=lambda si: (self.policy.cost(si), si.warehouse.id))
+
+        available = {
+            (si.product.id, si.warehouse.id): si.quantity - si.reserved_quantity
+            for si in stock_items
+        }
+        allocations = []
+        for line in lines:
+            if line.quantity <= 0:
+                raise ValueError("Order line quantity must be positive")
+            needed = line.quantity
+            for stock_item in candidates.get(line.product.id, []):
+                key = (stock_item.product.id, stock_item.warehouse.id)
+                taken = min(needed, available[key])
+                if taken <= 0:
+                    continue
+                available[key] -= taken
+                needed -= taken
+                allocations.append(Allocation(
+                    product=line.product,
+                    warehouse=stock_item.warehouse,
+                    quantity=taken
+                ))
+                if needed == 0:
+                    break
+            if needed > 0:
+                raise ValueError(f"Not enough stock to allocate product {line.product.id}")
+        return allocations
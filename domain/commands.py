@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from .exceptions import StockItemNotFound
+from .models import Product, Warehouse, StockItem, StockMovement, MovementType
+
+StockKey = Tuple[int, int]
+
+@dataclass(slots=True)
+class ReserveStock:
+    product: Product
+    warehouse: Warehouse
+    quantity: int
+
+    def stock_keys(self) -> List[StockKey]:
+        return [(self.product.id, self.warehouse.id)]
+
+    def warehouses(self) -> List[Warehouse]:
+        return [self.warehouse]
+
+    def movement(self, timestamp: datetime) -> StockMovement:
+        return StockMovement(
+            id=None, product=self.product, source_warehouse=self.warehouse, destination_warehouse=None,
+            quantity=self.quantity, movement_type=MovementType.RESERVATION, timestamp=timestamp
+        )
+
+@dataclass(slots=True)
+class ReleaseStock:
+    product: Product
+    warehouse: Warehouse
+    quantity: int
+
+    def stock_keys(self) -> List[StockKey]:
+        return [(self.product.id, self.warehouse.id)]
+
+    def warehouses(self) -> List[Warehouse]:
+        return [self.warehouse]
+
+    def movement(self, timestamp: datetime) -> StockMovement:
+        return StockMovement(
+            id=None, product=self.product, source_warehouse=self.warehouse, destination_warehouse=None,
+            quantity=self.quantity, movement_type=MovementType.RELEASE, timestamp=timestamp
+        )
+
+@dataclass(slots=True)
+class ReceiveStock:
+    product: Product
+    warehouse: Warehouse
+    quantity: int
+
+    def stock_keys(self) -> List[StockKey]:
+        return [(self.product.id, self.warehouse.id)]
+
+    def warehouses(self) -> List[Warehouse]:
+        return [self.warehouse]
+
+    def movement(self, timestamp: datetime) -> StockMovement:
+        return StockMovement(
+            id=None, product=self.product, source_warehouse=None, destination_warehouse=self.warehouse,
+            quantity=self.quantity, movement_type=MovementType.RECEIPT, timestamp=timestamp
+        )
+
+@dataclass(slots=True)
+class TransferStock:
+    product: Product
+    source_warehouse: Warehouse
+    destination_warehouse: Warehouse
+    quantity: int
+
+    def stock_keys(self) -> List[StockKey]:
+        return [(self.product.id, self.source_warehouse.id), (self.product.id, self.destination_warehouse.id)]
+
+    def warehouses(self) -> List[Warehouse]:
+        return [self.source_warehouse, self.destination_warehouse]
+
+    def movement(self, timestamp: datetime) -> StockMovement:
+        return StockMovement(
+            id=None, product=self.product, source_warehouse=self.source_warehouse,
+            destination_warehouse=self.destination_warehouse, quantity=self.quantity,
+            movement_type=MovementType.TRANSFER, timestamp=timestamp
+        )
+
+Command = Union[ReserveStock, ReleaseStock, ReceiveStock, TransferStock]
+
+@dataclass(slots=True)
+class CommandResult:
+    command: Command
+    applied: bool
+    error: Optional[str] = None
+    movement: Optional[StockMovement] = None
+
+class CommandBatch:
+    def __init__(self, all_or_nothing: bool = False):
+        self.all_or_nothing = all_or_nothing
+        self.commands: List[Command] = []
+
+    def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> "CommandBatch":
+        self.commands.append(ReserveStock(product, warehouse, quantity))
+        return self
+
+    def release(self, product: Product, warehouse: Warehouse, quantity: int) -> "CommandBatch":
+        self.commands.append(ReleaseStock(product, warehouse, quantity))
+        return self
+
+    def receive(self, product: Product, warehouse: Warehouse, quantity: int) -> "CommandBatch":
+        self.commands.append(ReceiveStock(product, warehouse, quantity))
+        return self
+
+    def transfer(
+        self,
+        product: Product,
+        source_warehouse: Warehouse,
+        destination_warehouse: Warehouse,
+        quantity: int
+    ) -> "CommandBatch":
+        self.commands.append(TransferStock(product, source_warehouse, destination_warehouse, quantity))
+        return self
+
+    def stock_keys(self) -> List[StockKey]:
+        return sorted({key for command in self.commands for key in command.stock_keys()})
+
+    def warehouse_ids(self) -> List[int]:
+        return sorted({w.id for command in self.commands for w in command.warehouses()})
+
+    # Applies the queued commands to already loaded stock items and warehouse
+    # occupancy, mutating both. Each command is validated before it changes
+    # anything, so a failed command leaves the state as it found it.
+    def apply(
+        self,
+        stock_items: Dict[StockKey, StockItem],
+        occupancy: Dict[int, int],
+        capacity: Dict[int, int]
+    ) -> List[CommandResult]:
+        timestamp = datetime.now()
+        results = []
+        for command in self.commands:
+            try:
+                self._apply(command, stock_items, occupancy, capacity)
+            except (ValueError, StockItemNotFound) as error:
+                results.append(CommandResult(command=command, applied=False, error=str(error)))
+            else:
+                results.append(CommandResult(command=command, applied=True, movement=command.movement(timestamp)))
+
+        if self.all_or_nothing and not all(r.applied for r in results):
+            for result in results:
+                if result.applied:
+                    result.applied = False
+                    result.error = "Batch aborted because another command failed"
+                    result.movement = None
+        return results
+
+    def _apply(self, command: Command, stock_items, occupancy, capacity) -> None:
+        if command.quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        for warehouse in command.warehouses():
+            if warehouse.id not in capacity:
+                raise ValueError(f"Warehouse {warehouse.id} not found")
+
+        if isinstance(command, ReserveStock):
+            self._existing(stock_items, command.product, command.warehouse).reserve(command.quantity)
+        elif isinstance(command, ReleaseStock):
+            self._existing(stock_items, command.product, command.warehouse).release_reservation(command.quantity)
+        elif isinstance(command, ReceiveStock):
+            self._check_capacity(occupancy, capacity, command.warehouse, command.quantity)
+            self._get_or_create(stock_items, command.product, command.warehouse).deposit(command.quantity)
+            occupancy[command.warehouse.id] += command.quantity
+        else:
+            source = self._existing(stock_items, command.product, command.source_warehouse)
+            if source.quantity - source.reserved_quantity < command.quantity:
+                raise ValueError("Not enough available stock in source warehouse")
+            self._check_capacity(occupancy, capacity, command.destination_warehouse, command.quantity)
+            source.withdraw(command.quantity)
+            self._get_or_create(stock_items, command.product, command.destination_warehouse).deposit(command.quantity)
+            occupancy[command.source_warehouse.id] -= command.quantity
+            occupancy[command.destination_warehouse.id] += command.quantity
+
+    def _existing(self, stock_items, product: Product, warehouse: Warehouse) -> StockItem:
+        stock_item = stock_items.get((product.id, warehouse.id))
+        if stock_item is None:
+            raise StockItemNotFound(f"No stock of product {product.id} in warehouse {warehouse.id}")
+        return stock_item
+
+    def _get_or_create(self, stock_items, product: Product, warehouse: Warehouse) -> StockItem:
+        key = (product.id, warehouse.id)
+        if key not in stock_items:
+            stock_items[key] = StockItem(id=None, product=product, warehouse=warehouse, quantity=0)
+        return stock_items[key]
+
+    def _check_capacity(self, occupancy, capacity, warehouse: Warehouse, quantity: int) -> None:
+        if occupancy[warehouse.id] + quantity > capacity[warehouse.id]:
+            raise ValueError(f"Not enough capacity in warehouse {warehouse.id}")
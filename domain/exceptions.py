@@ -0,0 +1,5 @@
+class StockItemNotFound(Exception):
+    pass
+
+class ConcurrencyConflict(Exception):
+    pass
@@ -7,23 +7,34 @@ class MovementType(Enum):
     RECEIPT = "receipt"
     SHIPMENT = "shipment"
     TRANSFER = "transfer"
+    RESERVATION = "reservation"
+    RELEASE = "release"
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     id: int
     name: str
     quantity: int
     price: float
 
-@dataclass
+@dataclass(slots=True)
+class OrderLine:
+    product: Product
+    quantity: int
+
+@dataclass(slots=True)
 class Order:
     id: int
     products: list[Product] = field(default_factory=list)
+    lines: list[OrderLine] = field(default_factory=list)
 
     def add_product(self, product: Product):
         self.products.append(product)
 
-@dataclass
+    def add_line(self, product: Product, quantity: int):
+        self.lines.append(OrderLine(product=product, quantity=quantity))
+
+@dataclass(slots=True)
 class Warehouse:
     id: int
     name: str
@@ -31,7 +42,7 @@ class Warehouse:
     capacity: int
     stock_items: list["StockItem"] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class StockItem:
     id: int
     product: Product
@@ -49,7 +60,27 @@ class StockItem:
             raise ValueError("Cannot release more than reserved")
         self.reserved_quantity -= quantity
 
-@dataclass
+    def withdraw(self, quantity: int) -> None:
+        if self.quantity - self.reserved_quantity < quantity:
+            raise ValueError("Not enough available stock")
+        self.quantity -= quantity
+
+    def deposit(self, quantity: int) -> None:
+        self.quantity += quantity
+
+@dataclass(slots=True)
+class Allocation:
+    product: Product
+    warehouse: Warehouse
+    quantity: int
+
+@dataclass(slots=True)
+class ReceiptLine:
+    product: Product
+    warehouse: Warehouse
+    quantity: int
+
+@dataclass(slots=True)
 class StockMovement:
     id: int
     product: Product
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from .models import Product, Order, Warehouse, StockItem, StockMovement
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from .models import Product, Order, Warehouse, StockItem, StockMovement, ReceiptLine
 
 class ProductRepository(ABC):
     @abstractmethod
@@ -14,11 +15,19 @@ class ProductRepository(ABC):
     def list(self):
         pass
 
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Product]:
+        pass
+
 class OrderRepository(ABC):
     @abstractmethod
     def add(self, order: Order):
         pass
 
+    @abstractmethod
+    def add_many(self, orders: List[Order]):
+        pass
+
     @abstractmethod
     def get(self, order_id: int) -> Order:
         pass
@@ -27,6 +36,10 @@ class OrderRepository(ABC):
     def list(self):
         pass
 
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Order]:
+        pass
+
 class WarehouseRepository(ABC):
     @abstractmethod
     def add(self, warehouse: Warehouse):
@@ -40,6 +53,26 @@ class WarehouseRepository(ABC):
     def list(self):
         pass
 
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Warehouse]:
+        pass
+
+    @abstractmethod
+    def get_occupancy(self, warehouse_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        pass
+
+    @abstractmethod
+    def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        pass
+
+    @abstractmethod
+    def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        pass
+
 class StockItemRepository(ABC):
     @abstractmethod
     def add(self, stock_item: StockItem):
@@ -53,15 +86,59 @@ class StockItemRepository(ABC):
     def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
         pass
 
+    @abstractmethod
+    def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        pass
+
+    @abstractmethod
+    def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        pass
+
+    @abstractmethod
+    def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        pass
+
+    @abstractmethod
+    def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        pass
+
+    @abstractmethod
+    def receive_batch(self, lines: List[ReceiptLine]):
+        pass
+
+    @abstractmethod
+    def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        pass
+
+    @abstractmethod
+    def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
+    @abstractmethod
+    def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
+    @abstractmethod
+    def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
     @abstractmethod
     def list(self):
         pass
 
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockItem]:
+        pass
+
 class StockMovementRepository(ABC):
     @abstractmethod
     def add(self, movement: StockMovement):
         pass
 
+    @abstractmethod
+    def add_many(self, movements: List[StockMovement]):
+        pass
+
     @abstractmethod
     def get(self, movement_id: int) -> StockMovement:
         pass
@@ -70,6 +147,10 @@ class StockMovementRepository(ABC):
     def list(self):
         pass
 
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        pass
+
     @abstractmethod
     def list_by_product(self, product_id: int):
         pass
@@ -77,6 +158,176 @@ class StockMovementRepository(ABC):
     @abstractmethod
     def list_by_warehouse(self, warehouse_id: int):
         pass
-    
 
+    @abstractmethod
+    def iter_by_product(self, product_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        pass
+
+    @abstractmethod
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        pass
+
+class AsyncProductRepository(ABC):
+    @abstractmethod
+    async def add(self, product: Product):
+        pass
+
+    @abstractmethod
+    async def get(self, product_id: int) -> Product:
+        pass
+
+    @abstractmethod
+    async def list(self):
+        pass
+
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[Product]:
+        pass
+
+class AsyncOrderRepository(ABC):
+    @abstractmethod
+    async def add(self, order: Order):
+        pass
+
+    @abstractmethod
+    async def add_many(self, orders: List[Order]):
+        pass
+
+    @abstractmethod
+    async def get(self, order_id: int) -> Order:
+        pass
+
+    @abstractmethod
+    async def list(self):
+        pass
+
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[Order]:
+        pass
+
+class AsyncWarehouseRepository(ABC):
+    @abstractmethod
+    async def add(self, warehouse: Warehouse):
+        pass
+
+    @abstractmethod
+    async def get(self, warehouse_id: int) -> Warehouse:
+        pass
+
+    @abstractmethod
+    async def list(self):
+        pass
+
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[Warehouse]:
+        pass
+
+    @abstractmethod
+    async def get_occupancy(self, warehouse_id: int) -> int:
+        pass
+
+    @abstractmethod
+    async def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        pass
+
+    @abstractmethod
+    async def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        pass
+
+    @abstractmethod
+    async def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        pass
+
+class AsyncStockItemRepository(ABC):
+    @abstractmethod
+    async def add(self, stock_item: StockItem):
+        pass
+
+    @abstractmethod
+    async def get(self, stock_item_id: int) -> StockItem:
+        pass
+
+    @abstractmethod
+    async def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
+        pass
+
+    @abstractmethod
+    async def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        pass
+
+    @abstractmethod
+    async def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        pass
+
+    @abstractmethod
+    async def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        pass
+
+    @abstractmethod
+    async def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        pass
+
+    @abstractmethod
+    async def receive_batch(self, lines: List[ReceiptLine]):
+        pass
+
+    @abstractmethod
+    async def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        pass
+
+    @abstractmethod
+    async def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
+    @abstractmethod
+    async def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
+    @abstractmethod
+    async def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        pass
+
+    @abstractmethod
+    async def list(self):
+        pass
+
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[StockItem]:
+        pass
+
+class AsyncStockMovementRepository(ABC):
+    @abstractmethod
+    async def add(self, movement: StockMovement):
+        pass
 
+    @abstractmethod
+    async def add_many(self, movements: List[StockMovement]):
+        pass
+
+    @abstractmethod
+    async def get(self, movement_id: int) -> StockMovement:
+        pass
+
+    @abstractmethod
+    async def list(self):
+        pass
+
+    @abstractmethod
+    def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[StockMovement]:
+        pass
+
+    @abstractmethod
+    async def list_by_product(self, product_id: int):
+        pass
+
+    @abstractmethod
+    async def list_by_warehouse(self, warehouse_id: int):
+        pass
+
+    @abstractmethod
+    def iter_by_product(self, product_id: int, chunk_size: int = 1000) -> AsyncIterator[StockMovement]:
+        pass
+
+    @abstractmethod
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = 1000) -> AsyncIterator[StockMovement]:
+        pass
@@ -0,0 +1,43 @@
+import asyncio
+import functools
+import inspect
+import random
+import time
+from .exceptions import ConcurrencyConflict
+
+# Retries the decorated call when it loses an optimistic concurrency race.
+# The call must own its whole unit of work (open, operate, commit), because a
+# conflict leaves the failed transaction unusable. Delays grow exponentially
+# from base_delay up to max_delay, with full jitter so that colliding workers
+# spread out instead of retrying in lock step.
+def retry_on_conflict(attempts: int = 5, base_delay: float = 0.01, max_delay: float = 0.5):
+    if attempts < 1:
+        raise ValueError("Attempts must be positive")
+
+    def delays():
+        for attempt in range(attempts - 1):
+            yield random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+    def decorator(operation):
+        if inspect.iscoroutinefunction(operation):
+            @functools.wraps(operation)
+            async def retrying(*args, **kwargs):
+                for delay in delays():
+                    try:
+                        return await operation(*args, **kwargs)
+                    except ConcurrencyConflict:
+                        await asyncio.sleep(delay)
+                return await operation(*args, **kwargs)
+            return retrying
+
+        @functools.wraps(operation)
+        def retrying(*args, **kwargs):
+            for delay in delays():
+                try:
+                    return operation(*args, **kwargs)
+                except ConcurrencyConflict:
+                    time.sleep(delay)
+            return operation(*args, **kwargs)
+        return retrying
+
+    return decorator
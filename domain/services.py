@@ -1,11 +1,60 @@
-from .models import Product, Order, Warehouse, StockItem, StockMovement, MovementType
+from .models import (
+    Product, Order, OrderLine, Warehouse, StockItem, StockMovement, MovementType,
+    ReceiptLine, Allocation
+)
+from .allocation import Allocator, CostPolicy
 from .repositories import (
     ProductRepository, OrderRepository, WarehouseRepository,
     StockItemRepository, StockMovementRepository
 )
-from typing import List
+from typing import Any, Awaitable, Callable, List, Optional
 from datetime import datetime
 
+def _validate_receipt(lines: List[ReceiptLine]) -> None:
+    if any(line.quantity <= 0 for line in lines):
+        raise ValueError("Receipt quantity must be positive")
+
+def _receipt_totals(lines: List[ReceiptLine]) -> List[tuple]:
+    per_warehouse = {}
+    for line in lines:
+        warehouse, quantity = per_warehouse.get(line.warehouse.id, (line.warehouse, 0))
+        per_warehouse[line.warehouse.id] = (warehouse, quantity + line.quantity)
+    return [per_warehouse[warehouse_id] for warehouse_id in sorted(per_warehouse)]
+
+def _movement(
+    product: Product,
+    source_warehouse: Optional[Warehouse],
+    destination_warehouse: Optional[Warehouse],
+    quantity: int,
+    movement_type: MovementType,
+    timestamp: Optional[datetime] = None
+) -> StockMovement:
+    return StockMovement(
+        id=None,
+        product=product,
+        source_warehouse=source_warehouse,
+        destination_warehouse=destination_warehouse,
+        quantity=quantity,
+        movement_type=movement_type,
+        timestamp=timestamp or datetime.now()
+    )
+
+def _receipt_movements(lines: List[ReceiptLine]) -> List[StockMovement]:
+    timestamp = datetime.now()
+    return [
+        _movement(line.product, None, line.warehouse, line.quantity, MovementType.RECEIPT, timestamp)
+        for line in lines
+    ]
+
+# Reservation events are recorded against the source warehouse only; they
+# move stock between the available and reserved balances of one warehouse.
+def _reservation_movements(allocations: List[Allocation]) -> List[StockMovement]:
+    timestamp = datetime.now()
+    return [
+        _movement(a.product, a.warehouse, None, a.quantity, MovementType.RESERVATION, timestamp)
+        for a in allocations
+    ]
+
 class WarehouseService:
     def __init__(
         self,
@@ -26,31 +75,48 @@ class WarehouseService:
         self.product_repo.add(product)
         return product
 
-    def create_order(self, products: List[Product]) -> Order:
-        order = Order(id=None, products=products)
+    def create_order(self, products: List[Product] = None, lines: List[OrderLine] = None) -> Order:
+        order = Order(id=None, products=products or [], lines=lines or [])
         self.order_repo.add(order)
         return order
 
+    def create_orders(self, orders_products: List[List[Product]]) -> List[Order]:
+        orders = [Order(id=None, products=products) for products in orders_products]
+        self.order_repo.add_many(orders)
+        return orders
+
     def create_warehouse(self, name: str, location: str, capacity: int) -> Warehouse:
         warehouse = Warehouse(id=None, name=name, location=location, capacity=capacity)
         self.warehouse_repo.add(warehouse)
         return warehouse
 
     def add_stock_to_warehouse(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
-        try:
-            stock_item = self.stock_item_repo.get_by_product_and_warehouse(product.id, warehouse.id)
-            stock_item.quantity += quantity
-        except StopIteration:
-            stock_item = StockItem(
-                id=None,
-                product=product,
-                warehouse=warehouse,
-                quantity=quantity,
-                reserved_quantity=0
-            )
-            self.stock_item_repo.add(stock_item)
+        self._occupy(warehouse, quantity)
+        stock_item = self.stock_item_repo.deposit(product, warehouse, quantity)
+        self.stock_movement_repo.add(_movement(product, None, warehouse, quantity, MovementType.RECEIPT))
         return stock_item
 
+    def receive_stock_batch(self, lines: List[ReceiptLine]) -> List[StockMovement]:
+        _validate_receipt(lines)
+
+        # Occupancy rows are updated before any stock row and in warehouse id
+        # order, as transfers and command batches update them, so concurrent
+        # writers queue behind each other instead of deadlocking.
+        occupied = []
+        for warehouse, quantity in _receipt_totals(lines):
+            try:
+                self._occupy(warehouse, quantity)
+            except ValueError:
+                for done, done_quantity in occupied:
+                    self.warehouse_repo.vacate(done.id, done_quantity)
+                raise
+            occupied.append((warehouse, quantity))
+        self.stock_item_repo.receive_batch(lines)
+
+        movements = _receipt_movements(lines)
+        self.stock_movement_repo.add_many(movements)
+        return movements
+
     def transfer_stock(
         self,
         product: Product,
@@ -58,46 +124,121 @@ class WarehouseService:
         destination_warehouse: Warehouse,
         quantity: int
     ) -> StockMovement:
-        source_stock = self.stock_item_repo.get_by_product_and_warehouse(product.id, source_warehouse.id)
-        if source_stock.quantity - source_stock.reserved_quantity < quantity:
-            raise ValueError("Not enough available stock in source warehouse")
+        if not self.warehouse_repo.transfer_occupancy(source_warehouse.id, destination_warehouse.id, quantity):
+            raise ValueError(f"Not enough capacity in warehouse {destination_warehouse.id}")
 
         # Update source warehouse stock
-        source_stock.quantity -= quantity
+        source_stock = self.stock_item_repo.withdraw(product, source_warehouse, quantity)
+        if source_stock is None:
+            self.warehouse_repo.transfer_occupancy(destination_warehouse.id, source_warehouse.id, quantity)
+            raise ValueError("Not enough available stock in source warehouse")
 
         # Add or update destination warehouse stock
-        try:
-            dest_stock = self.stock_item_repo.get_by_product_and_warehouse(product.id, destination_warehouse.id)
-            dest_stock.quantity += quantity
-        except StopIteration:
-            dest_stock = StockItem(
-                id=None,
-                product=product,
-                warehouse=destination_warehouse,
-                quantity=quantity,
-                reserved_quantity=0
-            )
-            self.stock_item_repo.add(dest_stock)
+        self.stock_item_repo.deposit(product, destination_warehouse, quantity)
 
         # Record the movement
-        movement = StockMovement(
-            id=None,
-            product=product,
-            source_warehouse=source_warehouse,
-            destination_warehouse=destination_warehouse,
-            quantity=quantity,
-            movement_type=MovementType.TRANSFER,
-            timestamp=datetime.now()
-        )
+        movement = _movement(product, source_warehouse, destination_warehouse, quantity, MovementType.TRANSFER)
+        self.stock_movement_repo.add(movement)
+        return movement
+
+    def ship_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockMovement:
+        if not self.warehouse_repo.vacate(warehouse.id, quantity):
+            raise ValueError("Not enough available stock to ship")
+        if self.stock_item_repo.withdraw(product, warehouse, quantity) is None:
+            self.warehouse_repo.occupy(warehouse.id, quantity)
+            raise ValueError("Not enough available stock to ship")
+
+        movement = _movement(product, warehouse, None, quantity, MovementType.SHIPMENT)
         self.stock_movement_repo.add(movement)
         return movement
 
     def reserve_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
-        stock_item = self.stock_item_repo.get_by_product_and_warehouse(product.id, warehouse.id)
-        stock_item.reserve(quantity)
+        stock_item = self.stock_item_repo.reserve(product, warehouse, quantity)
+        if stock_item is None:
+            raise ValueError("Not enough stock available")
+        self.stock_movement_repo.add(_movement(product, warehouse, None, quantity, MovementType.RESERVATION))
         return stock_item
 
     def release_reserved_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
-        stock_item = self.stock_item_repo.get_by_product_and_warehouse(product.id, warehouse.id)
-        stock_item.release_reservation(quantity)
+        stock_item = self.stock_item_repo.release(product, warehouse, quantity)
+        if stock_item is None:
+            raise ValueError("Cannot release more than reserved")
+        self.stock_movement_repo.add(_movement(product, warehouse, None, quantity, MovementType.RELEASE))
         return stock_item
+
+    def available_quantity(self, product: Product) -> int:
+        return self.stock_item_repo.available_by_product([product.id])[product.id]
+
+    def allocate_order(self, order: Order, policy: Optional[CostPolicy] = None) -> List[Allocation]:
+        product_ids = sorted({line.product.id for line in order.lines})
+        stock_items = self.stock_item_repo.list_available(product_ids)
+        allocations = Allocator(policy).plan(order.lines, stock_items)
+
+        # Rows are reserved in warehouse id, then product id order, the order
+        # command batches lock them in, so two orders planned in opposite
+        # orders queue behind each other instead of deadlocking.
+        reserved = []
+        for allocation in sorted(allocations, key=lambda a: (a.warehouse.id, a.product.id)):
+            if self.stock_item_repo.reserve(allocation.product, allocation.warehouse, allocation.quantity) is None:
+                for done in reserved:
+                    self.stock_item_repo.release(done.product, done.warehouse, done.quantity)
+                raise ValueError(f"Stock of product {allocation.product.id} changed during allocation")
+            reserved.append(allocation)
+        self.stock_movement_repo.add_many(_reservation_movements(allocations))
+        return allocations
+
+    def _occupy(self, warehouse: Warehouse, quantity: int) -> None:
+        if not self.warehouse_repo.occupy(warehouse.id, quantity):
+            raise ValueError(f"Not enough capacity in warehouse {warehouse.id}")
+
+# Every call runs a WarehouseService over the synchronous repositories as one
+# piece of synchronous work through run_sync, which the async unit of work
+# provides, so the service logic exists only once.
+class AsyncWarehouseService:
+    def __init__(self, service: WarehouseService, run_sync: Callable[[Callable[[], Any]], Awaitable[Any]]):
+        self.service = service
+        self.run_sync = run_sync
+
+    async def create_product(self, name: str, quantity: int, price: float) -> Product:
+        return await self.run_sync(lambda: self.service.create_product(name, quantity, price))
+
+    async def create_order(self, products: List[Product] = None, lines: List[OrderLine] = None) -> Order:
+        return await self.run_sync(lambda: self.service.create_order(products, lines))
+
+    async def create_orders(self, orders_products: List[List[Product]]) -> List[Order]:
+        return await self.run_sync(lambda: self.service.create_orders(orders_products))
+
+    async def create_warehouse(self, name: str, location: str, capacity: int) -> Warehouse:
+        return await self.run_sync(lambda: self.service.create_warehouse(name, location, capacity))
+
+    async def add_stock_to_warehouse(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        return await self.run_sync(lambda: self.service.add_stock_to_warehouse(product, warehouse, quantity))
+
+    async def receive_stock_batch(self, lines: List[ReceiptLine]) -> List[StockMovement]:
+        return await self.run_sync(lambda: self.service.receive_stock_batch(lines))
+
+    async def transfer_stock(
+        self,
+        product: Product,
+        source_warehouse: Warehouse,
+        destination_warehouse: Warehouse,
+        quantity: int
+    ) -> StockMovement:
+        return await self.run_sync(
+            lambda: self.service.transfer_stock(product, source_warehouse, destination_warehouse, quantity)
+        )
+
+    async def ship_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockMovement:
+        return await self.run_sync(lambda: self.service.ship_stock(product, warehouse, quantity))
+
+    async def reserve_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        return await self.run_sync(lambda: self.service.reserve_stock(product, warehouse, quantity))
+
+    async def release_reserved_stock(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        return await self.run_sync(lambda: self.service.release_reserved_stock(product, warehouse, quantity))
+
+    async def available_quantity(self, product: Product) -> int:
+        return await self.run_sync(lambda: self.service.available_quantity(product))
+
+    async def allocate_order(self, order: Order, policy: Optional[CostPolicy] = None) -> List[Allocation]:
+        return await self.run_sync(lambda: self.service.allocate_order(order, policy))
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from .commands import CommandBatch
 
 class UnitOfWork(ABC):
     @abstractmethod
@@ -16,3 +17,28 @@ class UnitOfWork(ABC):
     @abstractmethod
     def rollback(self):
         pass
+
+    @abstractmethod
+    def batch(self, all_or_nothing: bool = False, lock: bool = False) -> CommandBatch:
+        pass
+
+class AsyncUnitOfWork(ABC):
+    @abstractmethod
+    async def __aenter__(self):
+        pass
+
+    @abstractmethod
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
+
+    @abstractmethod
+    def batch(self, all_or_nothing: bool = False, lock: bool = False) -> CommandBatch:
+        pass
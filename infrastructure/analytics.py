@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.orm import Session
+from domain.models import MovementType
+from .orm import ProductORM, StockItemORM, StockMovementORM
+
+ANALYTICS_CHUNK_SIZE = 100_000
+NO_WAREHOUSE = -1
+
+@dataclass
+class StockColumns:
+    product_id: np.ndarray
+    warehouse_id: np.ndarray
+    quantity: np.ndarray
+    reserved_quantity: np.ndarray
+    price: np.ndarray
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.quantity * self.price
+
+@dataclass
+class MovementColumns:
+    product_id: np.ndarray
+    source_warehouse_id: np.ndarray
+    destination_warehouse_id: np.ndarray
+    quantity: np.ndarray
+    movement_type: np.ndarray
+    timestamp: np.ndarray
+
+    def of_type(self, movement_type: MovementType) -> np.ndarray:
+        return self.movement_type == movement_type.name
+
+@dataclass
+class GroupTotals:
+    keys: np.ndarray
+    totals: Dict[str, np.ndarray]
+
+@dataclass
+class ProductTurnover:
+    product_id: np.ndarray
+    on_hand: np.ndarray
+    shipped: np.ndarray
+    turnover_rate: np.ndarray
+    days_of_cover: np.ndarray
+
+def _load_columns(session: Session, statement, dtypes: Dict[str, object], chunk_size: int) -> Dict[str, np.ndarray]:
+    session.flush()
+    chunks = {name: [] for name in dtypes}
+    result = session.connection().execute(statement.execution_options(stream_results=True))
+    for partition in result.partitions(chunk_size):
+        for (name, dtype), values in zip(dtypes.items(), zip(*partition)):
+            chunks[name].append(np.array(values, dtype=dtype))
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=dtypes[name])
+        for name, parts in chunks.items()
+    }
+
+def load_stock_columns(session: Session, chunk_size: int = ANALYTICS_CHUNK_SIZE) -> StockColumns:
+    statement = select(
+        StockItemORM.product_id,
+        StockItemORM.warehouse_id,
+        StockItemORM.quantity,
+        StockItemORM.reserved_quantity,
+        ProductORM.price
+    ).join(ProductORM, StockItemORM.product_id == ProductORM.id)
+    return StockColumns(**_load_columns(session, statement, {
+        "product_id": np.int64,
+        "warehouse_id": np.int64,
+        "quantity": np.int64,
+        "reserved_quantity": np.int64,
+        "price": np.float64,
+    }, chunk_size))
+
+# Timestamps and movement types are read uncoerced so numpy parses them in
+# bulk instead of SQLAlchemy building a datetime and an enum for every row.
+def load_movement_columns(
+    session: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    movement_types: Optional[List[MovementType]] = None,
+    chunk_size: int = ANALYTICS_CHUNK_SIZE
+) -> MovementColumns:
+    statement = select(
+        StockMovementORM.product_id,
+        func.coalesce(StockMovementORM.source_warehouse_id, NO_WAREHOUSE),
+        func.coalesce(StockMovementORM.destination_warehouse_id, NO_WAREHOUSE),
+        StockMovementORM.quantity,
+        type_coerce(StockMovementORM.movement_type, String),
+        type_coerce(StockMovementORM.timestamp, String)
+    )
+    if since is not None:
+        statement = statement.where(StockMovementORM.timestamp >= since)
+    if until is not None:
+        statement = statement.where(StockMovementORM.timestamp < until)
+    if movement_types is not None:
+        statement = statement.where(StockMovementORM.movement_type.in_(movement_types))
+    return MovementColumns(**_load_columns(session, statement, {
+        "product_id": np.int64,
+        "source_warehouse_id": np.int64,
+        "destination_warehouse_id": np.int64,
+        "quantity": np.int64,
+        "movement_type": np.str_,
+        "timestamp": "datetime64[us]",
+    }, chunk_size))
+
+def group_totals(keys: np.ndarray, **values: np.ndarray) -> GroupTotals:
+    unique_keys, groups = np.unique(keys, return_inverse=True)
+    return GroupTotals(
+        keys=unique_keys,
+        totals={
+            name: np.bincount(groups, weights=column, minlength=len(unique_keys))
+            for name, column in values.items()
+        }
+    )
+
+def warehouse_totals(stock: StockColumns) -> GroupTotals:
+    return group_totals(
+        stock.warehouse_id,
+        quantity=stock.quantity,
+        reserved_quantity=stock.reserved_quantity,
+        value=stock.value
+    )
+
+def product_totals(stock: StockColumns) -> GroupTotals:
+    return group_totals(
+        stock.product_id,
+        quantity=stock.quantity,
+        reserved_quantity=stock.reserved_quantity,
+        value=stock.value
+    )
+
+def inventory_value(stock: StockColumns) -> float:
+    return float(stock.value.sum())
+
+def product_turnover(stock: StockColumns, movements: MovementColumns, days: float) -> ProductTurnover:
+    shipments = movements.of_type(MovementType.SHIPMENT)
+    product_ids = np.union1d(stock.product_id, movements.product_id[shipments])
+    on_hand = np.bincount(
+        np.searchsorted(product_ids, stock.product_id), weights=stock.quantity, minlength=len(product_ids)
+    )
+    shipped = np.bincount(
+        np.searchsorted(product_ids, movements.product_id[shipments]),
+        weights=movements.quantity[shipments],
+        minlength=len(product_ids)
+    )
+
+    daily_demand = shipped / days
+    return ProductTurnover(
+        product_id=product_ids,
+        on_hand=on_hand,
+        shipped=shipped,
+        turnover_rate=np.divide(shipped, on_hand, out=np.where(shipped > 0, np.inf, 0.0), where=on_hand > 0),
+        days_of_cover=np.divide(on_hand, daily_demand, out=np.where(on_hand > 0, np.inf, 0.0), where=daily_demand > 0)
+    )
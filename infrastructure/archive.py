@@ -0,0 +1,244 @@
+import argparse
+import gzip
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import Session
+from domain.models import MovementType
+from .checkpoints import read_checkpoint, write_checkpoint
+from .orm import StockMovementORM, StockSnapshotORM
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = parquet = None
+
+MOVEMENT_COLUMNS = (
+    "id", "product_id", "source_warehouse_id", "destination_warehouse_id",
+    "quantity", "movement_type", "timestamp"
+)
+ARCHIVE_CHUNK_SIZE = 100_000
+# Highest movement id moved to the archive, so ledger replays that start
+# before it know they need the archived rows.
+ARCHIVE_CHECKPOINT = "archive:stock_movements"
+
+def _parquet_schema():
+    return pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("product_id", pyarrow.int64()),
+        ("source_warehouse_id", pyarrow.int64()),
+        ("destination_warehouse_id", pyarrow.int64()),
+        ("quantity", pyarrow.int64()),
+        ("movement_type", pyarrow.string()),
+        ("timestamp", pyarrow.timestamp("us")),
+    ])
+
+def _month_range(month: str):
+    start = datetime.strptime(month, "%Y-%m")
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+def _keys_path(path: Path) -> Path:
+    return path.with_name(path.name + ".keys.json")
+
+# Each file has a small sidecar listing the products and warehouses it holds,
+# so reads for one product or warehouse skip the files that cannot match
+# without opening them, as reads for a time range skip whole months.
+class MovementArchive:
+    def __init__(self, directory, use_parquet: Optional[bool] = None):
+        if use_parquet and parquet is None:
+            raise ImportError("pyarrow is required for Parquet movement archives")
+        self.directory = Path(directory)
+        self.use_parquet = parquet is not None if use_parquet is None else use_parquet
+
+    @property
+    def suffix(self) -> str:
+        return ".parquet" if self.use_parquet else ".json.gz"
+
+    def months(self) -> List[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(p.name for p in self.directory.iterdir() if p.is_dir())
+
+    def write(self, month: str, columns: Dict[str, list], pending: bool = False) -> Path:
+        ids = columns["id"]
+        path = self.directory / month / f"{min(ids):012d}-{max(ids):012d}{self.suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _keys_path(path).write_text(json.dumps({
+            "products": sorted(set(columns["product_id"])),
+            "warehouses": sorted(
+                (set(columns["source_warehouse_id"]) | set(columns["destination_warehouse_id"])) - {None}
+            ),
+        }))
+        if pending:
+            path = path.with_name(path.name + ".pending")
+        movement_types = [t.name for t in columns["movement_type"]]
+        if self.use_parquet:
+            table = pyarrow.table({**columns, "movement_type": movement_types}, schema=_parquet_schema())
+            parquet.write_table(table, path, compression="zstd")
+        else:
+            payload = {
+                **columns,
+                "movement_type": movement_types,
+                "timestamp": [t.isoformat() for t in columns["timestamp"]],
+            }
+            with gzip.open(path, "wt", encoding="utf-8") as archive_file:
+                json.dump(payload, archive_file)
+        return path
+
+    def pending(self) -> List[Path]:
+        return sorted(self.directory.glob(f"*/*{self.suffix}.pending"))
+
+    def publish(self, path: Path) -> None:
+        path.rename(path.with_name(path.name[:-len(".pending")]))
+
+    def discard(self, path: Path) -> None:
+        path.unlink()
+        _keys_path(path.with_name(path.name[:-len(".pending")])).unlink(missing_ok=True)
+
+    def read(
+        self,
+        product_id: Optional[int] = None,
+        warehouse_id: Optional[int] = None,
+        movement_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[dict]:
+        for month in self.months():
+            start, end = _month_range(month)
+            if since is not None and end <= since or until is not None and start >= until:
+                continue
+            for path in sorted((self.directory / month).glob(f"*{self.suffix}")):
+                if movement_id is not None:
+                    first_id, last_id = (int(i) for i in path.name[:-len(self.suffix)].split("-"))
+                    if not first_id <= movement_id <= last_id:
+                        continue
+                if not self._may_contain(path, product_id, warehouse_id):
+                    continue
+                for row in self._read_file(path, product_id, warehouse_id):
+                    if movement_id is not None and row["id"] != movement_id:
+                        continue
+                    if since is not None and row["timestamp"] < since or until is not None and row["timestamp"] >= until:
+                        continue
+                    yield row
+
+    def _may_contain(self, path: Path, product_id: Optional[int], warehouse_id: Optional[int]) -> bool:
+        if product_id is None and warehouse_id is None:
+            return True
+        try:
+            keys = json.loads(_keys_path(path).read_text())
+        except FileNotFoundError:
+            return True
+        return (
+            (product_id is None or product_id in keys["products"])
+            and (warehouse_id is None or warehouse_id in keys["warehouses"])
+        )
+
+    def _read_file(self, path: Path, product_id: Optional[int], warehouse_id: Optional[int]) -> Iterator[dict]:
+        if self.use_parquet:
+            filters = []
+            if warehouse_id is not None:
+                filters = [[("source_warehouse_id", "=", warehouse_id)], [("destination_warehouse_id", "=", warehouse_id)]]
+            if product_id is not None:
+                filters = [f + [("product_id", "=", product_id)] for f in filters or [[]]]
+            columns = parquet.read_table(path, filters=filters or None).to_pydict()
+        else:
+            with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+                columns = json.load(archive_file)
+            columns["timestamp"] = [datetime.fromisoformat(t) for t in columns["timestamp"]]
+
+        for values in zip(*(columns[c] for c in MOVEMENT_COLUMNS)):
+            row = dict(zip(MOVEMENT_COLUMNS, values))
+            if product_id is not None and row["product_id"] != product_id:
+                continue
+            if warehouse_id is not None and warehouse_id not in (row["source_warehouse_id"], row["destination_warehouse_id"]):
+                continue
+            row["movement_type"] = MovementType[row["movement_type"]]
+            yield row
+
+def recover_archive(session: Session, archive: MovementArchive) -> None:
+    # A pending file whose rows are gone from the database was written by a
+    # run that committed but never published it; anything else is discarded.
+    for path in archive.pending():
+        first_id, last_id = (int(i) for i in path.name.split(".")[0].split("-"))
+        remaining = session.scalar(
+            select(func.count()).where(StockMovementORM.id.between(first_id, last_id))
+        )
+        if remaining:
+            archive.discard(path)
+        else:
+            archive.publish(path)
+
+def archive_movements(
+    session: Session,
+    archive: MovementArchive,
+    before: datetime,
+    chunk_size: int = ARCHIVE_CHUNK_SIZE
+) -> int:
+    # Only movements already folded into a snapshot are archived, so ledger
+    # replay from that snapshot onwards never needs the archived rows. Replays
+    # from earlier points read them from the archive.
+    recover_archive(session, archive)
+    session.flush()
+    horizon = session.scalar(
+        select(func.max(StockSnapshotORM.last_movement_id)).where(StockSnapshotORM.taken_at <= before)
+    )
+    if horizon is None:
+        return 0
+
+    columns = [getattr(StockMovementORM, c) for c in MOVEMENT_COLUMNS]
+    eligible = (StockMovementORM.timestamp < before, StockMovementORM.id <= horizon)
+    archived = 0
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(*columns)
+            .where(*eligible, StockMovementORM.id > last_id)
+            .order_by(StockMovementORM.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return archived
+
+        by_month = defaultdict(lambda: {c: [] for c in MOVEMENT_COLUMNS})
+        for row in rows:
+            month = by_month[row.timestamp.strftime("%Y-%m")]
+            for column, value in zip(MOVEMENT_COLUMNS, row):
+                month[column].append(value)
+        paths = [archive.write(month, values, pending=True) for month, values in by_month.items()]
+
+        try:
+            session.execute(
+                delete(StockMovementORM).where(*eligible, StockMovementORM.id.between(rows[0].id, rows[-1].id))
+            )
+            connection = session.connection()
+            if read_checkpoint(connection, ARCHIVE_CHECKPOINT) < rows[-1].id:
+                write_checkpoint(connection, ARCHIVE_CHECKPOINT, rows[-1].id)
+            session.commit()
+        except Exception:
+            session.rollback()
+            for path in paths:
+                archive.discard(path)
+            raise
+        for path in paths:
+            archive.publish(path)
+        archived += len(rows)
+        last_id = rows[-1].id
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("database_url")
+    parser.add_argument("directory")
+    parser.add_argument("--keep-months", type=int, default=3)
+    args = parser.parse_args()
+
+    today = datetime.now()
+    months = today.year * 12 + today.month - 1 - args.keep_months
+    cutoff = datetime(months // 12, months % 12 + 1, 1)
+    with Session(create_engine(args.database_url)) as session:
+        count = archive_movements(session, MovementArchive(args.directory), cutoff)
+    print(f"Archived {count} movements older than {cutoff:%Y-%m-%d}")
@@ -0,0 +1,152 @@
+from itertools import islice
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from domain.models import Order, Product, Warehouse, StockItem, StockMovement, ReceiptLine
+from domain.repositories import (
+    AsyncProductRepository, AsyncOrderRepository, AsyncWarehouseRepository,
+    AsyncStockItemRepository, AsyncStockMovementRepository
+)
+from .repositories import DEFAULT_CHUNK_SIZE
+
+class _RunSync:
+    def __init__(self, session: AsyncSession, repository):
+        self.session = session
+        self.repository = repository
+
+    async def _call(self, method: str, *args):
+        bound = getattr(self.repository, method)
+        return await self.session.run_sync(lambda _: bound(*args))
+
+    async def _iterate(self, method: str, *args, chunk_size: int):
+        iterator = getattr(self.repository, method)(*args, chunk_size=chunk_size)
+        while True:
+            chunk = await self.session.run_sync(lambda _: list(islice(iterator, chunk_size)))
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+
+class AsyncSqlAlchemyProductRepository(_RunSync, AsyncProductRepository):
+    async def add(self, product: Product):
+        return await self._call("add", product)
+
+    async def get(self, product_id: int) -> Product:
+        return await self._call("get", product_id)
+
+    async def list(self):
+        return await self._call("list")
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[Product]:
+        return self._iterate("iter_all", chunk_size=chunk_size)
+
+class AsyncSqlAlchemyOrderRepository(_RunSync, AsyncOrderRepository):
+    async def add(self, order: Order):
+        return await self._call("add", order)
+
+    async def add_many(self, orders: List[Order]):
+        return await self._call("add_many", orders)
+
+    async def get(self, order_id: int) -> Order:
+        return await self._call("get", order_id)
+
+    async def list(self):
+        return await self._call("list")
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[Order]:
+        return self._iterate("iter_all", chunk_size=chunk_size)
+
+class AsyncSqlAlchemyWarehouseRepository(_RunSync, AsyncWarehouseRepository):
+    async def add(self, warehouse: Warehouse):
+        return await self._call("add", warehouse)
+
+    async def get(self, warehouse_id: int) -> Warehouse:
+        return await self._call("get", warehouse_id)
+
+    async def list(self):
+        return await self._call("list")
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[Warehouse]:
+        return self._iterate("iter_all", chunk_size=chunk_size)
+
+    async def get_occupancy(self, warehouse_id: int) -> int:
+        return await self._call("get_occupancy", warehouse_id)
+
+    async def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        return await self._call("occupy", warehouse_id, quantity)
+
+    async def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        return await self._call("vacate", warehouse_id, quantity)
+
+    async def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        return await self._call("transfer_occupancy", source_id, destination_id, quantity)
+
+class AsyncSqlAlchemyStockItemRepository(_RunSync, AsyncStockItemRepository):
+    async def add(self, stock_item: StockItem):
+        return await self._call("add", stock_item)
+
+    async def get(self, stock_item_id: int) -> StockItem:
+        return await self._call("get", stock_item_id)
+
+    async def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
+        return await self._call("get_by_product_and_warehouse", product_id, warehouse_id)
+
+    async def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        return await self._call("list_available", product_ids)
+
+    async def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        return await self._call("available_by_product", product_ids)
+
+    async def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        return await self._call("available_by_warehouse", warehouse_ids)
+
+    async def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        return await self._call("available_by_location", product_ids)
+
+    async def receive_batch(self, lines: List[ReceiptLine]):
+        return await self._call("receive_batch", lines)
+
+    async def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        return await self._call("deposit", product, warehouse, quantity)
+
+    async def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        return await self._call("withdraw", product, warehouse, quantity)
+
+    async def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        return await self._call("reserve", product, warehouse, quantity)
+
+    async def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        return await self._call("release", product, warehouse, quantity)
+
+    async def list(self):
+        return await self._call("list")
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[StockItem]:
+        return self._iterate("iter_all", chunk_size=chunk_size)
+
+class AsyncSqlAlchemyStockMovementRepository(_RunSync, AsyncStockMovementRepository):
+    async def add(self, movement: StockMovement):
+        return await self._call("add", movement)
+
+    async def add_many(self, movements: List[StockMovement]):
+        return await self._call("add_many", movements)
+
+    async def get(self, movement_id: int) -> StockMovement:
+        return await self._call("get", movement_id)
+
+    async def list(self):
+        return await self._call("list")
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[StockMovement]:
+        return self._iterate("iter_all", chunk_size=chunk_size)
+
+    async def list_by_product(self, product_id: int):
+        return await self._call("list_by_product", product_id)
+
+    async def list_by_warehouse(self, warehouse_id: int):
+        return await self._call("list_by_warehouse", warehouse_id)
+
+    def iter_by_product(self, product_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[StockMovement]:
+        return self._iterate("iter_by_product", product_id, chunk_size=chunk_size)
+
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[StockMovement]:
+        return self._iterate("iter_by_warehouse", warehouse_id, chunk_size=chunk_size)
@@ -0,0 +1,133 @@
+from typing import Callable, Optional, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+from domain.services import AsyncWarehouseService, WarehouseService
+from domain.unit_of_work import AsyncUnitOfWork
+from .async_repositories import (
+    AsyncSqlAlchemyProductRepository,
+    AsyncSqlAlchemyOrderRepository,
+    AsyncSqlAlchemyWarehouseRepository,
+    AsyncSqlAlchemyStockItemRepository,
+    AsyncSqlAlchemyStockMovementRepository
+)
+from .archive import MovementArchive
+from .command_batch import AsyncSqlAlchemyCommandBatch, translate_conflicts
+from .instrumentation import Instrumentation
+from .movement_writer import MovementWriter, WriteBehindStockMovementRepository
+from .cache import (
+    AvailabilityCache, ReferenceDataCache, UnitOfWorkReferenceCache,
+    CachedProductRepository, CachedStockItemRepository, CachedWarehouseRepository
+)
+from .repositories import (
+    SqlAlchemyProductRepository,
+    SqlAlchemyOrderRepository,
+    SqlAlchemyWarehouseRepository,
+    SqlAlchemyStockItemRepository,
+    SqlAlchemyStockMovementRepository,
+    LoadingStrategy
+)
+
+T = TypeVar("T")
+
+class AsyncSqlAlchemyUnitOfWork(AsyncUnitOfWork):
+    def __init__(
+        self,
+        session: AsyncSession,
+        loading_strategy: LoadingStrategy = LoadingStrategy.JOINED,
+        reference_cache: Optional[ReferenceDataCache] = None,
+        movement_archive: Optional[MovementArchive] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        movement_writer: Optional[MovementWriter] = None,
+        availability_cache: Optional[AvailabilityCache] = None
+    ):
+        self.session = session
+        self.reference_cache = reference_cache
+        sync_session = session.sync_session
+        self._references = None
+        if reference_cache is not None:
+            reference_cache = self._references = UnitOfWorkReferenceCache(reference_cache, sync_session)
+        products = SqlAlchemyProductRepository(sync_session)
+        warehouses = SqlAlchemyWarehouseRepository(sync_session)
+        if reference_cache is not None:
+            products = CachedProductRepository(products, reference_cache)
+            warehouses = CachedWarehouseRepository(warehouses, reference_cache)
+        orders = SqlAlchemyOrderRepository(sync_session)
+        stock_items = SqlAlchemyStockItemRepository(sync_session, loading_strategy, reference_cache)
+        self._availability = None
+        if availability_cache is not None:
+            stock_items = self._availability = CachedStockItemRepository(stock_items, availability_cache)
+        stock_movements = SqlAlchemyStockMovementRepository(
+            sync_session, loading_strategy, reference_cache, movement_archive
+        )
+        self._write_behind = None
+        if movement_writer is not None:
+            stock_movements = self._write_behind = WriteBehindStockMovementRepository(
+                stock_movements, movement_writer
+            )
+        # The wrapped repositories run inside run_sync, so their spans see the
+        # statements they issue.
+        if instrumentation is not None:
+            products = instrumentation.wrap(products, "products")
+            orders = instrumentation.wrap(orders, "orders")
+            warehouses = instrumentation.wrap(warehouses, "warehouses")
+            stock_items = instrumentation.wrap(stock_items, "stock_items")
+            stock_movements = instrumentation.wrap(stock_movements, "stock_movements")
+        self._service = WarehouseService(products, orders, warehouses, stock_items, stock_movements)
+        self.products = AsyncSqlAlchemyProductRepository(session, products)
+        self.orders = AsyncSqlAlchemyOrderRepository(session, orders)
+        self.warehouses = AsyncSqlAlchemyWarehouseRepository(session, warehouses)
+        self.stock_items = AsyncSqlAlchemyStockItemRepository(session, stock_items)
+        self.stock_movements = AsyncSqlAlchemyStockMovementRepository(session, stock_movements)
+        self._committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None or not self._committed:
+            await self.rollback()
+        if self._references is not None:
+            self._references.close()
+        await self.session.close()
+
+    async def commit(self):
+        try:
+            with translate_conflicts():
+                if self._write_behind is not None:
+                    await self.session.run_sync(lambda _: self._write_behind.prepare())
+                await self.session.commit()
+        except Exception:
+            if self._write_behind is not None:
+                self._write_behind.discard()
+            raise
+        self._committed = True
+        if self._availability is not None:
+            self._availability.commit()
+        if self._write_behind is not None:
+            self._write_behind.submit()
+        if self._references is not None:
+            self._references.commit()
+
+    # Runs fn against the synchronous repositories on the session's
+    # connection, as the async repositories do for each of their calls.
+    async def run_sync(self, fn: Callable[[], T]) -> T:
+        return await self.session.run_sync(lambda _: fn())
+
+    def warehouse_service(self) -> AsyncWarehouseService:
+        return AsyncWarehouseService(self._service, self.run_sync)
+
+    async def flush(self):
+        with translate_conflicts():
+            await self.session.flush()
+
+    def batch(self, all_or_nothing: bool = False, lock: bool = False) -> AsyncSqlAlchemyCommandBatch:
+        return AsyncSqlAlchemyCommandBatch(self.session, all_or_nothing, lock)
+
+    async def rollback(self):
+        if self._references is not None:
+            self._references.rollback()
+        await self.session.rollback()
+        self._committed = False
+        if self._write_behind is not None:
+            self._write_behind.discard()
+        if self._availability is not None:
+            self._availability.rollback()
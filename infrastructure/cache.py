@@ -0,0 +1,286 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from domain.models import Product, Warehouse, StockItem, ReceiptLine
+from domain.repositories import ProductRepository, WarehouseRepository, StockItemRepository
+from .orm import ProductORM, WarehouseORM
+
+_MISSING = object()
+
+class LRUCache:
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value) -> None:
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], object]):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+class ReferenceDataCache:
+    def __init__(self, maxsize: int = 10_000, ttl: Optional[float] = 300.0):
+        self.products = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.warehouses = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def product(self, product_id: int, build: Callable[[], Product]) -> Product:
+        return self.products.get_or_load(product_id, build)
+
+    def warehouse(self, warehouse_id: Optional[int], build: Callable[[], Warehouse]) -> Optional[Warehouse]:
+        if warehouse_id is None:
+            return None
+        return self.warehouses.get_or_load(warehouse_id, build)
+
+    def invalidate(self, product_ids=(), warehouse_ids=()) -> None:
+        for product_id in product_ids:
+            self.products.invalidate(product_id)
+        for warehouse_id in warehouse_ids:
+            self.warehouses.invalidate(warehouse_id)
+
+    def stats(self) -> dict:
+        return {"products": self.products.stats(), "warehouses": self.warehouses.stats()}
+
+# One unit of work's view of a ReferenceDataCache. Products and warehouses the
+# unit of work has added, changed or deleted are built from its own session
+# and never stored, so uncommitted values cannot reach other readers, and
+# they are invalidated when it commits or rolls back.
+class UnitOfWorkReferenceCache:
+    def __init__(self, cache: ReferenceDataCache, session: Session):
+        self.cache = cache
+        self.session = session
+        self.changed_products = set()
+        self.changed_warehouses = set()
+        event.listen(session, "after_flush", self._track_changes)
+
+    def product(self, product_id: int, build: Callable[[], Product]) -> Product:
+        return self._get(self.cache.products, self.changed_products, product_id, build)
+
+    def warehouse(self, warehouse_id: Optional[int], build: Callable[[], Warehouse]) -> Optional[Warehouse]:
+        if warehouse_id is None:
+            return None
+        return self._get(self.cache.warehouses, self.changed_warehouses, warehouse_id, build)
+
+    def commit(self) -> None:
+        self.cache.invalidate(self.changed_products, self.changed_warehouses)
+        self.changed_products.clear()
+        self.changed_warehouses.clear()
+
+    # Runs before the session rolls back, while its unflushed changes are
+    # still visible.
+    def rollback(self) -> None:
+        self._track_changes(self.session)
+        self.commit()
+
+    def close(self) -> None:
+        event.remove(self.session, "after_flush", self._track_changes)
+
+    def _get(self, cache: LRUCache, changed: set, key: int, build):
+        if key in changed:
+            return build()
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            # Building can autoflush this unit of work's changes to the row.
+            if key not in changed:
+                cache.put(key, value)
+        return value
+
+    def _track_changes(self, session, flush_context=None):
+        for instance in chain(session.new, session.dirty, session.deleted):
+            if instance.id is None:
+                continue
+            if isinstance(instance, ProductORM):
+                self.changed_products.add(instance.id)
+            elif isinstance(instance, WarehouseORM):
+                self.changed_warehouses.add(instance.id)
+
+# Availability changes with every stock operation, so entries only live for
+# a short ttl and readers may see totals up to ttl seconds old.
+class AvailabilityCache:
+    def __init__(self, maxsize: int = 100_000, ttl: float = 1.0):
+        self.products = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def available(self, product_ids: List[int], load: Callable[[List[int]], Dict[int, int]]) -> Dict[int, int]:
+        available = {product_id: self.products.get(product_id, _MISSING) for product_id in product_ids}
+        missing = [product_id for product_id, value in available.items() if value is _MISSING]
+        if missing:
+            loaded = load(missing)
+            for product_id in missing:
+                available[product_id] = loaded[product_id]
+                self.products.put(product_id, loaded[product_id])
+        return available
+
+    def invalidate(self, product_ids=()) -> None:
+        for product_id in product_ids:
+            self.products.invalidate(product_id)
+
+    def stats(self) -> dict:
+        return self.products.stats()
+
+class CachedProductRepository(ProductRepository):
+    def __init__(self, repository: ProductRepository, cache: ReferenceDataCache):
+        self.repository = repository
+        self.cache = cache
+
+    def add(self, product: Product):
+        self.repository.add(product)
+
+    def get(self, product_id: int) -> Product:
+        return self.cache.product(product_id, lambda: self.repository.get(product_id))
+
+    def list(self) -> List[Product]:
+        return self.repository.list()
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Product]:
+        return self.repository.iter_all(chunk_size)
+
+class CachedWarehouseRepository(WarehouseRepository):
+    def __init__(self, repository: WarehouseRepository, cache: ReferenceDataCache):
+        self.repository = repository
+        self.cache = cache
+
+    def add(self, warehouse: Warehouse):
+        self.repository.add(warehouse)
+
+    def get(self, warehouse_id: int) -> Warehouse:
+        return self.cache.warehouse(warehouse_id, lambda: self.repository.get(warehouse_id))
+
+    def list(self) -> List[Warehouse]:
+        return self.repository.list()
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Warehouse]:
+        return self.repository.iter_all(chunk_size)
+
+    def get_occupancy(self, warehouse_id: int) -> int:
+        return self.repository.get_occupancy(warehouse_id)
+
+    def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        return self.repository.occupy(warehouse_id, quantity)
+
+    def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        return self.repository.vacate(warehouse_id, quantity)
+
+    def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        return self.repository.transfer_occupancy(source_id, destination_id, quantity)
+
+# Products this unit of work has changed are read past the cache, so its
+# uncommitted totals never reach other readers, and are invalidated when it
+# commits. Changes made through command batches are only picked up by ttl.
+class CachedStockItemRepository(StockItemRepository):
+    def __init__(self, repository: StockItemRepository, cache: AvailabilityCache):
+        self.repository = repository
+        self.cache = cache
+        self.changed_products = set()
+
+    def add(self, stock_item: StockItem):
+        self.changed_products.add(stock_item.product.id)
+        self.repository.add(stock_item)
+
+    def get(self, stock_item_id: int) -> StockItem:
+        return self.repository.get(stock_item_id)
+
+    def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
+        return self.repository.get_by_product_and_warehouse(product_id, warehouse_id)
+
+    def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        return self.repository.list_available(product_ids)
+
+    def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        if self.changed_products.isdisjoint(product_ids):
+            return self.cache.available(product_ids, self.repository.available_by_product)
+        return self.repository.available_by_product(product_ids)
+
+    def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        return self.repository.available_by_warehouse(warehouse_ids)
+
+    def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        return self.repository.available_by_location(product_ids)
+
+    def receive_batch(self, lines: List[ReceiptLine]):
+        self.changed_products.update(line.product.id for line in lines)
+        self.repository.receive_batch(lines)
+
+    def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        self.changed_products.add(product.id)
+        return self.repository.deposit(product, warehouse, quantity)
+
+    def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        self.changed_products.add(product.id)
+        return self.repository.withdraw(product, warehouse, quantity)
+
+    def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        self.changed_products.add(product.id)
+        return self.repository.reserve(product, warehouse, quantity)
+
+    def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        self.changed_products.add(product.id)
+        return self.repository.release(product, warehouse, quantity)
+
+    def list(self) -> List[StockItem]:
+        return self.repository.list()
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockItem]:
+        return self.repository.iter_all(chunk_size)
+
+    def commit(self) -> None:
+        self.cache.invalidate(self.changed_products)
+        self.changed_products.clear()
+
+    def rollback(self) -> None:
+        self.changed_products.clear()
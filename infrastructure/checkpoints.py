@@ -0,0 +1,19 @@
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Connection
+from .orm import JournalCheckpointORM
+
+def read_checkpoint(connection: Connection, name: str) -> int:
+    sequence = connection.scalar(
+        select(JournalCheckpointORM.sequence).where(JournalCheckpointORM.journal == name)
+    )
+    return sequence or 0
+
+def write_checkpoint(connection: Connection, name: str, sequence: int) -> None:
+    result = connection.execute(
+        update(JournalCheckpointORM).where(JournalCheckpointORM.journal == name).values(sequence=sequence)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(JournalCheckpointORM).values(journal=name, sequence=sequence))
+
+def delete_checkpoint(connection: Connection, name: str) -> None:
+    connection.execute(delete(JournalCheckpointORM).where(JournalCheckpointORM.journal == name))
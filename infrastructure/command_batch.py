@@ -0,0 +1,219 @@
+from contextlib import contextmanager
+from typing import List
+from sqlalchemy import bindparam, false, insert, select, tuple_, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from domain.exceptions import ConcurrencyConflict
+from domain.commands import CommandBatch, CommandResult
+from domain.models import StockItem
+from .orm import StockItemORM, StockMovementORM, WarehouseORM, WarehouseOccupancyORM
+from .repositories import IN_CLAUSE_CHUNK_SIZE, UPSERT_INSERTS
+
+# Optimistic version checks fail while the session flushes, which units of
+# work and batches expose as ConcurrencyConflict so retry_on_conflict sees it.
+@contextmanager
+def translate_conflicts():
+    try:
+        yield
+    except StaleDataError as error:
+        raise ConcurrencyConflict(str(error)) from error
+
+# SQLite has no row locks. An UPDATE that matches nothing still takes the
+# database write lock, which serialises locking batches the same way.
+def _lock_database(session: Session):
+    if session.get_bind().dialect.name == "sqlite":
+        session.execute(update(StockItemORM.__table__).where(false()).values(version=StockItemORM.__table__.c.version))
+
+def _load_stock_items(session: Session, batch: CommandBatch, lock: bool = False):
+    products = {}
+    warehouses = {}
+    for command in batch.commands:
+        products[command.product.id] = command.product
+        for warehouse in command.warehouses():
+            warehouses[warehouse.id] = warehouse
+
+    table = StockItemORM.__table__
+    keys = batch.stock_keys()
+    if lock:
+        keys.sort(key=lambda key: (key[1], key[0]))
+    rows = {}
+    for start in range(0, len(keys), IN_CLAUSE_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CLAUSE_CHUNK_SIZE]
+        statement = select(
+            table.c.id, table.c.product_id, table.c.warehouse_id,
+            table.c.quantity, table.c.reserved_quantity, table.c.version
+        ).where(tuple_(table.c.product_id, table.c.warehouse_id).in_(chunk))
+        if lock:
+            statement = statement.order_by(table.c.warehouse_id, table.c.product_id).with_for_update()
+        rows.update(((row.product_id, row.warehouse_id), row) for row in session.execute(statement))
+    stock_items = {
+        key: StockItem(
+            id=row.id,
+            product=products[key[0]],
+            warehouse=warehouses[key[1]],
+            quantity=row.quantity,
+            reserved_quantity=row.reserved_quantity
+        )
+        for key, row in rows.items()
+    }
+    return rows, stock_items
+
+def _load_occupancy(session: Session, batch: CommandBatch, lock: bool = False):
+    occupancy = WarehouseOccupancyORM.__table__
+    warehouses = WarehouseORM.__table__
+    statement = (
+        select(warehouses.c.id, warehouses.c.capacity, occupancy.c.occupied)
+        .join(occupancy, occupancy.c.warehouse_id == warehouses.c.id)
+        .where(warehouses.c.id.in_(batch.warehouse_ids()))
+        .order_by(warehouses.c.id)
+    )
+    if lock:
+        statement = statement.with_for_update(of=occupancy)
+    rows = session.execute(statement)
+    occupied = {}
+    capacity = {}
+    for row in rows:
+        occupied[row.id] = row.occupied
+        capacity[row.id] = row.capacity
+    return occupied, capacity
+
+def _write_stock_items(session: Session, rows: dict, stock_items: dict):
+    table = StockItemORM.__table__
+    updates = []
+    inserts = []
+    for key, stock_item in sorted(stock_items.items(), key=lambda item: (item[0][1], item[0][0])):
+        row = rows.get(key)
+        if row is None:
+            inserts.append({
+                "product_id": key[0], "warehouse_id": key[1],
+                "quantity": stock_item.quantity, "reserved_quantity": stock_item.reserved_quantity
+            })
+        elif (row.quantity, row.reserved_quantity) != (stock_item.quantity, stock_item.reserved_quantity):
+            updates.append({
+                "target_id": row.id, "expected_version": row.version,
+                "new_quantity": stock_item.quantity, "new_reserved_quantity": stock_item.reserved_quantity
+            })
+    if updates:
+        result = session.execute(
+            update(table)
+            .where(table.c.id == bindparam("target_id"), table.c.version == bindparam("expected_version"))
+            .values(
+                quantity=bindparam("new_quantity"),
+                reserved_quantity=bindparam("new_reserved_quantity"),
+                version=table.c.version + 1
+            ),
+            updates
+        )
+        if session.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(updates):
+            raise ConcurrencyConflict("Stock changed while the batch was applied")
+    if inserts:
+        insert_stock_items(session.connection(), inserts)
+
+# Rows that did not exist when the caller loaded cannot be locked, so another
+# writer may create them first. The caller computed them from zero, so its
+# quantities are added to that writer's; without an upsert the caller fails
+# with a conflict and can be retried.
+def insert_stock_items(connection: Connection, inserts: List[dict]):
+    table = StockItemORM.__table__
+    upsert = UPSERT_INSERTS.get(connection.dialect.name)
+    if upsert is not None:
+        statement = upsert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.product_id, table.c.warehouse_id],
+            set_={
+                "quantity": table.c.quantity + statement.excluded.quantity,
+                "reserved_quantity": table.c.reserved_quantity + statement.excluded.reserved_quantity,
+                "version": table.c.version + 1,
+            }
+        ), inserts)
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(table), inserts)
+    except IntegrityError as error:
+        raise ConcurrencyConflict("Stock items were created concurrently") from error
+
+def _apply_occupancy(session: Session, before: dict, after: dict):
+    table = WarehouseOccupancyORM.__table__
+    capacity = select(WarehouseORM.__table__.c.capacity).where(
+        WarehouseORM.__table__.c.id == table.c.warehouse_id
+    ).scalar_subquery()
+    deltas = [
+        {"target_id": warehouse_id, "delta": after[warehouse_id] - occupied}
+        for warehouse_id, occupied in before.items() if after[warehouse_id] != occupied
+    ]
+    if not deltas:
+        return
+    result = session.execute(
+        update(table)
+        .where(table.c.warehouse_id == bindparam("target_id"), table.c.occupied + bindparam("delta") <= capacity)
+        .values(occupied=table.c.occupied + bindparam("delta")),
+        deltas
+    )
+    if session.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(deltas):
+        raise ConcurrencyConflict("Warehouse occupancy changed while the batch was applied")
+
+# Loads every stock item and warehouse the batch touches up front, applies the
+# commands in memory and writes the outcome back in a fixed number of
+# statements, however many commands the batch holds.
+#
+# Occupancy rows are written before stock rows, each in warehouse id order,
+# the same order WarehouseService takes them in, so batches and service calls
+# touching the same warehouses in opposite directions queue behind each other
+# instead of deadlocking. With lock=True the rows are already locked in that
+# order as they are loaded.
+def execute_batch(session: Session, batch: CommandBatch, lock: bool = False) -> List[CommandResult]:
+    if not batch.commands:
+        return []
+    session.flush()
+    if lock:
+        _lock_database(session)
+    occupied, capacity = _load_occupancy(session, batch, lock)
+    rows, stock_items = _load_stock_items(session, batch, lock)
+    after = dict(occupied)
+    results = batch.apply(stock_items, after, capacity)
+    movements = [result.movement for result in results if result.applied]
+    if not movements:
+        return results
+
+    _apply_occupancy(session, occupied, after)
+    _write_stock_items(session, rows, stock_items)
+    session.execute(insert(StockMovementORM.__table__), [
+        {
+            "product_id": movement.product.id,
+            "source_warehouse_id": movement.source_warehouse and movement.source_warehouse.id,
+            "destination_warehouse_id": movement.destination_warehouse and movement.destination_warehouse.id,
+            "quantity": movement.quantity,
+            "movement_type": movement.movement_type,
+            "timestamp": movement.timestamp,
+        }
+        for movement in movements
+    ])
+    return results
+
+class SqlAlchemyCommandBatch(CommandBatch):
+    def __init__(self, session: Session, all_or_nothing: bool = False, lock: bool = False):
+        super().__init__(all_or_nothing)
+        self.session = session
+        self.lock = lock
+
+    def execute(self) -> List[CommandResult]:
+        with translate_conflicts():
+            results = execute_batch(self.session, self, self.lock)
+        self.commands = []
+        return results
+
+class AsyncSqlAlchemyCommandBatch(CommandBatch):
+    def __init__(self, session: AsyncSession, all_or_nothing: bool = False, lock: bool = False):
+        super().__init__(all_or_nothing)
+        self.session = session
+        self.lock = lock
+
+    async def execute(self) -> List[CommandResult]:
+        with translate_conflicts():
+            results = await self.session.run_sync(execute_batch, self, self.lock)
+        self.commands = []
+        return results
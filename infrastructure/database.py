@@ -1,6 +1,100 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from .migrations import upgrade_columns, upgrade_indexes, upgrade_occupancy
 from .orm import Base
 
-DATABASE_URL= 'sqllite://warehouse.db'
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///warehouse.db")
 
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "busy_timeout": 30_000,
+}
+
+def _engine_options(
+    url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: int,
+    pool_pre_ping: bool
+) -> dict:
+    database_url = make_url(url)
+    options = {"pool_pre_ping": pool_pre_ping, "pool_recycle": pool_recycle}
+    if database_url.get_backend_name() == "sqlite":
+        if database_url.database in (None, "", ":memory:"):
+            return options
+        options["connect_args"] = {"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000}
+    options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+    return options
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, object]) -> None:
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_engine_for(
+    url: str = DATABASE_URL,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    sqlite_pragmas: Optional[Dict[str, object]] = None
+) -> Engine:
+    engine = create_engine(
+        url, **_engine_options(url, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping)
+    )
+    if engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(engine, SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    return engine
+
+def create_async_engine_for(
+    url: str,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    sqlite_pragmas: Optional[Dict[str, object]] = None
+) -> AsyncEngine:
+    engine = create_async_engine(
+        url, **_engine_options(url, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping)
+    )
+    if engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(engine.sync_engine, SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    return engine
+
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+@contextmanager
+def session_scope(session_factory: sessionmaker) -> Iterator[Session]:
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def create_schema(engine: Engine) -> None:
+    Base.metadata.create_all(engine)
+    upgrade_columns(engine)
+    upgrade_indexes(engine)
+    upgrade_occupancy(engine)
+
+if __name__ == "__main__":
+    create_schema(create_engine_for())
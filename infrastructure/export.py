@@ -0,0 +1,208 @@
+import argparse
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy import String, create_engine, or_, select, type_coerce
+from sqlalchemy.orm import Session
+from .archive import MovementArchive
+from .orm import StockItemORM, StockMovementORM
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_SIZE = 50_000
+STOCK_COLUMNS = ("id", "product_id", "warehouse_id", "quantity", "reserved_quantity")
+MOVEMENT_COLUMNS = (
+    "id", "product_id", "source_warehouse_id", "destination_warehouse_id",
+    "quantity", "movement_type", "timestamp"
+)
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".arrow": "arrow", ".feather": "arrow"}
+
+def _arrow_type(column: str):
+    if column == "movement_type":
+        return pyarrow.string()
+    if column == "timestamp":
+        return pyarrow.timestamp("us")
+    return pyarrow.int64()
+
+class _CsvWriter:
+    def __init__(self, path: Path, columns: Sequence[str]):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows: List[tuple]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+class _JsonlWriter:
+    def __init__(self, path: Path, columns: Sequence[str]):
+        self.file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+        self.encode = json.JSONEncoder(default=str).encode
+
+    def write(self, rows: List[tuple]) -> None:
+        columns, encode = self.columns, self.encode
+        self.file.write("".join(encode(dict(zip(columns, row))) + "\n" for row in rows))
+
+    def close(self) -> None:
+        self.file.close()
+
+# Values are converted column by column with Arrow casts, which also parse
+# the timestamp strings SQLite returns.
+class _ArrowWriter:
+    def __init__(self, path: Path, columns: Sequence[str]):
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for Arrow exports")
+        self.schema = pyarrow.schema([(c, _arrow_type(c)) for c in columns])
+        self.writer = pyarrow.ipc.new_file(str(path), self.schema)
+
+    def write(self, rows: List[tuple]) -> None:
+        arrays = [
+            pyarrow.array(values).cast(field.type)
+            for field, values in zip(self.schema, zip(*rows))
+        ]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "arrow": _ArrowWriter}
+
+def _format_of(path: Path, format: Optional[str]) -> str:
+    if format is None:
+        format = FORMATS.get(path.suffix)
+        if format is None:
+            raise ValueError(f"Cannot infer the export format of {path}, expected one of {sorted(FORMATS)}")
+    if format not in WRITERS:
+        raise ValueError(f"Unknown export format {format!r}, expected one of {sorted(WRITERS)}")
+    return format
+
+def _write(path, format: Optional[str], columns: Sequence[str], partitions: Iterator[List[tuple]]) -> int:
+    path = Path(path)
+    writer = WRITERS[_format_of(path, format)](path, columns)
+    count = 0
+    try:
+        for rows in partitions:
+            if rows:
+                writer.write(rows)
+                count += len(rows)
+    finally:
+        writer.close()
+    return count
+
+# Rows are streamed from a server-side cursor in chunks. Enum and timestamp
+# columns are read uncoerced, as in analytics, so no Python object is built
+# per value.
+def _stream(session: Session, statement, chunk_size: int) -> Iterator[List[tuple]]:
+    session.flush()
+    result = session.connection().execute(
+        statement.execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    yield from result.partitions(chunk_size)
+
+def export_stock_items(
+    session: Session,
+    path,
+    format: Optional[str] = None,
+    product_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> int:
+    statement = select(*(StockItemORM.__table__.c[c] for c in STOCK_COLUMNS)).order_by(StockItemORM.id)
+    if product_id is not None:
+        statement = statement.where(StockItemORM.product_id == product_id)
+    if warehouse_id is not None:
+        statement = statement.where(StockItemORM.warehouse_id == warehouse_id)
+    return _write(path, format, STOCK_COLUMNS, _stream(session, statement, chunk_size))
+
+def _archived(
+    archive: MovementArchive,
+    product_id: Optional[int],
+    warehouse_id: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    chunk_size: int
+) -> Iterator[List[tuple]]:
+    rows = []
+    for row in archive.read(product_id=product_id, warehouse_id=warehouse_id, since=since, until=until):
+        timestamp = row["timestamp"]
+        rows.append((
+            row["id"], row["product_id"], row["source_warehouse_id"], row["destination_warehouse_id"],
+            row["quantity"], row["movement_type"].name, timestamp.isoformat(sep=" ", timespec="microseconds")
+        ))
+        if len(rows) == chunk_size:
+            yield rows
+            rows = []
+    yield rows
+
+# Archived movements are older than the ones in the table, so they are
+# written first, as SqlAlchemyStockMovementRepository.iter_history() returns
+# them. Only the archive months overlapping since and until are read.
+def export_movements(
+    session: Session,
+    path,
+    format: Optional[str] = None,
+    product_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    archive: Optional[MovementArchive] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> int:
+    table = StockMovementORM.__table__
+    statement = select(*(
+        type_coerce(table.c[c], String) if c in ("movement_type", "timestamp") else table.c[c]
+        for c in MOVEMENT_COLUMNS
+    )).order_by(table.c.id)
+    if product_id is not None:
+        statement = statement.where(table.c.product_id == product_id)
+    if warehouse_id is not None:
+        statement = statement.where(or_(
+            table.c.source_warehouse_id == warehouse_id,
+            table.c.destination_warehouse_id == warehouse_id
+        ))
+    if since is not None:
+        statement = statement.where(table.c.timestamp >= since)
+    if until is not None:
+        statement = statement.where(table.c.timestamp < until)
+
+    def partitions():
+        if archive is not None:
+            yield from _archived(archive, product_id, warehouse_id, since, until, chunk_size)
+        yield from _stream(session, statement, chunk_size)
+    return _write(path, format, MOVEMENT_COLUMNS, partitions())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export stock items or movements to CSV, JSONL or Arrow")
+    parser.add_argument("database_url")
+    parser.add_argument("table", choices=["stock", "movements"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(WRITERS))
+    parser.add_argument("--product", type=int)
+    parser.add_argument("--warehouse", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--archive", help="directory of archived movements to include")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with Session(create_engine(args.database_url)) as session:
+        if args.table == "stock":
+            count = export_stock_items(
+                session, args.path, args.format, args.product, args.warehouse, args.chunk_size
+            )
+        else:
+            archive = MovementArchive(args.archive) if args.archive else None
+            count = export_movements(
+                session, args.path, args.format, args.product, args.warehouse,
+                args.since, args.until, archive, args.chunk_size
+            )
+    print(f"Exported {count} rows to {args.path}")
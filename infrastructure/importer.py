@@ -0,0 +1,313 @@
+import argparse
+import csv
+import json
+import math
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import bindparam, create_engine, insert, select, tuple_, update
+from sqlalchemy.engine import Connection, Engine
+from domain.exceptions import ConcurrencyConflict
+from domain.models import MovementType
+from .command_batch import insert_stock_items
+from .checkpoints import delete_checkpoint, read_checkpoint, write_checkpoint
+from .orm import ProductORM, StockItemORM, StockMovementORM, WarehouseORM, WarehouseOccupancyORM
+
+IMPORT_CHUNK_SIZE = 20_000
+LOOKUP_CHUNK_SIZE = 500
+PRODUCT_COLUMNS = ("name", "quantity", "price")
+STOCK_COLUMNS = ("product_id", "warehouse_id", "quantity")
+
+@dataclass
+class RejectedRow:
+    row: int
+    error: str
+    record: object
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    skipped: int = 0
+    rejected: List[RejectedRow] = field(default_factory=list)
+
+# Records are (row, raw) pairs, where raw is a list of CSV fields or a JSONL
+# line. Parsing happens in the validation workers, not in the reader.
+def read_records(path: Path, skip: int = 0) -> Tuple[Optional[List[str]], Iterator[Tuple[int, object]]]:
+    source = open(path, newline="", encoding="utf-8")
+    if path.suffix == ".jsonl":
+        lines = (line for line in source if line.strip())
+        header = None
+    else:
+        lines = csv.reader(source)
+        header = next(lines, [])
+
+    def records():
+        with source:
+            for row, raw in enumerate(lines, start=1):
+                if row > skip:
+                    yield row, raw
+    return header, records()
+
+def _fields(header: Optional[List[str]], raw) -> dict:
+    if header is None:
+        record = json.loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError("Record must be an object")
+        return record
+    if len(raw) != len(header):
+        raise ValueError(f"Expected {len(header)} fields, got {len(raw)}")
+    return dict(zip(header, raw))
+
+def _integer(record: dict, name: str, minimum: int) -> int:
+    value = record.get(name)
+    if value is None or value == "":
+        raise ValueError(f"Missing {name}")
+    if isinstance(value, float) and not value.is_integer() or isinstance(value, bool):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {value!r}") from None
+    if number < minimum:
+        raise ValueError(f"{name.capitalize()} must be at least {minimum}")
+    return number
+
+def _product(record: dict) -> dict:
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("Missing name")
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid price: {record.get('price')!r}") from None
+    if not math.isfinite(price):
+        raise ValueError(f"Invalid price: {record.get('price')!r}")
+    if price < 0:
+        raise ValueError("Price must not be negative")
+    return {"name": name.strip(), "quantity": _integer(record, "quantity", 0), "price": price}
+
+def _stock(record: dict) -> dict:
+    return {
+        "product_id": _integer(record, "product_id", 1),
+        "warehouse_id": _integer(record, "warehouse_id", 1),
+        "quantity": _integer(record, "quantity", 1),
+    }
+
+VALIDATORS: Dict[str, Callable[[dict], dict]] = {"products": _product, "stock": _stock}
+
+# Runs in the worker processes, so it only takes and returns picklable data.
+def validate_chunk(kind: str, header: Optional[List[str]], chunk: List[Tuple[int, object]]):
+    validate = VALIDATORS[kind]
+    valid, errors = [], []
+    for row, raw in chunk:
+        try:
+            valid.append((row, validate(_fields(header, raw))))
+        except ValueError as error:
+            errors.append(RejectedRow(row, str(error), raw))
+    return chunk[-1][0], valid, errors
+
+def _chunks(records: Iterator[Tuple[int, object]], size: int) -> Iterator[List[Tuple[int, object]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Keeps at most two chunks per worker in flight, so memory stays bounded
+# however large the input is, and yields results in input order.
+def _validated(kind, header, chunks, workers: int):
+    if workers <= 1:
+        for chunk in chunks:
+            yield validate_chunk(kind, header, chunk)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(validate_chunk, kind, header, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _lookup(keys) -> Iterator[list]:
+    keys = sorted(keys)
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        yield keys[start:start + LOOKUP_CHUNK_SIZE]
+
+def _write_products(connection: Connection, rows: List[Tuple[int, dict]]) -> List[RejectedRow]:
+    if rows:
+        connection.execute(insert(ProductORM.__table__), [values for _, values in rows])
+    return []
+
+# Stock rows are deposits, like WarehouseService.add_stock_to_warehouse: they
+# add to an existing stock item, occupy warehouse capacity and record a
+# receipt movement. Rows that do not fit are rejected in input order.
+def _write_stock(connection: Connection, rows: List[Tuple[int, dict]]) -> List[RejectedRow]:
+    if not rows:
+        return []
+    product_ids = {values["product_id"] for _, values in rows}
+    warehouse_ids = {values["warehouse_id"] for _, values in rows}
+    known_products = set()
+    for keys in _lookup(product_ids):
+        known_products.update(connection.scalars(select(ProductORM.id).where(ProductORM.id.in_(keys))))
+    # Occupancy rows are locked and updated in warehouse id order before any
+    # stock row, the order every other writer takes them in.
+    free = {}
+    for keys in _lookup(warehouse_ids):
+        free.update(connection.execute(
+            select(WarehouseORM.id, WarehouseORM.capacity - WarehouseOccupancyORM.occupied)
+            .join(WarehouseOccupancyORM, WarehouseOccupancyORM.warehouse_id == WarehouseORM.id)
+            .where(WarehouseORM.id.in_(keys))
+            .order_by(WarehouseORM.id)
+            .with_for_update(of=WarehouseOccupancyORM)
+        ).all())
+
+    errors = []
+    deposits = defaultdict(int)
+    occupied = defaultdict(int)
+    for row, values in rows:
+        product_id, warehouse_id, quantity = values["product_id"], values["warehouse_id"], values["quantity"]
+        if product_id not in known_products:
+            errors.append(RejectedRow(row, f"Product {product_id} not found", values))
+        elif warehouse_id not in free:
+            errors.append(RejectedRow(row, f"Warehouse {warehouse_id} not found", values))
+        elif quantity > free[warehouse_id]:
+            errors.append(RejectedRow(row, f"Not enough capacity in warehouse {warehouse_id}", values))
+        else:
+            free[warehouse_id] -= quantity
+            occupied[warehouse_id] += quantity
+            deposits[(product_id, warehouse_id)] += quantity
+    if not deposits:
+        return errors
+
+    occupancy = WarehouseOccupancyORM.__table__
+    capacity = select(WarehouseORM.__table__.c.capacity).where(
+        WarehouseORM.__table__.c.id == occupancy.c.warehouse_id
+    ).scalar_subquery()
+    result = connection.execute(
+        update(occupancy)
+        .where(
+            occupancy.c.warehouse_id == bindparam("key_warehouse_id"),
+            occupancy.c.occupied + bindparam("delta") <= capacity
+        )
+        .values(occupied=occupancy.c.occupied + bindparam("delta")),
+        [{"key_warehouse_id": w, "delta": q} for w, q in occupied.items()]
+    )
+    if connection.dialect.supports_sane_multi_rowcount and result.rowcount != len(occupied):
+        raise ConcurrencyConflict("Warehouse occupancy changed while the chunk was imported")
+    stock_items = StockItemORM.__table__
+    existing = set()
+    for keys in _lookup(deposits):
+        existing.update(connection.execute(
+            select(stock_items.c.product_id, stock_items.c.warehouse_id)
+            .where(tuple_(stock_items.c.product_id, stock_items.c.warehouse_id).in_(keys))
+        ).all())
+    updates = [
+        {"key_product_id": p, "key_warehouse_id": w, "delta": q}
+        for (p, w), q in deposits.items() if (p, w) in existing
+    ]
+    inserts = [
+        {"product_id": p, "warehouse_id": w, "quantity": q, "reserved_quantity": 0}
+        for (p, w), q in deposits.items() if (p, w) not in existing
+    ]
+    if updates:
+        connection.execute(
+            update(stock_items)
+            .where(
+                stock_items.c.product_id == bindparam("key_product_id"),
+                stock_items.c.warehouse_id == bindparam("key_warehouse_id")
+            )
+            .values(quantity=stock_items.c.quantity + bindparam("delta"), version=stock_items.c.version + 1),
+            updates
+        )
+    if inserts:
+        insert_stock_items(connection, inserts)
+    timestamp = datetime.now()
+    connection.execute(insert(StockMovementORM.__table__), [
+        {"product_id": p, "source_warehouse_id": None, "destination_warehouse_id": w,
+         "quantity": q, "movement_type": MovementType.RECEIPT, "timestamp": timestamp}
+        for (p, w), q in deposits.items()
+    ])
+    return errors
+
+WRITERS = {"products": _write_products, "stock": _write_stock}
+
+def _report(path: Path, rejected: List[RejectedRow]) -> None:
+    with open(path, "a", newline="", encoding="utf-8") as report:
+        writer = csv.writer(report)
+        if report.tell() == 0:
+            writer.writerow(["row", "error", "record"])
+        for r in rejected:
+            record = r.record.rstrip("\n") if isinstance(r.record, str) else json.dumps(r.record)
+            writer.writerow([r.row, r.error, record])
+
+# Each chunk commits in its own transaction together with the number of the
+# last row it covers, so an interrupted import resumes after the last
+# committed chunk. The checkpoint is keyed by the file's path, size and
+# modification time, so a new file dropped under the same name starts from
+# the top, and it is deleted once the file is done. Rejected rows are
+# appended to error_report as CSV.
+def import_file(
+    engine: Engine,
+    kind: str,
+    path,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    workers: int = 1,
+    error_report=None,
+    restart: bool = False
+) -> ImportResult:
+    if kind not in WRITERS:
+        raise ValueError(f"Unknown import kind {kind!r}, expected one of {sorted(WRITERS)}")
+    path = Path(path)
+    stat = path.stat()
+    checkpoint_name = f"import:{kind}:{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    with engine.begin() as connection:
+        done = 0 if restart else read_checkpoint(connection, checkpoint_name)
+
+    header, records = read_records(path, skip=done)
+    if header is not None:
+        expected = PRODUCT_COLUMNS if kind == "products" else STOCK_COLUMNS
+        missing = [column for column in expected if column not in header]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+
+    result = ImportResult(skipped=done)
+    for last_row, valid, errors in _validated(kind, header, _chunks(records, chunk_size), workers):
+        with engine.begin() as connection:
+            conflicts = WRITERS[kind](connection, valid)
+            write_checkpoint(connection, checkpoint_name, last_row)
+        rejected = sorted(errors + conflicts, key=lambda r: r.row)
+        result.rows = last_row - done
+        result.imported += len(valid) - len(conflicts)
+        result.rejected.extend(rejected)
+        if error_report is not None and rejected:
+            _report(Path(error_report), rejected)
+    with engine.begin() as connection:
+        delete_checkpoint(connection, checkpoint_name)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import products or opening stock from CSV or JSONL")
+    parser.add_argument("database_url")
+    parser.add_argument("kind", choices=sorted(WRITERS))
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--errors", help="append rejected rows to this CSV file")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    result = import_file(
+        create_engine(args.database_url), args.kind, args.path,
+        chunk_size=args.chunk_size, workers=args.workers, error_report=args.errors, restart=args.restart
+    )
+    print(f"Imported {result.imported} of {result.rows} rows, {len(result.rejected)} rejected")
+    if result.skipped:
+        print(f"Skipped {result.skipped} rows committed by a previous run")
@@ -0,0 +1,225 @@
+import inspect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SAMPLES = 1024
+
+_active: ContextVar[Tuple["_Span", ...]] = ContextVar("instrumentation_spans", default=())
+
+@dataclass(slots=True)
+class OperationStats:
+    name: str
+    calls: int
+    errors: int
+    statements: int
+    results: int
+    db_seconds: float
+    python_seconds: float
+    p50_ms: float
+    p99_ms: float
+
+class _Span:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+class _Operation:
+    __slots__ = ("lock", "calls", "errors", "statements", "results", "db_seconds", "total_seconds", "samples", "position")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.statements = 0
+        self.results = 0
+        self.db_seconds = 0.0
+        self.total_seconds = 0.0
+        self.samples = []
+        self.position = 0
+
+    def record(self, span: _Span, elapsed: float, results: int, failed: bool) -> None:
+        with self.lock:
+            self.calls += 1
+            self.errors += failed
+            self.statements += span.statements
+            self.results += results
+            self.db_seconds += span.db_seconds
+            self.total_seconds += elapsed
+            if len(self.samples) < SAMPLES:
+                self.samples.append(elapsed)
+            else:
+                self.samples[self.position] = elapsed
+                self.position = (self.position + 1) % SAMPLES
+
+    def stats(self, name: str) -> OperationStats:
+        with self.lock:
+            samples = sorted(self.samples)
+            return OperationStats(
+                name=name,
+                calls=self.calls,
+                errors=self.errors,
+                statements=self.statements,
+                results=self.results,
+                db_seconds=self.db_seconds,
+                python_seconds=self.total_seconds - self.db_seconds,
+                p50_ms=_percentile(samples, 0.50) * 1e3,
+                p99_ms=_percentile(samples, 0.99) * 1e3,
+            )
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def _results(result) -> int:
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+class LoggingExporter:
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("warehouse.metrics")
+        self.level = level
+
+    def __call__(self, stats: List[OperationStats]) -> None:
+        for s in stats:
+            self.logger.log(
+                self.level,
+                "%s calls=%d errors=%d statements=%d results=%d db=%.3fs python=%.3fs p50=%.2fms p99=%.2fms",
+                s.name, s.calls, s.errors, s.statements, s.results, s.db_seconds, s.python_seconds, s.p50_ms, s.p99_ms
+            )
+
+# Statements are attributed to every operation active on the current thread
+# or task, so a service call includes the statements of the repository calls
+# it makes. Results count the objects an operation returned or yielded, not
+# database rows. Latencies keep the most recent SAMPLES calls per operation.
+class Instrumentation:
+    def __init__(self, exporter: Optional[Callable[[List[OperationStats]], None]] = None):
+        self.exporter = exporter or LoggingExporter()
+        self._operations: Dict[str, _Operation] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def detach(self, engine: Engine) -> None:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            return
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def wrap(self, target, prefix: str):
+        return _Instrumented(self, target, prefix)
+
+    def snapshot(self) -> List[OperationStats]:
+        with self._lock:
+            operations = sorted(self._operations.items())
+        return [operation.stats(name) for name, operation in operations]
+
+    def export(self) -> None:
+        self.exporter(self.snapshot())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations = {}
+
+    def _operation(self, name: str) -> _Operation:
+        operation = self._operations.get(name)
+        if operation is None:
+            with self._lock:
+                operation = self._operations.setdefault(name, _Operation())
+        return operation
+
+    def call(self, name: str, method, args, kwargs):
+        span = _Span()
+        token = _active.set(_active.get() + (span,))
+        started = time.perf_counter()
+        failed = True
+        result = None
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            _active.reset(token)
+            self._operation(name).record(span, elapsed, _results(result), failed)
+
+    # Generators are timed while they produce items, not while the caller
+    # consumes them, and recorded once when they are exhausted or closed.
+    def iterate(self, name: str, method, args, kwargs):
+        span = _Span()
+        elapsed = 0.0
+        results = 0
+        failed = True
+        try:
+            token = _active.set(_active.get() + (span,))
+            started = time.perf_counter()
+            try:
+                iterator = iter(method(*args, **kwargs))
+            finally:
+                elapsed += time.perf_counter() - started
+                _active.reset(token)
+            while True:
+                token = _active.set(_active.get() + (span,))
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    failed = False
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                    _active.reset(token)
+                results += 1
+                yield item
+        except GeneratorExit:
+            failed = False
+            raise
+        finally:
+            self._operation(name).record(span, elapsed, results, failed)
+
+class _Instrumented:
+    def __init__(self, instrumentation: Instrumentation, target, prefix: str):
+        self._instrumentation = instrumentation
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, attribute: str):
+        value = getattr(self._target, attribute)
+        if attribute.startswith("_") or not callable(value):
+            return value
+        name = f"{self._prefix}.{attribute}"
+        instrumentation = self._instrumentation
+        if inspect.isgeneratorfunction(getattr(type(self._target), attribute, None)) or attribute.startswith("iter_"):
+            wrapper = lambda *args, **kwargs: instrumentation.iterate(name, value, args, kwargs)
+        else:
+            wrapper = lambda *args, **kwargs: instrumentation.call(name, value, args, kwargs)
+        setattr(self, attribute, wrapper)
+        return wrapper
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _active.get():
+        context.instrumentation_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = _active.get()
+    started = getattr(context, "instrumentation_started", None)
+    if not spans or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for span in spans:
+        span.statements += 1
+        span.db_seconds += elapsed
@@ -0,0 +1,204 @@
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, Integer, create_engine, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+from domain.models import MovementType
+from .archive import ARCHIVE_CHECKPOINT, MovementArchive
+from .checkpoints import read_checkpoint
+from .movement_writer import MovementWriter
+from .orm import JournalTransactionORM, StockItemORM, StockMovementORM, StockSnapshotORM
+
+@dataclass
+class StockLevel:
+    product_id: int
+    warehouse_id: int
+    quantity: int = 0
+    reserved_quantity: int = 0
+
+@dataclass
+class StockDrift:
+    product_id: int
+    warehouse_id: int
+    recorded: StockLevel
+    ledger: StockLevel
+
+# Snapshots record the last movement id, so they cannot be taken while
+# committed stock changes still have write-behind movements without ids.
+def take_snapshot(
+    session: Session,
+    taken_at: Optional[datetime] = None,
+    movement_writer: Optional[MovementWriter] = None
+) -> int:
+    if movement_writer is not None:
+        movement_writer.flush()
+    session.flush()
+    unwritten = session.scalar(select(func.count()).select_from(JournalTransactionORM))
+    if unwritten:
+        raise ValueError(f"Cannot take a snapshot while {unwritten} transactions have unwritten movements")
+    taken_at = taken_at or datetime.now()
+    last_movement_id = session.scalar(select(func.coalesce(func.max(StockMovementORM.id), 0)))
+    result = session.execute(
+        insert(StockSnapshotORM).from_select(
+            ["product_id", "warehouse_id", "quantity", "reserved_quantity", "taken_at", "last_movement_id"],
+            select(
+                StockItemORM.product_id,
+                StockItemORM.warehouse_id,
+                StockItemORM.quantity,
+                StockItemORM.reserved_quantity,
+                literal(taken_at, DateTime),
+                literal(last_movement_id, Integer)
+            )
+        )
+    )
+    return result.rowcount
+
+def _adjust(levels: Dict[Tuple[int, int], StockLevel], product_id, warehouse_id, quantity=0, reserved=0) -> None:
+    key = (product_id, warehouse_id)
+    level = levels.get(key)
+    if level is None:
+        level = levels[key] = StockLevel(product_id=product_id, warehouse_id=warehouse_id)
+    level.quantity += quantity
+    level.reserved_quantity += reserved
+
+def _replay(levels: Dict[Tuple[int, int], StockLevel], movement) -> None:
+    product_id, source_id, destination_id, quantity, movement_type = movement
+    if movement_type in (MovementType.SHIPMENT, MovementType.TRANSFER):
+        _adjust(levels, product_id, source_id, quantity=-quantity)
+    if movement_type in (MovementType.RECEIPT, MovementType.TRANSFER):
+        _adjust(levels, product_id, destination_id, quantity=quantity)
+    if movement_type == MovementType.RESERVATION:
+        _adjust(levels, product_id, source_id, reserved=quantity)
+    if movement_type == MovementType.RELEASE:
+        _adjust(levels, product_id, source_id, reserved=-quantity)
+
+# A replay that starts before the archive horizon, from an older snapshot or
+# from no snapshot at all, also replays the archived movements after its
+# starting point. Without the archive it cannot be answered.
+def stock_levels_at(
+    session: Session,
+    at: datetime,
+    product_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    movement_archive: Optional[MovementArchive] = None
+) -> List[StockLevel]:
+    session.flush()
+    snapshot = session.execute(
+        select(StockSnapshotORM.taken_at, StockSnapshotORM.last_movement_id)
+        .where(StockSnapshotORM.taken_at <= at)
+        .order_by(StockSnapshotORM.taken_at.desc())
+        .limit(1)
+    ).first()
+
+    levels = {}
+    last_movement_id = 0
+    if snapshot is not None:
+        last_movement_id = snapshot.last_movement_id
+        statement = select(
+            StockSnapshotORM.product_id,
+            StockSnapshotORM.warehouse_id,
+            StockSnapshotORM.quantity,
+            StockSnapshotORM.reserved_quantity
+        ).where(StockSnapshotORM.taken_at == snapshot.taken_at)
+        if product_id is not None:
+            statement = statement.where(StockSnapshotORM.product_id == product_id)
+        if warehouse_id is not None:
+            statement = statement.where(StockSnapshotORM.warehouse_id == warehouse_id)
+        for row in session.execute(statement):
+            levels[(row.product_id, row.warehouse_id)] = StockLevel(*row)
+
+    archived_through = read_checkpoint(session.connection(), ARCHIVE_CHECKPOINT)
+    if archived_through > last_movement_id:
+        if movement_archive is None:
+            raise ValueError(
+                f"Movements up to id {archived_through} are archived; "
+                f"stock levels at {at:%Y-%m-%d %H:%M:%S} need the movement archive"
+            )
+        archived = movement_archive.read(
+            product_id=product_id, warehouse_id=warehouse_id, until=at + timedelta(microseconds=1)
+        )
+        for row in archived:
+            if row["id"] > last_movement_id:
+                _replay(levels, (
+                    row["product_id"], row["source_warehouse_id"], row["destination_warehouse_id"],
+                    row["quantity"], row["movement_type"]
+                ))
+
+    statement = (
+        select(
+            StockMovementORM.product_id,
+            StockMovementORM.source_warehouse_id,
+            StockMovementORM.destination_warehouse_id,
+            StockMovementORM.quantity,
+            StockMovementORM.movement_type
+        )
+        .where(StockMovementORM.id > last_movement_id, StockMovementORM.timestamp <= at)
+        .order_by(StockMovementORM.id)
+    )
+    if product_id is not None:
+        statement = statement.where(StockMovementORM.product_id == product_id)
+    if warehouse_id is not None:
+        statement = statement.where(or_(
+            StockMovementORM.source_warehouse_id == warehouse_id,
+            StockMovementORM.destination_warehouse_id == warehouse_id
+        ))
+    for movement in session.execute(statement):
+        _replay(levels, movement)
+
+    return [
+        level for key, level in sorted(levels.items())
+        if warehouse_id is None or key[1] == warehouse_id
+    ]
+
+def stock_level_at(
+    session: Session,
+    product_id: int,
+    warehouse_id: int,
+    at: datetime,
+    movement_archive: Optional[MovementArchive] = None
+) -> StockLevel:
+    levels = stock_levels_at(session, at, product_id, warehouse_id, movement_archive)
+    return levels[0] if levels else StockLevel(product_id=product_id, warehouse_id=warehouse_id)
+
+def audit_stock_levels(session: Session, movement_archive: Optional[MovementArchive] = None) -> List[StockDrift]:
+    ledger = {
+        (l.product_id, l.warehouse_id): l
+        for l in stock_levels_at(session, datetime.now(), movement_archive=movement_archive)
+    }
+    recorded = {
+        (row.product_id, row.warehouse_id): StockLevel(*row)
+        for row in session.execute(select(
+            StockItemORM.product_id,
+            StockItemORM.warehouse_id,
+            StockItemORM.quantity,
+            StockItemORM.reserved_quantity
+        ))
+    }
+
+    drifts = []
+    for product_id, warehouse_id in sorted(ledger.keys() | recorded.keys()):
+        empty = StockLevel(product_id=product_id, warehouse_id=warehouse_id)
+        drift = StockDrift(
+            product_id=product_id,
+            warehouse_id=warehouse_id,
+            recorded=recorded.get((product_id, warehouse_id), empty),
+            ledger=ledger.get((product_id, warehouse_id), empty)
+        )
+        if drift.recorded != drift.ledger:
+            drifts.append(drift)
+    return drifts
+
+if __name__ == "__main__":
+    with Session(create_engine(sys.argv[1])) as session:
+        if sys.argv[2:3] == ["audit"]:
+            archive = MovementArchive(sys.argv[3]) if len(sys.argv) > 3 else None
+            for drift in audit_stock_levels(session, archive):
+                print(
+                    f"Product {drift.product_id} in warehouse {drift.warehouse_id}: "
+                    f"recorded {drift.recorded.quantity}/{drift.recorded.reserved_quantity}, "
+                    f"ledger {drift.ledger.quantity}/{drift.ledger.reserved_quantity}"
+                )
+        else:
+            print(f"Snapshot of {take_snapshot(session)} stock items taken")
+            session.commit()
@@ -0,0 +1,388 @@
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Tuple
+from domain.commands import CommandBatch, CommandResult
+from domain.exceptions import StockItemNotFound
+from domain.models import Order, Product, Warehouse, StockItem, StockMovement, ReceiptLine
+from domain.repositories import (
+    ProductRepository, OrderRepository, WarehouseRepository,
+    StockItemRepository, StockMovementRepository
+)
+from domain.unit_of_work import UnitOfWork
+
+class MemoryStore:
+    # Holds every entity in dicts keyed by id, plus the secondary indexes the
+    # repositories query by. While a transaction is open each change appends
+    # its inverse to the undo log, so rollback costs as much as the
+    # transaction did rather than a copy of the whole store. Not thread safe.
+    def __init__(self):
+        self.products: Dict[int, Product] = {}
+        self.orders: Dict[int, Order] = {}
+        self.warehouses: Dict[int, Warehouse] = {}
+        self.occupancy: Dict[int, int] = {}
+        self.stock_items: Dict[int, StockItem] = {}
+        self.stock_by_key: Dict[Tuple[int, int], StockItem] = {}
+        self.stock_by_product: Dict[int, Dict[int, StockItem]] = {}
+        self.movements: Dict[int, StockMovement] = {}
+        self.movements_by_product: Dict[int, List[StockMovement]] = {}
+        self.movements_by_warehouse: Dict[int, List[StockMovement]] = {}
+        self.next_ids = {"products": 1, "orders": 1, "warehouses": 1, "stock_items": 1, "movements": 1}
+        self.undo: Optional[list] = None
+
+    def begin(self):
+        self.undo = []
+
+    def commit(self):
+        self.undo = []
+
+    def rollback(self):
+        if self.undo is None:
+            return
+        undo, self.undo = self.undo, None
+        for operation, args in reversed(undo):
+            operation(*args)
+        self.undo = []
+
+    def _log(self, operation, *args):
+        if self.undo is not None:
+            self.undo.append((operation, args))
+
+    def _assign_id(self, table: str, entity) -> None:
+        if entity.id is None:
+            entity.id = self.next_ids[table]
+        self.next_ids[table] = max(self.next_ids[table], entity.id + 1)
+
+    def insert(self, table: str, entity) -> None:
+        self._assign_id(table, entity)
+        getattr(self, table)[entity.id] = entity
+        self._log(self._delete, table, entity.id)
+
+    def _delete(self, table: str, entity_id: int) -> None:
+        del getattr(self, table)[entity_id]
+
+    def insert_warehouse(self, warehouse: Warehouse) -> None:
+        self.insert("warehouses", warehouse)
+        self.set_occupancy(warehouse.id, 0)
+
+    def set_occupancy(self, warehouse_id: int, occupied: int) -> None:
+        self._log(self._restore_occupancy, warehouse_id, self.occupancy.get(warehouse_id))
+        self.occupancy[warehouse_id] = occupied
+
+    def _restore_occupancy(self, warehouse_id: int, occupied: Optional[int]) -> None:
+        if occupied is None:
+            del self.occupancy[warehouse_id]
+        else:
+            self.occupancy[warehouse_id] = occupied
+
+    def insert_stock_item(self, stock_item: StockItem) -> None:
+        key = (stock_item.product.id, stock_item.warehouse.id)
+        if key in self.stock_by_key:
+            raise ValueError(f"Stock of product {key[0]} in warehouse {key[1]} already exists")
+        self._assign_id("stock_items", stock_item)
+        self.stock_items[stock_item.id] = stock_item
+        self.stock_by_key[key] = stock_item
+        self.stock_by_product.setdefault(key[0], {})[stock_item.id] = stock_item
+        self._log(self._delete_stock_item, stock_item)
+
+    def _delete_stock_item(self, stock_item: StockItem) -> None:
+        del self.stock_items[stock_item.id]
+        del self.stock_by_key[(stock_item.product.id, stock_item.warehouse.id)]
+        del self.stock_by_product[stock_item.product.id][stock_item.id]
+
+    def set_balance(self, stock_item: StockItem, quantity: int, reserved_quantity: int) -> None:
+        self._log(self._restore_balance, stock_item, stock_item.quantity, stock_item.reserved_quantity)
+        stock_item.quantity = quantity
+        stock_item.reserved_quantity = reserved_quantity
+
+    def _restore_balance(self, stock_item: StockItem, quantity: int, reserved_quantity: int) -> None:
+        stock_item.quantity = quantity
+        stock_item.reserved_quantity = reserved_quantity
+
+    def insert_movement(self, movement: StockMovement) -> None:
+        self._assign_id("movements", movement)
+        self.movements[movement.id] = movement
+        self.movements_by_product.setdefault(movement.product.id, []).append(movement)
+        for warehouse in self._movement_warehouses(movement):
+            self.movements_by_warehouse.setdefault(warehouse.id, []).append(movement)
+        self._log(self._delete_movement, movement)
+
+    def _delete_movement(self, movement: StockMovement) -> None:
+        del self.movements[movement.id]
+        self.movements_by_product[movement.product.id].pop()
+        for warehouse in self._movement_warehouses(movement):
+            self.movements_by_warehouse[warehouse.id].pop()
+
+    def _movement_warehouses(self, movement: StockMovement) -> List[Warehouse]:
+        warehouses = [w for w in (movement.source_warehouse, movement.destination_warehouse) if w is not None]
+        if len(warehouses) == 2 and warehouses[0].id == warehouses[1].id:
+            return warehouses[:1]
+        return warehouses
+
+def _get(entities: dict, entity_id: int, kind: str):
+    try:
+        return entities[entity_id]
+    except KeyError:
+        raise KeyError(f"{kind} {entity_id} not found") from None
+
+class MemoryProductRepository(ProductRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, product: Product):
+        self.store.insert("products", product)
+
+    def get(self, product_id: int) -> Product:
+        return _get(self.store.products, product_id, "Product")
+
+    def list(self) -> List[Product]:
+        return list(self.store.products.values())
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Product]:
+        return iter(self.list())
+
+class MemoryOrderRepository(OrderRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, order: Order):
+        self.store.insert("orders", order)
+
+    def add_many(self, orders: List[Order]):
+        for order in orders:
+            self.add(order)
+
+    def get(self, order_id: int) -> Order:
+        return _get(self.store.orders, order_id, "Order")
+
+    def list(self) -> List[Order]:
+        return list(self.store.orders.values())
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Order]:
+        return iter(self.list())
+
+class MemoryWarehouseRepository(WarehouseRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, warehouse: Warehouse):
+        self.store.insert_warehouse(warehouse)
+
+    def get(self, warehouse_id: int) -> Warehouse:
+        return _get(self.store.warehouses, warehouse_id, "Warehouse")
+
+    def list(self) -> List[Warehouse]:
+        return list(self.store.warehouses.values())
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[Warehouse]:
+        return iter(self.list())
+
+    def get_occupancy(self, warehouse_id: int) -> int:
+        return _get(self.store.occupancy, warehouse_id, "Warehouse")
+
+    def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        occupied = self.get_occupancy(warehouse_id) + quantity
+        if occupied > self.store.warehouses[warehouse_id].capacity:
+            return False
+        self.store.set_occupancy(warehouse_id, occupied)
+        return True
+
+    def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        occupied = self.get_occupancy(warehouse_id) - quantity
+        if occupied < 0:
+            return False
+        self.store.set_occupancy(warehouse_id, occupied)
+        return True
+
+    def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        if not self.occupy(destination_id, quantity):
+            return False
+        self.store.set_occupancy(source_id, self.get_occupancy(source_id) - quantity)
+        return True
+
+class MemoryStockItemRepository(StockItemRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, stock_item: StockItem):
+        self.store.insert_stock_item(stock_item)
+
+    def get(self, stock_item_id: int) -> StockItem:
+        return _get(self.store.stock_items, stock_item_id, "Stock item")
+
+    def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
+        stock_item = self.store.stock_by_key.get((product_id, warehouse_id))
+        if stock_item is None:
+            raise StockItemNotFound(f"No stock of product {product_id} in warehouse {warehouse_id}")
+        return stock_item
+
+    def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        return [
+            stock_item
+            for product_id in dict.fromkeys(product_ids)
+            for stock_item in self.store.stock_by_product.get(product_id, {}).values()
+            if stock_item.quantity - stock_item.reserved_quantity > 0
+        ]
+
+    def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        return {
+            product_id: sum(
+                si.quantity - si.reserved_quantity
+                for si in self.store.stock_by_product.get(product_id, {}).values()
+            )
+            for product_id in product_ids
+        }
+
+    def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        available = dict.fromkeys(warehouse_ids, 0)
+        for stock_item in self.store.stock_items.values():
+            if stock_item.warehouse.id in available:
+                available[stock_item.warehouse.id] += stock_item.quantity - stock_item.reserved_quantity
+        return available
+
+    def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        available = {}
+        for product_id in dict.fromkeys(product_ids):
+            for si in self.store.stock_by_product.get(product_id, {}).values():
+                key = (product_id, si.warehouse.location)
+                available[key] = available.get(key, 0) + si.quantity - si.reserved_quantity
+        return available
+
+    def receive_batch(self, lines: List[ReceiptLine]):
+        for line in lines:
+            self.deposit(line.product, line.warehouse, line.quantity)
+
+    def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        stock_item = self.store.stock_by_key.get((product.id, warehouse.id))
+        if stock_item is None:
+            stock_item = StockItem(id=None, product=product, warehouse=warehouse, quantity=quantity)
+            self.store.insert_stock_item(stock_item)
+        else:
+            self.store.set_balance(stock_item, stock_item.quantity + quantity, stock_item.reserved_quantity)
+        return stock_item
+
+    def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        stock_item = self.store.stock_by_key.get((product.id, warehouse.id))
+        if stock_item is None or stock_item.quantity - stock_item.reserved_quantity < quantity:
+            return None
+        self.store.set_balance(stock_item, stock_item.quantity - quantity, stock_item.reserved_quantity)
+        return stock_item
+
+    def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        stock_item = self.store.stock_by_key.get((product.id, warehouse.id))
+        if stock_item is None or stock_item.quantity - stock_item.reserved_quantity < quantity:
+            return None
+        self.store.set_balance(stock_item, stock_item.quantity, stock_item.reserved_quantity + quantity)
+        return stock_item
+
+    def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        stock_item = self.store.stock_by_key.get((product.id, warehouse.id))
+        if stock_item is None or stock_item.reserved_quantity < quantity:
+            return None
+        self.store.set_balance(stock_item, stock_item.quantity, stock_item.reserved_quantity - quantity)
+        return stock_item
+
+    def list(self) -> List[StockItem]:
+        return list(self.store.stock_items.values())
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockItem]:
+        return iter(self.list())
+
+class MemoryStockMovementRepository(StockMovementRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def add(self, movement: StockMovement):
+        self.store.insert_movement(movement)
+
+    def add_many(self, movements: List[StockMovement]):
+        for movement in movements:
+            self.store.insert_movement(movement)
+
+    def get(self, movement_id: int) -> StockMovement:
+        return _get(self.store.movements, movement_id, "Movement")
+
+    def list(self) -> List[StockMovement]:
+        return list(self.store.movements.values())
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return iter(self.list())
+
+    def list_by_product(self, product_id: int) -> List[StockMovement]:
+        return list(self.store.movements_by_product.get(product_id, ()))
+
+    def list_by_warehouse(self, warehouse_id: int) -> List[StockMovement]:
+        return list(self.store.movements_by_warehouse.get(warehouse_id, ()))
+
+    def iter_by_product(self, product_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return iter(self.list_by_product(product_id))
+
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return iter(self.list_by_warehouse(warehouse_id))
+
+class MemoryCommandBatch(CommandBatch):
+    def __init__(self, store: MemoryStore, all_or_nothing: bool = False):
+        super().__init__(all_or_nothing)
+        self.store = store
+
+    # Commands run against copies of the stored stock items and the results
+    # are written back through the store, so they land in the undo log.
+    def execute(self) -> List[CommandResult]:
+        store = self.store
+        stock_items = {
+            key: replace(store.stock_by_key[key])
+            for key in self.stock_keys() if key in store.stock_by_key
+        }
+        capacity = {
+            warehouse_id: store.warehouses[warehouse_id].capacity
+            for warehouse_id in self.warehouse_ids() if warehouse_id in store.warehouses
+        }
+        occupancy = {warehouse_id: store.occupancy[warehouse_id] for warehouse_id in capacity}
+        results = self.apply(stock_items, occupancy, capacity)
+        self.commands = []
+        movements = [result.movement for result in results if result.applied]
+        if not movements:
+            return results
+
+        for key, stock_item in stock_items.items():
+            stored = store.stock_by_key.get(key)
+            if stored is None:
+                store.insert_stock_item(stock_item)
+            elif (stored.quantity, stored.reserved_quantity) != (stock_item.quantity, stock_item.reserved_quantity):
+                store.set_balance(stored, stock_item.quantity, stock_item.reserved_quantity)
+        for warehouse_id, occupied in occupancy.items():
+            if store.occupancy[warehouse_id] != occupied:
+                store.set_occupancy(warehouse_id, occupied)
+        for movement in movements:
+            store.insert_movement(movement)
+        return results
+
+class MemoryUnitOfWork(UnitOfWork):
+    def __init__(self, store: Optional[MemoryStore] = None):
+        self.store = store if store is not None else MemoryStore()
+        self.products = MemoryProductRepository(self.store)
+        self.orders = MemoryOrderRepository(self.store)
+        self.warehouses = MemoryWarehouseRepository(self.store)
+        self.stock_items = MemoryStockItemRepository(self.store)
+        self.stock_movements = MemoryStockMovementRepository(self.store)
+        self._committed = False
+
+    def __enter__(self):
+        self.store.begin()
+        self._committed = False
+        return self
+
+    # Changes made after the last commit are discarded, as closing a session
+    # discards them in the SQLAlchemy unit of work.
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.rollback()
+        self.store.undo = None
+
+    def commit(self):
+        self.store.commit()
+        self._committed = True
+
+    def rollback(self):
+        self.store.rollback()
+        self._committed = False
+
+    def batch(self, all_or_nothing: bool = False, lock: bool = False) -> MemoryCommandBatch:
+        return MemoryCommandBatch(self.store, all_or_nothing)
@@ -0,0 +1,80 @@
+import sys
+from typing import List
+from sqlalchemy import create_engine, func, insert, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from .orm import StockItemORM, StockMovementORM, WarehouseORM, WarehouseOccupancyORM
+
+INDEXED_TABLES = (StockItemORM.__table__, StockMovementORM.__table__)
+VERSIONED_TABLES = (StockItemORM.__table__, WarehouseORM.__table__)
+
+def upgrade_columns(engine: Engine) -> List[str]:
+    added = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in VERSIONED_TABLES:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            if "version" in existing:
+                continue
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+            added.append(f"{table.name}.version")
+    return added
+
+def upgrade_indexes(engine: Engine) -> List[str]:
+    created = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in INDEXED_TABLES:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name in existing:
+                    continue
+                if index.unique:
+                    _ensure_no_duplicates(connection, index)
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+# Warehouses created before occupancy was tracked have no occupancy row and
+# would reject every deposit, so they get one holding their current stock.
+def upgrade_occupancy(engine: Engine) -> List[int]:
+    occupancy = WarehouseOccupancyORM.__table__
+    stock_items = StockItemORM.__table__
+    warehouses = WarehouseORM.__table__
+    with engine.begin() as connection:
+        missing = connection.execute(
+            select(warehouses.c.id, func.coalesce(func.sum(stock_items.c.quantity), 0))
+            .outerjoin(stock_items, stock_items.c.warehouse_id == warehouses.c.id)
+            .where(~select(occupancy.c.warehouse_id).where(occupancy.c.warehouse_id == warehouses.c.id).exists())
+            .group_by(warehouses.c.id)
+            .order_by(warehouses.c.id)
+        ).all()
+        if missing:
+            connection.execute(insert(occupancy), [
+                {"warehouse_id": warehouse_id, "occupied": occupied} for warehouse_id, occupied in missing
+            ])
+    return [warehouse_id for warehouse_id, _ in missing]
+
+def _ensure_no_duplicates(connection: Connection, index) -> None:
+    columns = list(index.columns)
+    duplicates = connection.execute(
+        select(*columns, func.count().label("rows"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+        .limit(10)
+    ).all()
+    if duplicates:
+        keys = ", ".join(str(tuple(row[:-1])) for row in duplicates)
+        raise ValueError(
+            f"Cannot create unique index {index.name}: duplicate rows for {keys}"
+        )
+
+if __name__ == "__main__":
+    engine = create_engine(sys.argv[1])
+    for name in upgrade_columns(engine):
+        print(f"Added column {name}")
+    for name in upgrade_indexes(engine):
+        print(f"Created index {name}")
+    for warehouse_id in upgrade_occupancy(engine):
+        print(f"Backfilled occupancy of warehouse {warehouse_id}")
@@ -0,0 +1,352 @@
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from domain.models import MovementType, StockMovement
+from domain.repositories import StockMovementRepository
+from .orm import JournalTransactionORM, StockMovementORM
+from .repositories import movement_values
+
+logger = logging.getLogger("warehouse.movement_writer")
+
+_STOP = object()
+COMPACT_BYTES = 1 << 20
+
+def _encode(transaction: str, movements: List[dict]) -> str:
+    return json.dumps({
+        "transaction": transaction,
+        "movements": [
+            {**values, "movement_type": values["movement_type"].name, "timestamp": values["timestamp"].isoformat()}
+            for values in movements
+        ],
+    }) + "\n"
+
+def _decode(line: str) -> Tuple[str, List[dict]]:
+    record = json.loads(line)
+    movements = record["movements"]
+    for values in movements:
+        values["movement_type"] = MovementType[values["movement_type"]]
+        values["timestamp"] = datetime.fromisoformat(values["timestamp"])
+    return record["transaction"], movements
+
+def _size(batch: List[Tuple[str, List[dict]]]) -> int:
+    return sum(len(movements) for _, movements in batch)
+
+# Each unit of work appends its movements to a local journal and inserts a
+# journal_transactions row before the database commit, so the row commits
+# together with the stock changes. Movements are queued only after the
+# commit, and every group of inserts deletes the rows of the transactions it
+# wrote. After a crash replay() inserts exactly the journaled transactions
+# whose row is still there: a missing row means the unit of work never
+# committed or its movements were already written.
+#
+# Rows carry the journal's absolute path, so writers with journals of the
+# same name in different directories never replay or drop each other's rows.
+# The journal is cut at the oldest record that is still being written: it is
+# emptied when nothing is outstanding and otherwise rewritten without its
+# finished prefix once that prefix reaches COMPACT_BYTES.
+class MovementWriter:
+    def __init__(
+        self,
+        engine: Engine,
+        journal_path,
+        batch_size: int = 500,
+        flush_interval: float = 0.05,
+        max_pending: int = 10_000,
+        fsync: bool = True
+    ):
+        self.engine = engine
+        self.journal_path = Path(journal_path)
+        self.name = str(self.journal_path.resolve())
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._written = threading.Condition()
+        # Journal offset of every transaction not yet written or discarded,
+        # counted from the start of the first journal this writer opened.
+        self._records: Dict[str, int] = {}
+        self._base = 0
+        self._pending = 0
+        self._submitted = 0
+        self._committed = 0
+        self._error: Optional[BaseException] = None
+        self._journal = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self) -> int:
+        replayed = self.replay()
+        self._journal = open(self.journal_path, "ab", buffering=0)
+        self._thread = threading.Thread(
+            target=self._run, name=f"movement-writer-{self.journal_path.name}", daemon=True
+        )
+        self._thread.start()
+        return replayed
+
+    def replay(self) -> int:
+        transactions = JournalTransactionORM.__table__
+        with self.engine.begin() as connection:
+            committed = set(connection.scalars(
+                select(transactions.c.id).where(transactions.c.journal == self.name)
+            ))
+        pending = [(t, movements) for t, movements in self._read_journal() if t in committed]
+        batch = []
+        for record in pending:
+            batch.append(record)
+            if _size(batch) >= self.batch_size:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+        lost = committed - {t for t, _ in pending}
+        if lost:
+            logger.warning("%d committed transactions are missing from %s", len(lost), self.journal_path)
+            with self.engine.begin() as connection:
+                connection.execute(delete(transactions).where(transactions.c.id.in_(lost)))
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path.write_text("")
+        return _size(pending)
+
+    # Called before the unit of work commits: the movements are durable in
+    # the journal once this returns, and the transaction row is part of the
+    # caller's session, so a failure here fails the commit.
+    def prepare(self, session: Session, movements: List[dict]) -> str:
+        if self._error is not None:
+            raise RuntimeError("Movement writer stopped after a failed write") from self._error
+        transaction = uuid.uuid4().hex
+        record = _encode(transaction, movements).encode("utf-8")
+        with self._lock:
+            start = os.fstat(self._journal.fileno()).st_size
+            try:
+                self._journal.write(record)
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            except BaseException:
+                # A torn record in the middle would hide every record after it.
+                self._journal.truncate(start)
+                raise
+            self._records[transaction] = self._base + start
+            self._pending += len(movements)
+        try:
+            session.execute(insert(JournalTransactionORM).values(id=transaction, journal=self.name))
+        except BaseException:
+            self.discard(transaction, movements)
+            raise
+        return transaction
+
+    # Called after the commit, so it never raises: if the writer has stopped
+    # the movements stay in the journal and replay() inserts them. Blocks
+    # while max_pending transactions are waiting to be written.
+    def submit(self, transaction: str, movements: List[dict]) -> None:
+        with self._lock:
+            self._submitted += len(movements)
+        while self._error is None:
+            try:
+                self._queue.put((transaction, movements), timeout=self.flush_interval)
+                return
+            except queue.Full:
+                pass
+
+    def discard(self, transaction: str, movements: List[dict]) -> None:
+        with self._lock:
+            del self._records[transaction]
+            self._pending -= len(movements)
+            self._truncate()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        target = self._submitted
+        with self._written:
+            if not self._written.wait_for(lambda: self._committed >= target or self._error is not None, timeout):
+                raise TimeoutError(f"{target - self._committed} movements were not written within {timeout}s")
+        if self._error is not None:
+            raise RuntimeError("Movement writer stopped after a failed write") from self._error
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=self.flush_interval)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            self._truncate()
+            self._journal.close()
+
+    # Movements journaled by units of work that have not been written yet.
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # Callers hold self._lock.
+    def _truncate(self) -> None:
+        if self._error is not None or self._journal is None:
+            return
+        end = os.fstat(self._journal.fileno()).st_size
+        done = min(self._records.values(), default=self._base + end) - self._base
+        if done == end and end:
+            self._journal.truncate(0)
+            self._base += end
+        elif done >= COMPACT_BYTES:
+            self._compact(done)
+
+    # The unfinished tail is copied to a new file that replaces the journal,
+    # so a crash leaves either the old journal or the compacted one.
+    def _compact(self, done: int) -> None:
+        compacted = self.journal_path.with_name(self.journal_path.name + ".compact")
+        with open(self.journal_path, "rb") as journal, open(compacted, "wb") as tail:
+            journal.seek(done)
+            shutil.copyfileobj(journal, tail)
+            tail.flush()
+            if self.fsync:
+                os.fsync(tail.fileno())
+        os.replace(compacted, self.journal_path)
+        self._journal.close()
+        self._journal = open(self.journal_path, "ab", buffering=0)
+        self._base += done
+
+    def _read_journal(self) -> Iterator[Tuple[str, List[dict]]]:
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    yield _decode(line)
+                except ValueError:
+                    # Only the last line can be torn by a crash during a
+                    # write, and its unit of work never committed.
+                    logger.warning("Skipping a partial record at the end of %s", self.journal_path)
+                    return
+
+    def _insert(self, batch: List[Tuple[str, List[dict]]]) -> None:
+        transactions = JournalTransactionORM.__table__
+        with self.engine.begin() as connection:
+            connection.execute(
+                insert(StockMovementORM.__table__),
+                [values for _, movements in batch for values in movements]
+            )
+            connection.execute(delete(transactions).where(transactions.c.id.in_([t for t, _ in batch])))
+
+    def _next_batch(self) -> Tuple[List[Tuple[str, List[dict]]], bool]:
+        record = self._queue.get()
+        if record is _STOP:
+            return [], True
+        batch = [record]
+        size = len(record[1])
+        deadline = time.monotonic() + self.flush_interval
+        while size < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                record = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if record is _STOP:
+                return batch, True
+            batch.append(record)
+            size += len(record[1])
+        return batch, False
+
+    # A failed write stops the writer; the movements stay in the journal and
+    # are inserted by replay() the next time the writer starts.
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            size = _size(batch)
+            try:
+                self._insert(batch)
+            except Exception as error:
+                logger.exception("Writing %d movements failed", size)
+                with self._written:
+                    self._error = error
+                    self._written.notify_all()
+                return
+            with self._lock:
+                for transaction, _ in batch:
+                    del self._records[transaction]
+                self._pending -= size
+                self._truncate()
+            with self._written:
+                self._committed += size
+                self._written.notify_all()
+
+# Movements added through this repository are journaled when the unit of
+# work commits and handed to the writer after it, so reads only see them
+# once the writer has flushed.
+class WriteBehindStockMovementRepository(StockMovementRepository):
+    def __init__(self, repository: StockMovementRepository, writer: MovementWriter):
+        self.repository = repository
+        self.writer = writer
+        self.pending: List[dict] = []
+        self.transaction: Optional[str] = None
+
+    def add(self, movement: StockMovement):
+        self.pending.append(movement_values(movement))
+
+    def add_many(self, movements: List[StockMovement]):
+        self.pending.extend(movement_values(m) for m in movements)
+
+    def prepare(self) -> None:
+        if self.pending and self.transaction is None:
+            self.transaction = self.writer.prepare(self.repository.session, self.pending)
+
+    def submit(self) -> None:
+        if self.transaction is not None:
+            self.writer.submit(self.transaction, self.pending)
+        self.transaction, self.pending = None, []
+
+    def discard(self) -> None:
+        if self.transaction is not None:
+            self.writer.discard(self.transaction, self.pending)
+        self.transaction, self.pending = None, []
+
+    def get(self, movement_id: int) -> StockMovement:
+        return self.repository.get(movement_id)
+
+    def list(self) -> List[StockMovement]:
+        return self.repository.list()
+
+    def iter_all(self, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return self.repository.iter_all(chunk_size)
+
+    def list_by_product(self, product_id: int) -> List[StockMovement]:
+        return self.repository.list_by_product(product_id)
+
+    def list_by_warehouse(self, warehouse_id: int) -> List[StockMovement]:
+        return self.repository.list_by_warehouse(warehouse_id)
+
+    def iter_by_product(self, product_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return self.repository.iter_by_product(product_id, chunk_size)
+
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = 1000) -> Iterator[StockMovement]:
+        return self.repository.iter_by_warehouse(warehouse_id, chunk_size)
+
+if __name__ == "__main__":
+    writer = MovementWriter(create_engine(sys.argv[1]), sys.argv[2])
+    print(f"Replayed {writer.replay()} movements from {writer.journal_path}")
@@ -0,0 +1,51 @@
+import sys
+from dataclasses import dataclass
+from typing import List, Optional
+from sqlalchemy import bindparam, create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+from .orm import WarehouseORM, WarehouseOccupancyORM, StockItemORM
+
+@dataclass
+class OccupancyDrift:
+    warehouse_id: int
+    recorded: Optional[int]
+    actual: int
+
+def reconcile_occupancy(session: Session) -> List[OccupancyDrift]:
+    occupancy = WarehouseOccupancyORM.__table__
+    actual = dict(session.execute(
+        select(WarehouseORM.id, func.coalesce(func.sum(StockItemORM.quantity), 0))
+        .outerjoin(StockItemORM, StockItemORM.warehouse_id == WarehouseORM.id)
+        .group_by(WarehouseORM.id)
+    ).all())
+    recorded = dict(session.execute(select(occupancy.c.warehouse_id, occupancy.c.occupied)).all())
+
+    drifts = [
+        OccupancyDrift(warehouse_id=warehouse_id, recorded=recorded.get(warehouse_id), actual=occupied)
+        for warehouse_id, occupied in sorted(actual.items())
+        if recorded.get(warehouse_id) != occupied
+    ]
+    missing = [
+        {"warehouse_id": d.warehouse_id, "occupied": d.actual}
+        for d in drifts if d.recorded is None
+    ]
+    stale = [
+        {"drifted_warehouse_id": d.warehouse_id, "actual": d.actual}
+        for d in drifts if d.recorded is not None
+    ]
+    if missing:
+        session.execute(insert(occupancy), missing)
+    if stale:
+        session.execute(
+            update(occupancy)
+            .where(occupancy.c.warehouse_id == bindparam("drifted_warehouse_id"))
+            .values(occupied=bindparam("actual")),
+            stale
+        )
+    return drifts
+
+if __name__ == "__main__":
+    with Session(create_engine(sys.argv[1])) as session:
+        for drift in reconcile_occupancy(session):
+            print(f"Warehouse {drift.warehouse_id}: recorded {drift.recorded}, actual {drift.actual}")
+        session.commit()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Table, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, Float, Table, ForeignKey, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from domain.models import MovementType
@@ -18,21 +18,43 @@ class WarehouseORM(Base):
     name = Column(String)
     location = Column(String)
     capacity = Column(Integer)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     stock_items = relationship("StockItemORM", back_populates="warehouse")
+    occupancy = relationship("WarehouseOccupancyORM", uselist=False, cascade="all, delete-orphan")
+
+    __mapper_args__ = {"version_id_col": version}
+
+class WarehouseOccupancyORM(Base):
+    __tablename__ = 'warehouse_occupancy'
+    warehouse_id = Column(Integer, ForeignKey('warehouses.id'), primary_key=True)
+    occupied = Column(Integer, nullable=False, default=0)
 
 class StockItemORM(Base):
     __tablename__ = 'stock_items'
+    __table_args__ = (
+        Index('uq_stock_items_product_warehouse', 'product_id', 'warehouse_id', unique=True),
+    )
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey('products.id'))
     warehouse_id = Column(Integer, ForeignKey('warehouses.id'))
     quantity = Column(Integer)
     reserved_quantity = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     product = relationship("ProductORM")
     warehouse = relationship("WarehouseORM", back_populates="stock_items")
 
+    __mapper_args__ = {"version_id_col": version}
+
 class StockMovementORM(Base):
     __tablename__ = 'stock_movements'
+    __table_args__ = (
+        Index('ix_stock_movements_product_timestamp', 'product_id', 'timestamp'),
+        Index('ix_stock_movements_source_warehouse_timestamp', 'source_warehouse_id', 'timestamp'),
+        Index('ix_stock_movements_destination_warehouse_timestamp', 'destination_warehouse_id', 'timestamp'),
+        Index('ix_stock_movements_timestamp', 'timestamp'),
+        {'sqlite_autoincrement': True},
+    )
     id = Column(Integer, primary_key=True)
     product_id = Column(Integer, ForeignKey('products.id'))
     source_warehouse_id = Column(Integer, ForeignKey('warehouses.id'))
@@ -45,9 +67,42 @@ class StockMovementORM(Base):
     source_warehouse = relationship("WarehouseORM", foreign_keys=[source_warehouse_id])
     destination_warehouse = relationship("WarehouseORM", foreign_keys=[destination_warehouse_id])
 
+class StockSnapshotORM(Base):
+    __tablename__ = 'stock_snapshots'
+    __table_args__ = (
+        Index('ix_stock_snapshots_taken_at', 'taken_at'),
+    )
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey('warehouses.id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    reserved_quantity = Column(Integer, nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)
+
+class JournalCheckpointORM(Base):
+    __tablename__ = 'journal_checkpoints'
+    journal = Column(String, primary_key=True)
+    sequence = Column(Integer, nullable=False)
+
+class JournalTransactionORM(Base):
+    __tablename__ = 'journal_transactions'
+    id = Column(String, primary_key=True)
+    journal = Column(String, nullable=False, index=True)
+
 class OrderORM(Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True)
+    lines = relationship("OrderLineORM", order_by="OrderLineORM.id")
+
+class OrderLineORM(Base):
+    __tablename__ = "order_lines"
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), index=True)
+    product_id = Column(Integer, ForeignKey('products.id'))
+    quantity = Column(Integer)
+
+    product = relationship("ProductORM")
 
 order_product_associations = Table(
     'order_product_associations', Base.metadata,
@@ -1,11 +1,132 @@
-from sqlalchemy.orm import Session
-from typing import List
-from domain.models import Order, Product, Warehouse, StockItem, StockMovement
+from enum import Enum
+from itertools import chain, islice
+from sqlalchemy import bindparam, func, insert, literal_column, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from domain.exceptions import StockItemNotFound
+from domain.models import Order, OrderLine, Product, Warehouse, StockItem, StockMovement, ReceiptLine
 from domain.repositories import (
     ProductRepository, OrderRepository, WarehouseRepository,
     StockItemRepository, StockMovementRepository
 )
-from .orm import ProductORM, OrderORM, WarehouseORM, StockItemORM, StockMovementORM
+from .archive import MovementArchive
+from .cache import ReferenceDataCache
+from .orm import (
+    ProductORM, OrderORM, OrderLineORM, WarehouseORM, WarehouseOccupancyORM, StockItemORM,
+    StockMovementORM, order_product_associations
+)
+
+UPSERT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+IN_CLAUSE_CHUNK_SIZE = 500
+DEFAULT_CHUNK_SIZE = 1000
+
+class LoadingStrategy(Enum):
+    JOINED = "joined"
+    SELECTIN = "selectin"
+    RAW = "raw"
+
+def _iter_keyset(executor, statement, key_column, chunk_size: int, scalars: bool = False):
+    last_key = None
+    while True:
+        page = statement if last_key is None else statement.where(key_column > last_key)
+        result = executor.execute(
+            page.order_by(key_column).limit(chunk_size).execution_options(yield_per=chunk_size)
+        )
+        if scalars:
+            result = result.scalars()
+        fetched = 0
+        for item in result:
+            fetched += 1
+            last_key = item.id
+            yield item
+        if fetched < chunk_size:
+            return
+
+def _product_columns(entity, prefix: str):
+    return (
+        entity.id.label(f"{prefix}_id"),
+        entity.name.label(f"{prefix}_name"),
+        entity.quantity.label(f"{prefix}_quantity"),
+        entity.price.label(f"{prefix}_price"),
+    )
+
+def _warehouse_columns(entity, prefix: str):
+    return (
+        entity.id.label(f"{prefix}_id"),
+        entity.name.label(f"{prefix}_name"),
+        entity.location.label(f"{prefix}_location"),
+        entity.capacity.label(f"{prefix}_capacity"),
+    )
+
+# Column projections run on the session's connection, so rows come back as
+# plain Core tuples without passing through the ORM loading layer.
+def _core_connection(session: Session):
+    session.flush()
+    return session.connection()
+
+def _product_from_columns(columns) -> Product:
+    return Product(*columns)
+
+def _warehouse_from_columns(columns) -> Warehouse:
+    return Warehouse(*columns)
+
+class _References:
+    # Interns products and warehouses for the duration of one query, so rows
+    # that share a product or warehouse also share its domain object.
+    def __init__(self, cache: Optional[ReferenceDataCache]):
+        self.cache = cache
+        self.products = {}
+        self.warehouses = {None: None}
+
+    def product(self, product_id: int, build) -> Product:
+        product = self.products.get(product_id)
+        if product is None:
+            product = build() if self.cache is None else self.cache.product(product_id, build)
+            self.products[product_id] = product
+        return product
+
+    def warehouse(self, warehouse_id: Optional[int], build) -> Optional[Warehouse]:
+        if warehouse_id in self.warehouses:
+            return self.warehouses[warehouse_id]
+        warehouse = build() if self.cache is None else self.cache.warehouse(warehouse_id, build)
+        self.warehouses[warehouse_id] = warehouse
+        return warehouse
+
+def _product_to_domain(product_orm: ProductORM) -> Product:
+    return Product(
+        id=product_orm.id,
+        name=product_orm.name,
+        quantity=product_orm.quantity,
+        price=product_orm.price
+    )
+
+def _warehouse_to_domain(warehouse_orm: WarehouseORM) -> Warehouse:
+    if warehouse_orm is None:
+        return None
+    return Warehouse(
+        id=warehouse_orm.id,
+        name=warehouse_orm.name,
+        location=warehouse_orm.location,
+        capacity=warehouse_orm.capacity
+    )
+
+def movement_values(movement: StockMovement) -> dict:
+    return {
+        "product_id": movement.product.id,
+        "source_warehouse_id": movement.source_warehouse.id if movement.source_warehouse else None,
+        "destination_warehouse_id": movement.destination_warehouse.id if movement.destination_warehouse else None,
+        "quantity": movement.quantity,
+        "movement_type": movement.movement_type,
+        "timestamp": movement.timestamp
+    }
 
 class SqlAlchemyProductRepository(ProductRepository):
     def __init__(self, session: Session):
@@ -18,6 +139,8 @@ class SqlAlchemyProductRepository(ProductRepository):
             price=product.price
         )
         self.session.add(product_orm)
+        self.session.flush()
+        product.id = product_orm.id
 
     def get(self, product_id: int) -> Product:
         product_orm = self.session.query(ProductORM).filter_by(id=product_id).one()
@@ -35,36 +158,101 @@ class SqlAlchemyProductRepository(ProductRepository):
             for p in products_orm
         ]
 
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Product]:
+        for product_orm in _iter_keyset(self.session, select(ProductORM), ProductORM.id, chunk_size, scalars=True):
+            yield _product_to_domain(product_orm)
+
+def _insert_default_orders(count: int):
+    orders_table = OrderORM.__table__
+    return (
+        insert(orders_table)
+        .values([{"id": literal_column("DEFAULT")}] * count)
+        .returning(orders_table.c.id)
+    )
+
 class SqlAlchemyOrderRepository(OrderRepository):
     def __init__(self, session: Session):
         self.session = session
 
     def add(self, order: Order):
-        order_orm = OrderORM()
-        order_orm.products = [
-            self.session.query(ProductORM).filter_by(id=p.id).one()
-            for p in order.products
+        self.add_many([order])
+
+    def add_many(self, orders: List[Order]):
+        if not orders:
+            return
+        self._ensure_products_exist(
+            {p.id for order in orders for p in order.products}
+            | {line.product.id for order in orders for line in order.lines}
+        )
+
+        for order, order_id in zip(orders, self._insert_orders(len(orders))):
+            order.id = order_id
+
+        associations = [
+            {"order_id": order.id, "product_id": product.id}
+            for order in orders
+            for product in order.products
         ]
-        self.session.add(order_orm)
+        if associations:
+            self.session.execute(insert(order_product_associations), associations)
+        lines = [
+            {"order_id": order.id, "product_id": line.product.id, "quantity": line.quantity}
+            for order in orders
+            for line in order.lines
+        ]
+        if lines:
+            self.session.execute(insert(OrderLineORM.__table__), lines)
+
+    # Order rows carry nothing but their id, so the returned ids may be handed
+    # out in any order and the insert can be batched. SQLite has no DEFAULT in
+    # VALUES but assigns the next id to a NULL key, which other databases
+    # reject.
+    def _insert_orders(self, count: int) -> List[int]:
+        orders_table = OrderORM.__table__
+        if self.session.get_bind().dialect.name == "sqlite":
+            return self.session.scalars(
+                insert(orders_table).returning(orders_table.c.id),
+                [{"id": None}] * count
+            ).all()
+        return self.session.scalars(_insert_default_orders(count)).all()
+
+    def _ensure_products_exist(self, product_ids: set):
+        ids = list(product_ids)
+        found = set()
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+            found.update(self.session.scalars(
+                select(ProductORM.id).where(ProductORM.id.in_(ids[start:start + IN_CLAUSE_CHUNK_SIZE]))
+            ))
+        missing = product_ids - found
+        if missing:
+            raise NoResultFound(f"Products not found: {sorted(missing)}")
 
     def get(self, order_id: int) -> Order:
-        order_orm = self.session.query(OrderORM).filter_by(id=order_id).one()
-        products = [
-            Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-            for p in order_orm.products
-        ]
-        return Order(id=order_orm.id, products=products)
+        order_orm = self.session.scalars(self._select().where(OrderORM.id == order_id)).one()
+        return self._to_domain(order_orm)
 
     def list(self) -> List[Order]:
-        orders_orm = self.session.query(OrderORM).all()
-        orders = []
-        for order_orm in orders_orm:
-            products = [
-                Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-                for p in order_orm.products
+        return [self._to_domain(o) for o in self.session.scalars(self._select())]
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Order]:
+        for order_orm in _iter_keyset(self.session, self._select(), OrderORM.id, chunk_size, scalars=True):
+            yield self._to_domain(order_orm)
+
+    def _select(self):
+        return select(OrderORM).options(
+            selectinload(OrderORM.products),
+            selectinload(OrderORM.lines).joinedload(OrderLineORM.product)
+        )
+
+    def _to_domain(self, order_orm: OrderORM) -> Order:
+        return Order(
+            id=order_orm.id,
+            products=[_product_to_domain(p) for p in order_orm.products],
+            lines=[
+                OrderLine(product=_product_to_domain(line.product), quantity=line.quantity)
+                for line in order_orm.lines
             ]
-            orders.append(Order(id=order_orm.id, products=products))
-        return orders
+        )
 
 class SqlAlchemyWarehouseRepository(WarehouseRepository):
     def __init__(self, session: Session):
@@ -74,9 +262,12 @@ class SqlAlchemyWarehouseRepository(WarehouseRepository):
         warehouse_orm = WarehouseORM(
             name=warehouse.name,
             location=warehouse.location,
-            capacity=warehouse.capacity
+            capacity=warehouse.capacity,
+            occupancy=WarehouseOccupancyORM(occupied=0)
         )
         self.session.add(warehouse_orm)
+        self.session.flush()
+        warehouse.id = warehouse_orm.id
 
     def get(self, warehouse_id: int) -> Warehouse:
         warehouse_orm = self.session.query(WarehouseORM).filter_by(id=warehouse_id).one()
@@ -99,9 +290,74 @@ class SqlAlchemyWarehouseRepository(WarehouseRepository):
             for w in warehouses_orm
         ]
 
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Warehouse]:
+        for warehouse_orm in _iter_keyset(self.session, select(WarehouseORM), WarehouseORM.id, chunk_size, scalars=True):
+            yield _warehouse_to_domain(warehouse_orm)
+
+    def get_occupancy(self, warehouse_id: int) -> int:
+        self.session.flush()
+        table = WarehouseOccupancyORM.__table__
+        return self.session.execute(
+            select(table.c.occupied).where(table.c.warehouse_id == warehouse_id)
+        ).scalar_one()
+
+    def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        self.session.flush()
+        table = WarehouseOccupancyORM.__table__
+        capacity = select(WarehouseORM.__table__.c.capacity).where(
+            WarehouseORM.__table__.c.id == warehouse_id
+        ).scalar_subquery()
+        result = self.session.execute(
+            update(table)
+            .where(table.c.warehouse_id == warehouse_id, table.c.occupied + quantity <= capacity)
+            .values(occupied=table.c.occupied + quantity)
+        )
+        return result.rowcount == 1
+
+    def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        self.session.flush()
+        table = WarehouseOccupancyORM.__table__
+        result = self.session.execute(
+            update(table)
+            .where(table.c.warehouse_id == warehouse_id, table.c.occupied >= quantity)
+            .values(occupied=table.c.occupied - quantity)
+        )
+        return result.rowcount == 1
+
+    # Both rows are locked by one statement in warehouse id order, as command
+    # batches lock them, so opposing transfers queue instead of deadlocking.
+    def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        self.session.flush()
+        occupancy = WarehouseOccupancyORM.__table__
+        warehouses = WarehouseORM.__table__
+        free = dict(self.session.execute(
+            select(occupancy.c.warehouse_id, warehouses.c.capacity - occupancy.c.occupied)
+            .join(warehouses, warehouses.c.id == occupancy.c.warehouse_id)
+            .where(occupancy.c.warehouse_id.in_({source_id, destination_id}))
+            .order_by(occupancy.c.warehouse_id)
+            .with_for_update(of=occupancy)
+        ).all())
+        if destination_id not in free or quantity > free[destination_id]:
+            return False
+        if source_id != destination_id:
+            self.session.execute(
+                update(occupancy)
+                .where(occupancy.c.warehouse_id == bindparam("target_id"))
+                .values(occupied=occupancy.c.occupied + bindparam("delta")),
+                [{"target_id": destination_id, "delta": quantity}, {"target_id": source_id, "delta": -quantity}]
+            )
+        return True
+
 class SqlAlchemyStockItemRepository(StockItemRepository):
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        loading_strategy: LoadingStrategy = LoadingStrategy.JOINED,
+        reference_cache: Optional[ReferenceDataCache] = None
+    ):
         self.session = session
+        self.loading_strategy = loading_strategy
+        self.reference_cache = reference_cache
 
     def add(self, stock_item: StockItem):
         stock_item_orm = StockItemORM(
@@ -113,105 +369,467 @@ class SqlAlchemyStockItemRepository(StockItemRepository):
         self.session.add(stock_item_orm)
 
     def get(self, stock_item_id: int) -> StockItem:
-        stock_item_orm = self.session.query(StockItemORM).filter_by(id=stock_item_id).one()
-        return self._to_domain(stock_item_orm)
+        return self._fetch_one(self._select().where(StockItemORM.id == stock_item_id))
 
     def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
-        stock_item_orm = self.session.query(StockItemORM).filter_by(
-            product_id=product_id,
-            warehouse_id=warehouse_id
-        ).one()
-        return self._to_domain(stock_item_orm)
+        try:
+            return self._fetch_one(self._select().where(
+                StockItemORM.product_id == product_id,
+                StockItemORM.warehouse_id == warehouse_id
+            ))
+        except NoResultFound:
+            raise StockItemNotFound(
+                f"No stock of product {product_id} in warehouse {warehouse_id}"
+            ) from None
 
-    def list(self) -> List[StockItem]:
-        stock_items_orm = self.session.query(StockItemORM).all()
-        return [self._to_domain(si) for si in stock_items_orm]
-
-    def _to_domain(self, stock_item_orm: StockItemORM) -> StockItem:
-        product = Product(
-            id=stock_item_orm.product.id,
-            name=stock_item_orm.product.name,
-            quantity=stock_item_orm.product.quantity,
-            price=stock_item_orm.product.price
-        )
-        warehouse = Warehouse(
-            id=stock_item_orm.warehouse.id,
-            name=stock_item_orm.warehouse.name,
-            location=stock_item_orm.warehouse.location,
-            capacity=stock_item_orm.warehouse.capacity
+    def list_available(self, product_ids: List[int]) -> List[StockItem]:
+        stock_items = []
+        for start in range(0, len(product_ids), IN_CLAUSE_CHUNK_SIZE):
+            stock_items.extend(self._fetch(self._select().where(
+                StockItemORM.product_id.in_(product_ids[start:start + IN_CLAUSE_CHUNK_SIZE]),
+                StockItemORM.quantity - StockItemORM.reserved_quantity > 0
+            )))
+        return stock_items
+
+    def available_by_product(self, product_ids: List[int]) -> Dict[int, int]:
+        available = dict.fromkeys(product_ids, 0)
+        available.update(self._sum_available(StockItemORM.product_id, product_ids))
+        return available
+
+    def available_by_warehouse(self, warehouse_ids: List[int]) -> Dict[int, int]:
+        available = dict.fromkeys(warehouse_ids, 0)
+        available.update(self._sum_available(StockItemORM.warehouse_id, warehouse_ids))
+        return available
+
+    def available_by_location(self, product_ids: List[int]) -> Dict[Tuple[int, str], int]:
+        return {
+            (product_id, location): available
+            for product_id, location, available in self._sum_available(
+                StockItemORM.product_id, product_ids, WarehouseORM.location
+            )
+        }
+
+    # Sums quantity - reserved_quantity in the database, grouped by key and
+    # any extra columns, for keys in chunks of IN_CLAUSE_CHUNK_SIZE.
+    def _sum_available(self, key, keys: List[int], *columns) -> List[tuple]:
+        self.session.flush()
+        keys = list(dict.fromkeys(keys))
+        rows = []
+        for start in range(0, len(keys), IN_CLAUSE_CHUNK_SIZE):
+            statement = (
+                select(key, *columns, func.sum(StockItemORM.quantity - StockItemORM.reserved_quantity))
+                .where(key.in_(keys[start:start + IN_CLAUSE_CHUNK_SIZE]))
+                .group_by(key, *columns)
+            )
+            if columns:
+                statement = statement.join(WarehouseORM, WarehouseORM.id == StockItemORM.warehouse_id)
+            rows.extend(self.session.execute(statement))
+        return rows
+
+    def receive_batch(self, lines: List[ReceiptLine]):
+        increments = {}
+        for line in lines:
+            key = (line.product.id, line.warehouse.id)
+            increments[key] = increments.get(key, 0) + line.quantity
+        if not increments:
+            return
+
+        self.session.flush()
+        upsert = UPSERT_INSERTS.get(self.session.get_bind().dialect.name)
+        if upsert is not None:
+            self._upsert_quantities(upsert, increments)
+        else:
+            self._update_or_insert_quantities(increments)
+
+    def deposit(self, product: Product, warehouse: Warehouse, quantity: int) -> StockItem:
+        self.receive_batch([ReceiptLine(product=product, warehouse=warehouse, quantity=quantity)])
+        return self._balance(product, warehouse)
+
+    def withdraw(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        table = StockItemORM.__table__
+        return self._conditional_update(
+            product, warehouse,
+            table.c.quantity - table.c.reserved_quantity >= quantity,
+            quantity=table.c.quantity - quantity
+        )
+
+    def reserve(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        table = StockItemORM.__table__
+        return self._conditional_update(
+            product, warehouse,
+            table.c.quantity - table.c.reserved_quantity >= quantity,
+            reserved_quantity=table.c.reserved_quantity + quantity
         )
+
+    def release(self, product: Product, warehouse: Warehouse, quantity: int) -> Optional[StockItem]:
+        table = StockItemORM.__table__
+        return self._conditional_update(
+            product, warehouse,
+            table.c.reserved_quantity >= quantity,
+            reserved_quantity=table.c.reserved_quantity - quantity
+        )
+
+    def _conditional_update(self, product: Product, warehouse: Warehouse, condition, **values) -> Optional[StockItem]:
+        table = StockItemORM.__table__
+        self.session.flush()
+        statement = update(table).where(
+            table.c.product_id == product.id,
+            table.c.warehouse_id == warehouse.id,
+            condition
+        ).values(version=table.c.version + 1, **values)
+        if self.session.get_bind().dialect.update_returning:
+            row = self.session.execute(
+                statement.returning(table.c.id, table.c.quantity, table.c.reserved_quantity)
+            ).one_or_none()
+            return self._balance_to_domain(row, product, warehouse) if row else None
+        if self.session.execute(statement).rowcount == 0:
+            return None
+        return self._balance(product, warehouse)
+
+    def _balance(self, product: Product, warehouse: Warehouse) -> StockItem:
+        table = StockItemORM.__table__
+        row = self.session.execute(
+            select(table.c.id, table.c.quantity, table.c.reserved_quantity).where(
+                table.c.product_id == product.id,
+                table.c.warehouse_id == warehouse.id
+            )
+        ).one()
+        return self._balance_to_domain(row, product, warehouse)
+
+    def _balance_to_domain(self, row, product: Product, warehouse: Warehouse) -> StockItem:
         return StockItem(
-            id=stock_item_orm.id,
+            id=row.id,
             product=product,
             warehouse=warehouse,
+            quantity=row.quantity,
+            reserved_quantity=row.reserved_quantity
+        )
+
+    def _upsert_quantities(self, upsert, increments: dict):
+        table = StockItemORM.__table__
+        statement = upsert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.product_id, table.c.warehouse_id],
+            set_={"quantity": table.c.quantity + statement.excluded.quantity, "version": table.c.version + 1}
+        )
+        self.session.execute(statement, [
+            {"product_id": product_id, "warehouse_id": warehouse_id,
+             "quantity": quantity, "reserved_quantity": 0}
+            for (product_id, warehouse_id), quantity in increments.items()
+        ])
+
+    def _update_or_insert_quantities(self, increments: dict):
+        table = StockItemORM.__table__
+        keys = list(increments)
+        existing = {}
+        for start in range(0, len(keys), IN_CLAUSE_CHUNK_SIZE):
+            chunk = keys[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = self.session.execute(
+                select(table.c.id, table.c.product_id, table.c.warehouse_id)
+                .where(tuple_(table.c.product_id, table.c.warehouse_id).in_(chunk))
+            )
+            existing.update({(row.product_id, row.warehouse_id): row.id for row in rows})
+
+        updates = [
+            {"stock_item_id": existing[key], "increment": quantity}
+            for key, quantity in increments.items() if key in existing
+        ]
+        inserts = [
+            {"product_id": key[0], "warehouse_id": key[1], "quantity": quantity, "reserved_quantity": 0}
+            for key, quantity in increments.items() if key not in existing
+        ]
+        if updates:
+            self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("stock_item_id"))
+                .values(quantity=table.c.quantity + bindparam("increment"), version=table.c.version + 1),
+                updates
+            )
+        if inserts:
+            self.session.execute(insert(table), inserts)
+
+    def list(self) -> List[StockItem]:
+        return self._fetch(self._select())
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[StockItem]:
+        return self._iter(self._select(), chunk_size)
+
+    def _select(self):
+        if self.loading_strategy is LoadingStrategy.RAW:
+            return (
+                select(
+                    StockItemORM.id,
+                    StockItemORM.quantity,
+                    StockItemORM.reserved_quantity,
+                    *_product_columns(ProductORM, "product"),
+                    *_warehouse_columns(WarehouseORM, "warehouse")
+                )
+                .join(ProductORM, StockItemORM.product_id == ProductORM.id)
+                .join(WarehouseORM, StockItemORM.warehouse_id == WarehouseORM.id)
+            )
+        loader = joinedload if self.loading_strategy is LoadingStrategy.JOINED else selectinload
+        return select(StockItemORM).options(
+            loader(StockItemORM.product),
+            loader(StockItemORM.warehouse)
+        ).execution_options(populate_existing=True)
+
+    def _fetch(self, statement) -> List[StockItem]:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            rows = _core_connection(self.session).execute(statement)
+            return [self._row_to_domain(row, references) for row in rows]
+        return [self._to_domain(si, references) for si in self.session.scalars(statement)]
+
+    def _iter(self, statement, chunk_size: int) -> Iterator[StockItem]:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            connection = _core_connection(self.session)
+            for row in _iter_keyset(connection, statement, StockItemORM.id, chunk_size):
+                yield self._row_to_domain(row, references)
+        else:
+            for si in _iter_keyset(self.session, statement, StockItemORM.id, chunk_size, scalars=True):
+                yield self._to_domain(si, references)
+
+    def _fetch_one(self, statement) -> StockItem:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            return self._row_to_domain(_core_connection(self.session).execute(statement).one(), references)
+        return self._to_domain(self.session.scalars(statement).one(), references)
+
+    def _to_domain(self, stock_item_orm: StockItemORM, references: _References) -> StockItem:
+        return StockItem(
+            id=stock_item_orm.id,
+            product=references.product(
+                stock_item_orm.product_id, lambda: _product_to_domain(stock_item_orm.product)
+            ),
+            warehouse=references.warehouse(
+                stock_item_orm.warehouse_id, lambda: _warehouse_to_domain(stock_item_orm.warehouse)
+            ),
             quantity=stock_item_orm.quantity,
             reserved_quantity=stock_item_orm.reserved_quantity
         )
 
+    # Rows follow the column order of _select: stock item, product, warehouse.
+    def _row_to_domain(self, row, references: _References) -> StockItem:
+        return StockItem(
+            id=row[0],
+            product=references.product(row[3], lambda: _product_from_columns(row[3:7])),
+            warehouse=references.warehouse(row[7], lambda: _warehouse_from_columns(row[7:11])),
+            quantity=row[1],
+            reserved_quantity=row[2]
+        )
+
 class SqlAlchemyStockMovementRepository(StockMovementRepository):
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        loading_strategy: LoadingStrategy = LoadingStrategy.JOINED,
+        reference_cache: Optional[ReferenceDataCache] = None,
+        archive: Optional[MovementArchive] = None
+    ):
         self.session = session
+        self.loading_strategy = loading_strategy
+        self.reference_cache = reference_cache
+        self.archive = archive
 
     def add(self, movement: StockMovement):
-        movement_orm = StockMovementORM(
-            product_id=movement.product.id,
-            source_warehouse_id=movement.source_warehouse.id,
-            destination_warehouse_id=movement.destination_warehouse.id,
-            quantity=movement.quantity,
-            movement_type=movement.movement_type,
-            timestamp=movement.timestamp
-        )
+        movement_orm = StockMovementORM(**movement_values(movement))
         self.session.add(movement_orm)
 
+    def add_many(self, movements: List[StockMovement]):
+        if movements:
+            self.session.execute(
+                insert(StockMovementORM.__table__),
+                [movement_values(m) for m in movements]
+            )
+
     def get(self, movement_id: int) -> StockMovement:
-        movement_orm = self.session.query(StockMovementORM).filter_by(id=movement_id).one()
-        return self._to_domain(movement_orm)
+        try:
+            return self._fetch_one(self._select().where(StockMovementORM.id == movement_id))
+        except NoResultFound:
+            archived = list(self._iter_archived(1, movement_id=movement_id))
+            if not archived:
+                raise
+            return archived[0]
 
     def list(self) -> List[StockMovement]:
-        movements_orm = self.session.query(StockMovementORM).all()
-        return [self._to_domain(m) for m in movements_orm]
+        return self._fetch(self._select())
+
+    def iter_all(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[StockMovement]:
+        return self._iter(self._select(), chunk_size)
 
     def list_by_product(self, product_id: int) -> List[StockMovement]:
-        movements_orm = self.session.query(StockMovementORM).filter_by(product_id=product_id).all()
-        return [self._to_domain(m) for m in movements_orm]
+        return self._fetch(self._select_by_product(product_id))
 
     def list_by_warehouse(self, warehouse_id: int) -> List[StockMovement]:
-        movements_orm = self.session.query(StockMovementORM).filter(
+        return self._fetch(self._select_by_warehouse(warehouse_id))
+
+    def iter_by_product(self, product_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[StockMovement]:
+        return self._iter(self._select_by_product(product_id), chunk_size)
+
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[StockMovement]:
+        return self._iter(self._select_by_warehouse(warehouse_id), chunk_size)
+
+    # The reads above only touch the live table. Archived history is read
+    # here, for a time range, so only the archive months that overlap it are
+    # opened. Archived movements are always older than the ones still in the
+    # table, so they are returned first.
+    def iter_history(
+        self,
+        since: datetime,
+        until: Optional[datetime] = None,
+        product_id: Optional[int] = None,
+        warehouse_id: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[StockMovement]:
+        statement = self._select().where(StockMovementORM.timestamp >= since)
+        if until is not None:
+            statement = statement.where(StockMovementORM.timestamp < until)
+        if product_id is not None:
+            statement = statement.where(StockMovementORM.product_id == product_id)
+        if warehouse_id is not None:
+            statement = statement.where(
+                (StockMovementORM.source_warehouse_id == warehouse_id) |
+                (StockMovementORM.destination_warehouse_id == warehouse_id)
+            )
+        filters = {"since": since, "until": until, "product_id": product_id, "warehouse_id": warehouse_id}
+        return chain(self._iter_archived(chunk_size, **filters), self._iter(statement, chunk_size))
+
+    def list_history(
+        self,
+        since: datetime,
+        until: Optional[datetime] = None,
+        product_id: Optional[int] = None,
+        warehouse_id: Optional[int] = None
+    ) -> List[StockMovement]:
+        return list(self.iter_history(since, until, product_id, warehouse_id))
+
+    def _select_by_product(self, product_id: int):
+        return self._select().where(StockMovementORM.product_id == product_id)
+
+    def _select_by_warehouse(self, warehouse_id: int):
+        return self._select().where(
             (StockMovementORM.source_warehouse_id == warehouse_id) |
             (StockMovementORM.destination_warehouse_id == warehouse_id)
-        ).all()
-        return [self._to_domain(m) for m in movements_orm]
-
-    def _to_domain(self, movement_orm: StockMovementORM) -> StockMovement:
-        product = Product(
-            id=movement_orm.product.id,
-            name=movement_orm.product.name,
-            quantity=movement_orm.product.quantity,
-            price=movement_orm.product.price
-        )
-        source_warehouse = Warehouse(
-            id=movement_orm.source_warehouse.id,
-            name=movement_orm.source_warehouse.name,
-            location=movement_orm.source_warehouse.location,
-            capacity=movement_orm.source_warehouse.capacity
-        )
-        destination_warehouse = Warehouse(
-            id=movement_orm.destination_warehouse.id,
-            name=movement_orm.destination_warehouse.name,
-            location=movement_orm.destination_warehouse.location,
-            capacity=movement_orm.destination_warehouse.capacity
         )
+
+    def _select(self):
+        if self.loading_strategy is LoadingStrategy.RAW:
+            source = aliased(WarehouseORM)
+            destination = aliased(WarehouseORM)
+            return (
+                select(
+                    StockMovementORM.id,
+                    StockMovementORM.quantity,
+                    StockMovementORM.movement_type,
+                    StockMovementORM.timestamp,
+                    *_product_columns(ProductORM, "product"),
+                    *_warehouse_columns(source, "source"),
+                    *_warehouse_columns(destination, "destination")
+                )
+                .join(ProductORM, StockMovementORM.product_id == ProductORM.id)
+                .outerjoin(source, StockMovementORM.source_warehouse_id == source.id)
+                .outerjoin(destination, StockMovementORM.destination_warehouse_id == destination.id)
+            )
+        loader = joinedload if self.loading_strategy is LoadingStrategy.JOINED else selectinload
+        return select(StockMovementORM).options(
+            loader(StockMovementORM.product),
+            loader(StockMovementORM.source_warehouse),
+            loader(StockMovementORM.destination_warehouse)
+        )
+
+    def _fetch(self, statement) -> List[StockMovement]:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            rows = _core_connection(self.session).execute(statement)
+            return [self._row_to_domain(row, references) for row in rows]
+        return [self._to_domain(m, references) for m in self.session.scalars(statement)]
+
+    def _iter(self, statement, chunk_size: int) -> Iterator[StockMovement]:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            connection = _core_connection(self.session)
+            for row in _iter_keyset(connection, statement, StockMovementORM.id, chunk_size):
+                yield self._row_to_domain(row, references)
+        else:
+            for m in _iter_keyset(self.session, statement, StockMovementORM.id, chunk_size, scalars=True):
+                yield self._to_domain(m, references)
+
+    def _fetch_one(self, statement) -> StockMovement:
+        references = _References(self.reference_cache)
+        if self.loading_strategy is LoadingStrategy.RAW:
+            return self._row_to_domain(_core_connection(self.session).execute(statement).one(), references)
+        return self._to_domain(self.session.scalars(statement).one(), references)
+
+    def _iter_archived(self, chunk_size: int, **filters) -> Iterator[StockMovement]:
+        if self.archive is None:
+            return
+        references = _References(self.reference_cache)
+        rows = self.archive.read(**filters)
+        while chunk := list(islice(rows, chunk_size)):
+            products = self._load_references(
+                ProductORM, {r["product_id"] for r in chunk} - references.products.keys(), _product_to_domain
+            )
+            warehouses = self._load_references(
+                WarehouseORM,
+                {r[c] for r in chunk for c in ("source_warehouse_id", "destination_warehouse_id")}
+                - references.warehouses.keys(),
+                _warehouse_to_domain
+            )
+            for row in chunk:
+                yield StockMovement(
+                    id=row["id"],
+                    product=references.product(row["product_id"], lambda: products[row["product_id"]]),
+                    source_warehouse=references.warehouse(
+                        row["source_warehouse_id"], lambda: warehouses[row["source_warehouse_id"]]
+                    ),
+                    destination_warehouse=references.warehouse(
+                        row["destination_warehouse_id"], lambda: warehouses[row["destination_warehouse_id"]]
+                    ),
+                    quantity=row["quantity"],
+                    movement_type=row["movement_type"],
+                    timestamp=row["timestamp"]
+                )
+
+    def _load_references(self, entity, ids: set, to_domain) -> dict:
+        ids = list(ids)
+        references = {}
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+            references.update({
+                orm.id: to_domain(orm)
+                for orm in self.session.scalars(
+                    select(entity).where(entity.id.in_(ids[start:start + IN_CLAUSE_CHUNK_SIZE]))
+                )
+            })
+        return references
+
+    def _to_domain(self, movement_orm: StockMovementORM, references: _References) -> StockMovement:
         return StockMovement(
             id=movement_orm.id,
-            product=product,
-            source_warehouse=source_warehouse,
-            destination_warehouse=destination_warehouse,
+            product=references.product(
+                movement_orm.product_id, lambda: _product_to_domain(movement_orm.product)
+            ),
+            source_warehouse=references.warehouse(
+                movement_orm.source_warehouse_id, lambda: _warehouse_to_domain(movement_orm.source_warehouse)
+            ),
+            destination_warehouse=references.warehouse(
+                movement_orm.destination_warehouse_id,
+                lambda: _warehouse_to_domain(movement_orm.destination_warehouse)
+            ),
             quantity=movement_orm.quantity,
             movement_type=movement_orm.movement_type,
             timestamp=movement_orm.timestamp
         )
 
-
-
-
-
+    # Rows follow the column order of _select: movement, product, source and
+    # destination warehouses.
+    def _row_to_domain(self, row, references: _References) -> StockMovement:
+        return StockMovement(
+            id=row[0],
+            product=references.product(row[4], lambda: _product_from_columns(row[4:8])),
+            source_warehouse=references.warehouse(row[8], lambda: _warehouse_from_columns(row[8:12])),
+            destination_warehouse=references.warehouse(row[12], lambda: _warehouse_from_columns(row[12:16])),
+            quantity=row[1],
+            movement_type=row[2],
+            timestamp=row[3]
+        )
@@ -1,21 +1,65 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from domain.unit_of_work import UnitOfWork
+from .archive import MovementArchive
+from .command_batch import SqlAlchemyCommandBatch, translate_conflicts
+from .instrumentation import Instrumentation
+from .movement_writer import MovementWriter, WriteBehindStockMovementRepository
+from .cache import (
+    AvailabilityCache, ReferenceDataCache, UnitOfWorkReferenceCache,
+    CachedProductRepository, CachedStockItemRepository, CachedWarehouseRepository
+)
 from .repositories import (
     SqlAlchemyProductRepository,
     SqlAlchemyOrderRepository,
     SqlAlchemyWarehouseRepository,
     SqlAlchemyStockItemRepository,
-    SqlAlchemyStockMovementRepository
+    SqlAlchemyStockMovementRepository,
+    LoadingStrategy
 )
 
 class SqlAlchemyUnitOfWork(UnitOfWork):
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        loading_strategy: LoadingStrategy = LoadingStrategy.JOINED,
+        reference_cache: Optional[ReferenceDataCache] = None,
+        movement_archive: Optional[MovementArchive] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        movement_writer: Optional[MovementWriter] = None,
+        availability_cache: Optional[AvailabilityCache] = None
+    ):
         self.session = session
+        self.reference_cache = reference_cache
+        self._references = None
+        if reference_cache is not None:
+            reference_cache = self._references = UnitOfWorkReferenceCache(reference_cache, session)
         self.products = SqlAlchemyProductRepository(session)
         self.orders = SqlAlchemyOrderRepository(session)
         self.warehouses = SqlAlchemyWarehouseRepository(session)
-        self.stock_items = SqlAlchemyStockItemRepository(session)
-        self.stock_movements = SqlAlchemyStockMovementRepository(session)
+        if reference_cache is not None:
+            self.products = CachedProductRepository(self.products, reference_cache)
+            self.warehouses = CachedWarehouseRepository(self.warehouses, reference_cache)
+        self.stock_items = SqlAlchemyStockItemRepository(session, loading_strategy, reference_cache)
+        self._availability = None
+        if availability_cache is not None:
+            self.stock_items = self._availability = CachedStockItemRepository(
+                self.stock_items, availability_cache
+            )
+        self.stock_movements = SqlAlchemyStockMovementRepository(
+            session, loading_strategy, reference_cache, movement_archive
+        )
+        self._write_behind = None
+        if movement_writer is not None:
+            self.stock_movements = self._write_behind = WriteBehindStockMovementRepository(
+                self.stock_movements, movement_writer
+            )
+        if instrumentation is not None:
+            self.products = instrumentation.wrap(self.products, "products")
+            self.orders = instrumentation.wrap(self.orders, "orders")
+            self.warehouses = instrumentation.wrap(self.warehouses, "warehouses")
+            self.stock_items = instrumentation.wrap(self.stock_items, "stock_items")
+            self.stock_movements = instrumentation.wrap(self.stock_movements, "stock_movements")
         self._committed = False
 
     def __enter__(self):
@@ -24,12 +68,43 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
     def __exit__(self, exc_type, exc_val, exc_tb):
         if exc_type is not None or not self._committed:
             self.rollback()
+        if self._references is not None:
+            self._references.close()
         self.session.close()
 
+    # Write-behind movements are journaled before the database commit, so a
+    # commit that succeeds never loses them and one that fails discards them.
     def commit(self):
-        self.session.commit()
+        try:
+            with translate_conflicts():
+                if self._write_behind is not None:
+                    self._write_behind.prepare()
+                self.session.commit()
+        except Exception:
+            if self._write_behind is not None:
+                self._write_behind.discard()
+            raise
         self._committed = True
+        if self._availability is not None:
+            self._availability.commit()
+        if self._write_behind is not None:
+            self._write_behind.submit()
+        if self._references is not None:
+            self._references.commit()
+
+    def flush(self):
+        with translate_conflicts():
+            self.session.flush()
+
+    def batch(self, all_or_nothing: bool = False, lock: bool = False) -> SqlAlchemyCommandBatch:
+        return SqlAlchemyCommandBatch(self.session, all_or_nothing, lock)
 
     def rollback(self):
+        if self._references is not None:
+            self._references.rollback()
         self.session.rollback()
-        self._committed = False
\ No newline at end of file
+        self._committed = False
+        if self._write_behind is not None:
+            self._write_behind.discard()
+        if self._availability is not None:
+            self._availability.rollback()
\ No newline at end of file
@@ -1,26 +1,24 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from domain.models import Product, Order, Warehouse, StockItem, StockMovement, MovementType
+import argparse
 from domain.services import WarehouseService
-from infrastructure.orm import Base, ProductORM, OrderORM
-from infrastructure.repositories import SqlAlchemyProductRepository, SqlAlchemyOrderRepository
+from infrastructure.database import DATABASE_URL, create_engine_for, create_schema, create_session_factory
 from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
-from infrastructure.database import DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
-SessionFactory = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--create-schema", action="store_true")
+    args = parser.parse_args(argv)
 
-def main():
-    session = SessionFactory()
-    product_repo = SqlAlchemyProductRepository(session)
-    order_repo = SqlAlchemyOrderRepository(session)
+    engine = create_engine_for(args.database_url)
+    if args.create_schema:
+        create_schema(engine)
+    session_factory = create_session_factory(engine)
 
-    uow = SqlAlchemyUnitOfWork(session)
+    uow = SqlAlchemyUnitOfWork(session_factory())
 
     warehouse_service = WarehouseService(
-        product_repo=product_repo,
-        order_repo=order_repo,
+        product_repo=uow.products,
+        order_repo=uow.orders,
         warehouse_repo=uow.warehouses,
         stock_item_repo=uow.stock_items,
         stock_movement_repo=uow.stock_movements
@@ -97,6 +95,7 @@ def main():
 
         uow.commit()
         print("All operations completed successfully")
+    engine.dispose()
 
 if __name__ == "__main__":
     main()
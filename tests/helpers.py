@@ -0,0 +1,13 @@
+from domain.services import AsyncWarehouseService, WarehouseService
+
+def make_service(uow) -> WarehouseService:
+    return WarehouseService(
+        product_repo=uow.products,
+        order_repo=uow.orders,
+        warehouse_repo=uow.warehouses,
+        stock_item_repo=uow.stock_items,
+        stock_movement_repo=uow.stock_movements
+    )
+
+def make_async_service(uow) -> AsyncWarehouseService:
+    return uow.warehouse_service()
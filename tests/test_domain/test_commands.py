@@ -0,0 +1,48 @@
+import pytest
+from domain.commands import CommandBatch
+from domain.models import Product, Warehouse, StockItem, MovementType
+
+@pytest.fixture
+def stock():
+    laptop = Product(id=1, name="Laptop", quantity=100, price=1000.0)
+    moscow = Warehouse(id=1, name="Moscow", location="Moscow", capacity=100)
+    spb = Warehouse(id=2, name="SPb", location="SPb", capacity=50)
+    stock_items = {(1, 1): StockItem(id=1, product=laptop, warehouse=moscow, quantity=40)}
+    return laptop, moscow, spb, stock_items
+
+def test_commands_apply_in_order_and_report_failures(stock):
+    laptop, moscow, spb, stock_items = stock
+    occupancy = {1: 40, 2: 0}
+    batch = (
+        CommandBatch()
+        .reserve(laptop, moscow, 10)
+        .transfer(laptop, moscow, spb, 35)
+        .transfer(laptop, moscow, spb, 30)
+        .release(laptop, spb, 1)
+        .receive(laptop, spb, 0)
+        .receive(laptop, spb, 21)
+    )
+
+    results = batch.apply(stock_items, occupancy, {1: 100, 2: 50})
+
+    assert [r.applied for r in results] == [True, False, True, False, False, False]
+    assert results[1].error == "Not enough available stock in source warehouse"
+    assert results[3].error == "Cannot release more than reserved"
+    assert results[4].error == "Quantity must be positive"
+    assert results[5].error == "Not enough capacity in warehouse 2"
+    assert [r.movement.movement_type for r in results if r.applied] == [
+        MovementType.RESERVATION, MovementType.TRANSFER
+    ]
+    assert (stock_items[(1, 1)].quantity, stock_items[(1, 1)].reserved_quantity) == (10, 10)
+    assert stock_items[(1, 2)].quantity == 30
+    assert occupancy == {1: 10, 2: 30}
+
+def test_all_or_nothing_marks_every_command_unapplied(stock):
+    laptop, moscow, spb, stock_items = stock
+    batch = CommandBatch(all_or_nothing=True).reserve(laptop, moscow, 10).reserve(laptop, spb, 1)
+
+    results = batch.apply(stock_items, {1: 40, 2: 0}, {1: 100, 2: 50})
+
+    assert [r.applied for r in results] == [False, False]
+    assert results[0].error == "Batch aborted because another command failed"
+    assert results[1].movement is None
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from domain.exceptions import ConcurrencyConflict
+from domain.retry import retry_on_conflict
+
+def test_retries_until_the_operation_succeeds():
+    calls = []
+
+    @retry_on_conflict(attempts=3, base_delay=0)
+    def operation():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConcurrencyConflict()
+        return "done"
+
+    assert operation() == "done"
+    assert len(calls) == 3
+
+def test_gives_up_after_the_last_attempt_and_ignores_other_errors():
+    calls = []
+
+    @retry_on_conflict(attempts=2, base_delay=0)
+    def conflicting():
+        calls.append(1)
+        raise ConcurrencyConflict()
+
+    @retry_on_conflict(attempts=2, base_delay=0)
+    def failing():
+        calls.append(1)
+        raise ValueError("Not enough stock available")
+
+    with pytest.raises(ConcurrencyConflict):
+        conflicting()
+    with pytest.raises(ValueError):
+        failing()
+    assert len(calls) == 3
+
+def test_retries_coroutines():
+    calls = []
+
+    @retry_on_conflict(attempts=2, base_delay=0)
+    async def operation():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConcurrencyConflict()
+        return "done"
+
+    assert asyncio.run(operation()) == "done"
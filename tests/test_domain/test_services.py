@@ -1,6 +1,8 @@
 import pytest
 from datetime import datetime
-from domain.models import Product, Order, Warehouse, StockItem, StockMovement, MovementType
+from domain.models import Product, Order, OrderLine, Warehouse, StockItem, StockMovement, MovementType, ReceiptLine
+from domain.allocation import WarehouseCost
+from domain.exceptions import StockItemNotFound
 from domain.services import WarehouseService
 from domain.repositories import (
     ProductRepository, OrderRepository, WarehouseRepository,
@@ -23,6 +25,9 @@ class MockProductRepository(ProductRepository):
     def list(self):
         return self.products
 
+    def iter_all(self, chunk_size=1000):
+        yield from self.products
+
 class MockOrderRepository(OrderRepository):
     def __init__(self):
         self.orders = []
@@ -33,15 +38,23 @@ class MockOrderRepository(OrderRepository):
         self.orders.append(order)
         self.next_id += 1
 
+    def add_many(self, orders):
+        for order in orders:
+            self.add(order)
+
     def get(self, order_id: int) -> Order:
         return next(o for o in self.orders if o.id == order_id)
 
     def list(self):
         return self.orders
 
+    def iter_all(self, chunk_size=1000):
+        yield from self.orders
+
 class MockWarehouseRepository(WarehouseRepository):
     def __init__(self):
         self.warehouses = []
+        self.occupancy = {}
         self.next_id = 1
 
     def add(self, warehouse: Warehouse):
@@ -52,9 +65,35 @@ class MockWarehouseRepository(WarehouseRepository):
     def get(self, warehouse_id: int) -> Warehouse:
         return next(w for w in self.warehouses if w.id == warehouse_id)
 
+    def get_occupancy(self, warehouse_id: int) -> int:
+        return self.occupancy.get(warehouse_id, 0)
+
+    def occupy(self, warehouse_id: int, quantity: int) -> bool:
+        occupied = self.get_occupancy(warehouse_id) + quantity
+        if occupied > self.get(warehouse_id).capacity:
+            return False
+        self.occupancy[warehouse_id] = occupied
+        return True
+
+    def vacate(self, warehouse_id: int, quantity: int) -> bool:
+        occupied = self.get_occupancy(warehouse_id) - quantity
+        if occupied < 0:
+            return False
+        self.occupancy[warehouse_id] = occupied
+        return True
+
+    def transfer_occupancy(self, source_id: int, destination_id: int, quantity: int) -> bool:
+        if not self.occupy(destination_id, quantity):
+            return False
+        self.occupancy[source_id] = self.get_occupancy(source_id) - quantity
+        return True
+
     def list(self):
         return self.warehouses
 
+    def iter_all(self, chunk_size=1000):
+        yield from self.warehouses
+
 class MockStockItemRepository(StockItemRepository):
     def __init__(self):
         self.stock_items = []
@@ -69,14 +108,95 @@ class MockStockItemRepository(StockItemRepository):
         return next(si for si in self.stock_items if si.id == stock_item_id)
 
     def get_by_product_and_warehouse(self, product_id: int, warehouse_id: int) -> StockItem:
-        return next(
-            si for si in self.stock_items
-            if si.product.id == product_id and si.warehouse.id == warehouse_id
+        stock_item = next(
+            (si for si in self.stock_items
+             if si.product.id == product_id and si.warehouse.id == warehouse_id),
+            None
         )
+        if stock_item is None:
+            raise StockItemNotFound()
+        return stock_item
+
+    def list_available(self, product_ids):
+        return [
+            si for si in self.stock_items
+            if si.product.id in product_ids and si.quantity - si.reserved_quantity > 0
+        ]
+
+    def available_by_product(self, product_ids):
+        return {
+            product_id: sum(
+                si.quantity - si.reserved_quantity for si in self.stock_items if si.product.id == product_id
+            )
+            for product_id in product_ids
+        }
+
+    def available_by_warehouse(self, warehouse_ids):
+        return {
+            warehouse_id: sum(
+                si.quantity - si.reserved_quantity for si in self.stock_items if si.warehouse.id == warehouse_id
+            )
+            for warehouse_id in warehouse_ids
+        }
+
+    def available_by_location(self, product_ids):
+        available = {}
+        for si in self.stock_items:
+            if si.product.id in product_ids:
+                key = (si.product.id, si.warehouse.location)
+                available[key] = available.get(key, 0) + si.quantity - si.reserved_quantity
+        return available
+
+    def receive_batch(self, lines):
+        for line in lines:
+            self.deposit(line.product, line.warehouse, line.quantity)
+
+    def deposit(self, product, warehouse, quantity):
+        try:
+            stock_item = self.get_by_product_and_warehouse(product.id, warehouse.id)
+            stock_item.quantity += quantity
+        except StockItemNotFound:
+            stock_item = StockItem(id=None, product=product, warehouse=warehouse, quantity=quantity)
+            self.add(stock_item)
+        return stock_item
+
+    def withdraw(self, product, warehouse, quantity):
+        stock_item = self._find_available(product, warehouse, quantity)
+        if stock_item is not None:
+            stock_item.quantity -= quantity
+        return stock_item
+
+    def reserve(self, product, warehouse, quantity):
+        stock_item = self._find_available(product, warehouse, quantity)
+        if stock_item is not None:
+            stock_item.reserve(quantity)
+        return stock_item
+
+    def release(self, product, warehouse, quantity):
+        try:
+            stock_item = self.get_by_product_and_warehouse(product.id, warehouse.id)
+        except StockItemNotFound:
+            return None
+        if stock_item.reserved_quantity < quantity:
+            return None
+        stock_item.release_reservation(quantity)
+        return stock_item
+
+    def _find_available(self, product, warehouse, quantity):
+        try:
+            stock_item = self.get_by_product_and_warehouse(product.id, warehouse.id)
+        except StockItemNotFound:
+            return None
+        if stock_item.quantity - stock_item.reserved_quantity < quantity:
+            return None
+        return stock_item
 
     def list(self):
         return self.stock_items
 
+    def iter_all(self, chunk_size=1000):
+        yield from self.stock_items
+
 class MockStockMovementRepository(StockMovementRepository):
     def __init__(self):
         self.movements = []
@@ -87,21 +207,35 @@ class MockStockMovementRepository(StockMovementRepository):
         self.movements.append(movement)
         self.next_id += 1
 
+    def add_many(self, movements):
+        for movement in movements:
+            self.add(movement)
+
     def get(self, movement_id: int) -> StockMovement:
         return next(m for m in self.movements if m.id == movement_id)
 
     def list(self):
         return self.movements
 
+    def iter_all(self, chunk_size=1000):
+        yield from self.movements
+
     def list_by_product(self, product_id: int):
         return [m for m in self.movements if m.product.id == product_id]
 
     def list_by_warehouse(self, warehouse_id: int):
         return [
             m for m in self.movements
-            if m.source_warehouse.id == warehouse_id or m.destination_warehouse.id == warehouse_id
+            if (m.source_warehouse and m.source_warehouse.id == warehouse_id)
+            or (m.destination_warehouse and m.destination_warehouse.id == warehouse_id)
         ]
 
+    def iter_by_product(self, product_id: int, chunk_size=1000):
+        yield from self.list_by_product(product_id)
+
+    def iter_by_warehouse(self, warehouse_id: int, chunk_size=1000):
+        yield from self.list_by_warehouse(warehouse_id)
+
 @pytest.fixture
 def repositories():
     return {
@@ -140,6 +274,16 @@ def test_create_order(service, repositories):
     assert {p.name for p in order.products} == {"Product 1", "Product 2"}
     assert len(repositories['orders'].list()) == 1
 
+def test_create_orders(service, repositories):
+    product1 = service.create_product(name="Product 1", quantity=10, price=100.0)
+    product2 = service.create_product(name="Product 2", quantity=20, price=200.0)
+
+    orders = service.create_orders([[product1], [product1, product2]])
+
+    assert [len(o.products) for o in orders] == [1, 2]
+    assert all(o.id is not None for o in orders)
+    assert len(repositories['orders'].list()) == 2
+
 def test_create_warehouse(service, repositories):
     warehouse = service.create_warehouse(name="Main Warehouse", location="Moscow", capacity=1000)
     
@@ -214,3 +358,203 @@ def test_release_reserved_stock(service, repositories):
     
     assert stock_item.quantity == 10
     assert stock_item.reserved_quantity == 2
+
+def test_every_stock_mutation_is_recorded(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    source_warehouse = service.create_warehouse(name="Source", location="Moscow", capacity=1000)
+    dest_warehouse = service.create_warehouse(name="Dest", location="SPb", capacity=1000)
+
+    service.add_stock_to_warehouse(product, source_warehouse, 10)
+    service.reserve_stock(product, source_warehouse, 4)
+    service.release_reserved_stock(product, source_warehouse, 1)
+    service.transfer_stock(product, source_warehouse, dest_warehouse, 3)
+    service.ship_stock(product, dest_warehouse, 2)
+    service.allocate_order(service.create_order(lines=[OrderLine(product=product, quantity=2)]))
+
+    assert [(m.movement_type, m.quantity) for m in repositories['stock_movements'].list()] == [
+        (MovementType.RECEIPT, 10),
+        (MovementType.RESERVATION, 4),
+        (MovementType.RELEASE, 1),
+        (MovementType.TRANSFER, 3),
+        (MovementType.SHIPMENT, 2),
+        (MovementType.RESERVATION, 2)
+    ]
+
+def test_ship_stock(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    warehouse = service.create_warehouse(name="Main Warehouse", location="Moscow", capacity=1000)
+    service.add_stock_to_warehouse(product, warehouse, 10)
+    service.reserve_stock(product, warehouse, 6)
+
+    movement = service.ship_stock(product, warehouse, 4)
+    with pytest.raises(ValueError):
+        service.ship_stock(product, warehouse, 1)
+
+    assert (movement.source_warehouse.id, movement.destination_warehouse) == (warehouse.id, None)
+    assert repositories['stock_items'].get_by_product_and_warehouse(product.id, warehouse.id).quantity == 6
+    assert repositories['warehouses'].get_occupancy(warehouse.id) == 6
+
+def test_receive_stock_batch(service, repositories):
+    product1 = service.create_product(name="Product 1", quantity=10, price=100.0)
+    product2 = service.create_product(name="Product 2", quantity=20, price=200.0)
+    warehouse = service.create_warehouse(name="Main Warehouse", location="Moscow", capacity=1000)
+    service.add_stock_to_warehouse(product1, warehouse, 5)
+
+    movements = service.receive_stock_batch([
+        ReceiptLine(product=product1, warehouse=warehouse, quantity=10),
+        ReceiptLine(product=product2, warehouse=warehouse, quantity=7),
+        ReceiptLine(product=product2, warehouse=warehouse, quantity=3)
+    ])
+
+    assert [m.movement_type for m in movements] == [MovementType.RECEIPT] * 3
+    assert all(m.source_warehouse is None for m in movements)
+    assert all(m.destination_warehouse.id == warehouse.id for m in movements)
+    assert len(repositories['stock_movements'].list()) == 4
+    stock_items = repositories['stock_items']
+    assert stock_items.get_by_product_and_warehouse(product1.id, warehouse.id).quantity == 15
+    assert stock_items.get_by_product_and_warehouse(product2.id, warehouse.id).quantity == 10
+
+def test_receive_stock_batch_rejects_non_positive_quantities(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    warehouse = service.create_warehouse(name="Main Warehouse", location="Moscow", capacity=1000)
+
+    with pytest.raises(ValueError):
+        service.receive_stock_batch([ReceiptLine(product=product, warehouse=warehouse, quantity=0)])
+
+    assert repositories['stock_items'].list() == []
+    assert repositories['stock_movements'].list() == []
+
+def test_reserve_stock_rejects_overselling(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    warehouse = service.create_warehouse(name="Main Warehouse", location="Moscow", capacity=1000)
+    service.add_stock_to_warehouse(product, warehouse, 10)
+    service.reserve_stock(product, warehouse, 8)
+
+    with pytest.raises(ValueError):
+        service.reserve_stock(product, warehouse, 3)
+
+    stock_item = repositories['stock_items'].get_by_product_and_warehouse(product.id, warehouse.id)
+    assert stock_item.reserved_quantity == 8
+
+def test_transfer_stock_cannot_move_reserved_stock(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    source_warehouse = service.create_warehouse(name="Source", location="Moscow", capacity=1000)
+    dest_warehouse = service.create_warehouse(name="Dest", location="SPb", capacity=1000)
+    service.add_stock_to_warehouse(product, source_warehouse, 10)
+    service.reserve_stock(product, source_warehouse, 6)
+
+    with pytest.raises(ValueError):
+        service.transfer_stock(product, source_warehouse, dest_warehouse, 5)
+
+    assert MovementType.TRANSFER not in {m.movement_type for m in repositories['stock_movements'].list()}
+
+def test_allocate_order_reserves_lines_across_warehouses(service, repositories):
+    laptop = service.create_product(name="Laptop", quantity=10, price=1000.0)
+    phone = service.create_product(name="Phone", quantity=10, price=500.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+    service.add_stock_to_warehouse(laptop, moscow, 5)
+    service.add_stock_to_warehouse(laptop, spb, 8)
+    service.add_stock_to_warehouse(phone, moscow, 3)
+    order = service.create_order(lines=[OrderLine(product=laptop, quantity=10), OrderLine(product=phone, quantity=2)])
+
+    allocations = service.allocate_order(order)
+
+    assert [(a.product.id, a.warehouse.id, a.quantity) for a in allocations] == [
+        (laptop.id, spb.id, 8), (laptop.id, moscow.id, 2), (phone.id, moscow.id, 2)
+    ]
+    stock_items = repositories['stock_items']
+    assert stock_items.get_by_product_and_warehouse(laptop.id, spb.id).reserved_quantity == 8
+    assert stock_items.get_by_product_and_warehouse(laptop.id, moscow.id).reserved_quantity == 2
+
+def test_allocate_order_reserves_in_warehouse_then_product_order(service, repositories, monkeypatch):
+    laptop = service.create_product(name="Laptop", quantity=10, price=1000.0)
+    phone = service.create_product(name="Phone", quantity=10, price=500.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+    service.add_stock_to_warehouse(laptop, moscow, 5)
+    service.add_stock_to_warehouse(laptop, spb, 8)
+    service.add_stock_to_warehouse(phone, moscow, 3)
+    order = service.create_order(lines=[OrderLine(product=laptop, quantity=10), OrderLine(product=phone, quantity=2)])
+    stock_items = repositories['stock_items']
+    reserve = stock_items.reserve
+    reserved = []
+    monkeypatch.setattr(stock_items, "reserve", lambda p, w, q: reserved.append((w.id, p.id)) or reserve(p, w, q))
+
+    service.allocate_order(order)
+
+    assert reserved == [(moscow.id, laptop.id), (moscow.id, phone.id), (spb.id, laptop.id)]
+
+def test_allocate_order_follows_cost_policy(service, repositories):
+    laptop = service.create_product(name="Laptop", quantity=10, price=1000.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+    service.add_stock_to_warehouse(laptop, moscow, 5)
+    service.add_stock_to_warehouse(laptop, spb, 8)
+    order = service.create_order(lines=[OrderLine(product=laptop, quantity=6)])
+
+    allocations = service.allocate_order(order, WarehouseCost({moscow.id: 1.0, spb.id: 5.0}))
+
+    assert [(a.warehouse.id, a.quantity) for a in allocations] == [(moscow.id, 5), (spb.id, 1)]
+
+def test_allocate_order_is_all_or_nothing(service, repositories):
+    laptop = service.create_product(name="Laptop", quantity=10, price=1000.0)
+    phone = service.create_product(name="Phone", quantity=10, price=500.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    service.add_stock_to_warehouse(laptop, moscow, 5)
+    service.add_stock_to_warehouse(phone, moscow, 1)
+    order = service.create_order(lines=[OrderLine(product=laptop, quantity=5), OrderLine(product=phone, quantity=2)])
+
+    with pytest.raises(ValueError):
+        service.allocate_order(order)
+
+    assert all(si.reserved_quantity == 0 for si in repositories['stock_items'].list())
+
+def test_stock_operations_maintain_occupancy(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    source_warehouse = service.create_warehouse(name="Source", location="Moscow", capacity=100)
+    dest_warehouse = service.create_warehouse(name="Dest", location="SPb", capacity=100)
+
+    service.add_stock_to_warehouse(product, source_warehouse, 60)
+    service.receive_stock_batch([ReceiptLine(product=product, warehouse=dest_warehouse, quantity=30)])
+    service.transfer_stock(product, source_warehouse, dest_warehouse, 20)
+
+    warehouses = repositories['warehouses']
+    assert warehouses.get_occupancy(source_warehouse.id) == 40
+    assert warehouses.get_occupancy(dest_warehouse.id) == 50
+
+def test_capacity_is_enforced(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    source_warehouse = service.create_warehouse(name="Source", location="Moscow", capacity=100)
+    dest_warehouse = service.create_warehouse(name="Dest", location="SPb", capacity=10)
+    service.add_stock_to_warehouse(product, source_warehouse, 100)
+
+    with pytest.raises(ValueError):
+        service.add_stock_to_warehouse(product, source_warehouse, 1)
+    with pytest.raises(ValueError):
+        service.transfer_stock(product, source_warehouse, dest_warehouse, 11)
+    with pytest.raises(ValueError):
+        service.receive_stock_batch([
+            ReceiptLine(product=product, warehouse=dest_warehouse, quantity=6),
+            ReceiptLine(product=product, warehouse=dest_warehouse, quantity=6)
+        ])
+
+    warehouses = repositories['warehouses']
+    assert warehouses.get_occupancy(source_warehouse.id) == 100
+    assert warehouses.get_occupancy(dest_warehouse.id) == 0
+    assert len(repositories['stock_items'].list()) == 1
+
+def test_available_quantity_sums_unreserved_stock(service, repositories):
+    product = service.create_product(name="Test Product", quantity=10, price=100.0)
+    other = service.create_product(name="Other Product", quantity=10, price=100.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=100)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=100)
+    service.add_stock_to_warehouse(product, moscow, 30)
+    service.add_stock_to_warehouse(product, spb, 20)
+    service.reserve_stock(product, spb, 5)
+
+    assert service.available_quantity(product) == 45
+    assert service.available_quantity(other) == 0
+    assert repositories['stock_items'].available_by_location([product.id]) == {
+        (product.id, "Moscow"): 30, (product.id, "SPb"): 15
+    }
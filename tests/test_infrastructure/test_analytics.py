@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from datetime import datetime, timedelta
+from infrastructure.analytics import (
+    inventory_value, load_movement_columns, load_stock_columns, product_totals, product_turnover, warehouse_totals
+)
+from tests.helpers import make_service
+
+@pytest.fixture
+def stocked(uow):
+    service = make_service(uow)
+    laptop = service.create_product(name="Laptop", quantity=100, price=1000.0)
+    phone = service.create_product(name="Phone", quantity=100, price=500.0)
+    tablet = service.create_product(name="Tablet", quantity=100, price=300.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+    service.add_stock_to_warehouse(laptop, moscow, 40)
+    service.add_stock_to_warehouse(laptop, spb, 20)
+    service.add_stock_to_warehouse(phone, spb, 10)
+    service.add_stock_to_warehouse(tablet, spb, 5)
+    service.reserve_stock(laptop, moscow, 5)
+    service.ship_stock(laptop, moscow, 30)
+    service.ship_stock(phone, spb, 10)
+    return laptop, phone, tablet, moscow, spb
+
+def test_totals_and_inventory_value(uow, stocked):
+    laptop, phone, tablet, moscow, spb = stocked
+    stock = load_stock_columns(uow.session, chunk_size=2)
+
+    by_warehouse = warehouse_totals(stock)
+    by_product = product_totals(stock)
+
+    assert by_warehouse.keys.tolist() == [moscow.id, spb.id]
+    assert by_warehouse.totals["quantity"].tolist() == [10, 25]
+    assert by_warehouse.totals["reserved_quantity"].tolist() == [5, 0]
+    assert by_warehouse.totals["value"].tolist() == [10_000.0, 21_500.0]
+    assert by_product.keys.tolist() == [laptop.id, phone.id, tablet.id]
+    assert by_product.totals["quantity"].tolist() == [30, 0, 5]
+    assert inventory_value(stock) == 31_500.0
+
+def test_turnover_and_days_of_cover(uow, stocked):
+    laptop, phone, tablet, moscow, spb = stocked
+    now = datetime.now()
+    movements = load_movement_columns(uow.session, since=now - timedelta(days=30), until=now + timedelta(days=1))
+
+    turnover = product_turnover(load_stock_columns(uow.session), movements, days=30)
+
+    assert len(movements.quantity) == 7
+    assert movements.timestamp.dtype == np.dtype("datetime64[us]")
+    assert turnover.product_id.tolist() == [laptop.id, phone.id, tablet.id]
+    assert turnover.shipped.tolist() == [30, 10, 0]
+    assert turnover.turnover_rate.tolist() == [1.0, np.inf, 0.0]
+    assert turnover.days_of_cover.tolist() == [30.0, 0.0, np.inf]
+    assert len(load_movement_columns(uow.session, until=now - timedelta(days=1)).product_id) == 0
@@ -0,0 +1,109 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import func, select, update
+from domain.models import MovementType
+from infrastructure.archive import MovementArchive, archive_movements, parquet, recover_archive
+from infrastructure.ledger import audit_stock_levels, stock_level_at, take_snapshot
+from infrastructure.orm import StockMovementORM
+from infrastructure.repositories import LoadingStrategy
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def history(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        product = service.create_product(name="Laptop", quantity=100, price=1000.0)
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+        for month in (1, 2):
+            service.add_stock_to_warehouse(product, moscow, 10)
+            service.transfer_stock(product, moscow, spb, 4)
+            uow.session.execute(
+                update(StockMovementORM)
+                .where(StockMovementORM.timestamp > datetime(2026, 3, 1))
+                .values(timestamp=datetime(2026, month, 15))
+            )
+        take_snapshot(uow.session, taken_at=datetime(2026, 2, 28))
+        service.add_stock_to_warehouse(product, moscow, 1)
+        uow.commit()
+    return product, moscow, spb
+
+@pytest.mark.parametrize("use_parquet", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(parquet is None, reason="pyarrow is not installed"))
+])
+def test_archived_movements_are_still_served_by_the_repository(tmp_path, session_factory, history, use_parquet):
+    product, moscow, spb = history
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        expected = uow.stock_movements.list_by_warehouse(spb.id)
+        level = stock_level_at(uow.session, product.id, moscow.id, datetime.now())
+
+    archive = MovementArchive(tmp_path, use_parquet)
+    with session_factory() as session:
+        assert archive_movements(session, archive, before=datetime(2026, 3, 1)) == 4
+        assert session.scalar(select(func.count()).select_from(StockMovementORM)) == 1
+    assert archive.months() == ["2026-01", "2026-02"]
+
+    for strategy in LoadingStrategy:
+        with SqlAlchemyUnitOfWork(session_factory(), strategy, movement_archive=archive) as uow:
+            movements = uow.stock_movements
+            assert [m.id for m in movements.list()] == [5]
+            assert [m.id for m in movements.list_history(since=datetime(2026, 1, 1))] == list(range(1, 6))
+            assert movements.list_history(since=datetime(2026, 1, 1), warehouse_id=spb.id) == expected
+            assert [m.id for m in movements.iter_history(
+                since=datetime(2026, 2, 1), product_id=product.id, chunk_size=2
+            )] == [3, 4, 5]
+            assert movements.get(2).movement_type == MovementType.TRANSFER
+            assert movements.get(2).destination_warehouse == spb
+            assert stock_level_at(uow.session, product.id, moscow.id, datetime.now()) == level
+
+def test_past_stock_levels_replay_archived_movements(tmp_path, session_factory, history):
+    product, moscow, spb = history
+    archive = MovementArchive(tmp_path)
+    with session_factory() as session:
+        before = stock_level_at(session, product.id, moscow.id, datetime(2026, 1, 20))
+        archive_movements(session, archive, before=datetime(2026, 3, 1))
+
+        assert before.quantity == 6
+        assert stock_level_at(session, product.id, moscow.id, datetime(2026, 1, 20), archive) == before
+        assert stock_level_at(session, product.id, spb.id, datetime(2026, 2, 20), archive).quantity == 8
+        with pytest.raises(ValueError):
+            stock_level_at(session, product.id, moscow.id, datetime(2026, 1, 20))
+        assert audit_stock_levels(session) == []
+
+def test_archive_reads_skip_months_and_files_that_cannot_match(tmp_path, session_factory, history, monkeypatch):
+    product, moscow, spb = history
+    archive = MovementArchive(tmp_path)
+    with session_factory() as session:
+        archive_movements(session, archive, before=datetime(2026, 3, 1))
+    opened = []
+    read_file = archive._read_file
+    monkeypatch.setattr(archive, "_read_file", lambda path, *args: opened.append(path.parent.name) or read_file(path, *args))
+
+    assert [r["id"] for r in archive.read(since=datetime(2026, 2, 1))] == [3, 4]
+    assert opened == ["2026-02"]
+    assert list(archive.read(product_id=product.id + 1)) == []
+    assert list(archive.read(warehouse_id=spb.id + 1)) == []
+    assert opened == ["2026-02"]
+
+def test_only_movements_covered_by_a_snapshot_are_archived(tmp_path, session_factory, history):
+    with session_factory() as session:
+        assert archive_movements(session, MovementArchive(tmp_path), before=datetime(2026, 2, 1)) == 0
+        assert session.scalar(select(func.count()).select_from(StockMovementORM)) == 5
+
+def test_recover_publishes_committed_files_and_drops_the_rest(tmp_path, session_factory, history):
+    archive = MovementArchive(tmp_path)
+    row = {
+        "id": [5], "product_id": [1], "source_warehouse_id": [None], "destination_warehouse_id": [1],
+        "quantity": [1], "movement_type": [MovementType.RECEIPT], "timestamp": [datetime(2026, 1, 1)]
+    }
+    stale = archive.write("2026-01", row, pending=True)
+    committed = archive.write("2026-01", {**row, "id": [99]}, pending=True)
+
+    with session_factory() as session:
+        recover_archive(session, archive)
+
+    assert not stale.exists()
+    assert [r["id"] for r in archive.read()] == [99]
+    assert archive.pending() == [] and committed.with_suffix("").exists()
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from domain.models import MovementType, OrderLine
+from infrastructure.async_unit_of_work import AsyncSqlAlchemyUnitOfWork
+from infrastructure.cache import AvailabilityCache
+from infrastructure.instrumentation import Instrumentation
+from infrastructure.movement_writer import MovementWriter
+from infrastructure.orm import Base, StockMovementORM
+from tests.helpers import make_async_service
+
+async def make_session_factory(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+async def seed(session_factory):
+    async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_async_service(uow)
+        await service.create_product(name="Laptop", quantity=100, price=1000.0)
+        await service.create_warehouse(name="Moscow Warehouse", location="Moscow", capacity=1000)
+        await service.create_warehouse(name="St. Petersburg Warehouse", location="St. Petersburg", capacity=1000)
+        await uow.commit()
+    async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+        [product] = await uow.products.list()
+        moscow, spb = await uow.warehouses.list()
+        await make_async_service(uow).add_stock_to_warehouse(product, moscow, 100)
+        await uow.commit()
+    return product, moscow, spb
+
+def test_async_service_persists_stock_operations(tmp_path):
+    async def scenario():
+        engine, session_factory = await make_session_factory(tmp_path / "warehouse.db")
+        product, moscow, spb = await seed(session_factory)
+        async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+            service = make_async_service(uow)
+            await service.reserve_stock(product, moscow, 30)
+            await service.transfer_stock(product, moscow, spb, 50)
+            order = await service.create_order(lines=[OrderLine(product=product, quantity=25)])
+            await service.allocate_order(order)
+            await uow.commit()
+
+        async with AsyncSqlAlchemyUnitOfWork(session_factory(), availability_cache=AvailabilityCache()) as uow:
+            stock_items = [si async for si in uow.stock_items.iter_all(chunk_size=1)]
+            movements = await uow.stock_movements.list_by_warehouse(spb.id)
+            available = await make_async_service(uow).available_quantity(product)
+        await engine.dispose()
+        return stock_items, movements, available
+
+    stock_items, movements, available = asyncio.run(scenario())
+
+    balances = sorted((si.warehouse.name, si.quantity, si.reserved_quantity) for si in stock_items)
+    assert balances == [("Moscow Warehouse", 50, 30), ("St. Petersburg Warehouse", 50, 25)]
+    assert [m.quantity for m in movements if m.movement_type == MovementType.TRANSFER] == [50]
+    assert available == 45
+
+def test_concurrent_async_reservations_never_oversell(tmp_path):
+    async def scenario():
+        engine, session_factory = await make_session_factory(tmp_path / "warehouse.db")
+        product, moscow, _ = await seed(session_factory)
+
+        async def reserve():
+            async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+                try:
+                    await make_async_service(uow).reserve_stock(product, moscow, 1)
+                except ValueError:
+                    return False
+                await uow.commit()
+                return True
+
+        results = await asyncio.gather(*(reserve() for _ in range(150)))
+        async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+            stock_item = await uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+        await engine.dispose()
+        return results, stock_item
+
+    results, stock_item = asyncio.run(scenario())
+
+    assert sum(results) == 100
+    assert stock_item.reserved_quantity == 100
+
+def test_async_command_batch(tmp_path):
+    async def scenario():
+        engine, session_factory = await make_session_factory(tmp_path / "warehouse.db")
+        product, moscow, spb = await seed(session_factory)
+        async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+            batch = uow.batch().reserve(product, moscow, 10).transfer(product, moscow, spb, 95)
+            results = await batch.execute()
+            await uow.commit()
+        async with AsyncSqlAlchemyUnitOfWork(session_factory()) as uow:
+            stock_item = await uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+        await engine.dispose()
+        return results, stock_item
+
+    results, stock_item = asyncio.run(scenario())
+
+    assert [r.applied for r in results] == [True, False]
+    assert (stock_item.quantity, stock_item.reserved_quantity) == (100, 10)
+
+def test_async_unit_of_work_instruments_and_writes_behind(tmp_path):
+    instrumentation = Instrumentation(exporter=lambda stats: None)
+    sync_engine = create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+
+    async def scenario():
+        engine, session_factory = await make_session_factory(tmp_path / "warehouse.db")
+        product, moscow, spb = await seed(session_factory)
+        with MovementWriter(sync_engine, tmp_path / "movements.journal", flush_interval=0.01) as writer:
+            async with AsyncSqlAlchemyUnitOfWork(
+                session_factory(), instrumentation=instrumentation, movement_writer=writer
+            ) as uow:
+                service = make_async_service(uow)
+                await service.transfer_stock(product, moscow, spb, 10)
+                with pytest.raises(ValueError):
+                    await service.ship_stock(product, spb, 20)
+                await uow.commit()
+            writer.flush(timeout=5)
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+    with sync_engine.connect() as connection:
+        movements = connection.execute(
+            select(StockMovementORM.movement_type, func.count()).group_by(StockMovementORM.movement_type)
+        ).all()
+    sync_engine.dispose()
+    assert dict(movements) == {MovementType.RECEIPT: 1, MovementType.TRANSFER: 1}
+    calls = {s.name: s.calls for s in instrumentation.snapshot()}
+    assert calls["warehouses.transfer_occupancy"] == 1
+    assert (calls["warehouses.vacate"], calls["stock_items.withdraw"]) == (1, 1)
@@ -0,0 +1,29 @@
+import json
+from benchmarks.generator import SCALES, generate
+from benchmarks.run import compare, run
+from benchmarks.scenarios import SCENARIOS
+
+def test_generator_is_reproducible():
+    first = generate(SCALES["tiny"])
+    second = generate(SCALES["tiny"])
+
+    assert [si.quantity for si in first.stock_items] == [si.quantity for si in second.stock_items]
+    assert [m.product.id for m in first.movements] == [m.product.id for m in second.movements]
+    assert len(first.stock_items) == SCALES["tiny"].products * SCALES["tiny"].stock_items_per_product
+
+def test_every_scenario_runs_on_every_backend():
+    report = run(
+        "tiny", seed=1, backends=["sqlite-memory", "sqlite-file", "mock", "memory"], patterns=["*"], iterations=2
+    )
+
+    assert json.loads(json.dumps(report))["metadata"]["spec"]["seed"] == 1
+    assert len(report["results"]) == 4 * len(SCENARIOS)
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"backend": "mock", "scenario": "products.get", "p50_us": 10.0}]}
+    current = {"results": [{"backend": "mock", "scenario": "products.get", "p50_us": 12.0}]}
+
+    [row] = compare(baseline, current, threshold=0.1)
+
+    assert row["status"] == "regressed"
+    assert row["ratio"] == 1.2
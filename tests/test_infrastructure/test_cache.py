@@ -0,0 +1,134 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from domain.models import Product, Warehouse
+from infrastructure.cache import AvailabilityCache, LRUCache, ReferenceDataCache
+from infrastructure.orm import ProductORM, WarehouseORM, StockItemORM
+from infrastructure.repositories import LoadingStrategy
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+def test_lru_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10.0, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 9.0
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_get_or_load_only_loads_on_miss():
+    cache = LRUCache()
+    loads = []
+
+    for _ in range(3):
+        cache.get_or_load("a", lambda: loads.append(1) or "value")
+
+    assert len(loads) == 1
+    assert cache.stats()["hits"] == 2
+
+@pytest.fixture
+def session_factory(engine):
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        product = ProductORM(name="Laptop", quantity=10, price=1000.0)
+        warehouses = [WarehouseORM(name=f"Warehouse {i}", location="Moscow", capacity=1000) for i in range(3)]
+        session.add_all([product, *warehouses])
+        session.flush()
+        session.add_all([
+            StockItemORM(product_id=product.id, warehouse_id=w.id, quantity=5, reserved_quantity=0)
+            for w in warehouses
+        ])
+        session.commit()
+    return session_factory
+
+def test_cached_repositories_skip_the_database_on_hits(engine, session_factory):
+    cache = ReferenceDataCache()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    for _ in range(3):
+        with SqlAlchemyUnitOfWork(session_factory(), reference_cache=cache) as uow:
+            assert uow.products.get(1).name == "Laptop"
+            assert uow.warehouses.get(2).name == "Warehouse 1"
+
+    assert len(statements) == 2
+    assert cache.stats()["products"]["hits"] == 2
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_stock_item_mapper_shares_cached_reference_objects(session_factory, strategy):
+    cache = ReferenceDataCache()
+    with SqlAlchemyUnitOfWork(session_factory(), strategy, reference_cache=cache) as uow:
+        product = uow.products.get(1)
+        stock_items = uow.stock_items.list()
+
+    assert all(si.product is product for si in stock_items)
+    assert cache.stats()["warehouses"]["size"] == 3
+
+def test_commit_invalidates_changed_reference_data(session_factory):
+    cache = ReferenceDataCache()
+    with SqlAlchemyUnitOfWork(session_factory(), reference_cache=cache) as uow:
+        assert uow.products.get(1).price == 1000.0
+        uow.session.get(ProductORM, 1).price = 900.0
+        uow.session.flush()
+        uow.commit()
+
+    with SqlAlchemyUnitOfWork(session_factory(), reference_cache=cache) as uow:
+        assert uow.products.get(1).price == 900.0
+
+def test_uncommitted_reference_data_never_reaches_the_cache(session_factory):
+    cache = ReferenceDataCache()
+    with SqlAlchemyUnitOfWork(session_factory(), reference_cache=cache) as uow:
+        uow.session.get(ProductORM, 1).price = 900.0
+        assert uow.products.get(1).price == 900.0
+        assert [si.product.price for si in uow.stock_items.list()] == [900.0] * 3
+        uow.session.get(WarehouseORM, 2).capacity = 1
+        uow.session.flush()
+        assert uow.warehouses.get(2).capacity == 1
+
+    assert cache.stats()["products"]["size"] == 0
+    with SqlAlchemyUnitOfWork(session_factory(), reference_cache=cache) as uow:
+        assert uow.products.get(1).price == 1000.0
+        assert uow.warehouses.get(2).capacity == 1000
+
+def test_availability_cache_serves_reads_and_hides_uncommitted_changes(engine, session_factory):
+    cache = AvailabilityCache(ttl=60.0)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    product = Product(id=1, name="Laptop", quantity=10, price=1000.0)
+    warehouse = Warehouse(id=2, name="Warehouse 0", location="Moscow", capacity=1000)
+
+    for _ in range(3):
+        with SqlAlchemyUnitOfWork(session_factory(), availability_cache=cache) as uow:
+            assert uow.stock_items.available_by_product([1, 2]) == {1: 15, 2: 0}
+    assert len(statements) == 1
+
+    with SqlAlchemyUnitOfWork(session_factory(), availability_cache=cache) as uow:
+        uow.stock_items.reserve(product, warehouse, 4)
+        assert uow.stock_items.available_by_product([1]) == {1: 11}
+        with SqlAlchemyUnitOfWork(session_factory(), availability_cache=cache) as reader:
+            assert reader.stock_items.available_by_product([1]) == {1: 15}
+        uow.commit()
+
+    with SqlAlchemyUnitOfWork(session_factory(), availability_cache=cache) as uow:
+        assert uow.stock_items.available_by_product([1]) == {1: 11}
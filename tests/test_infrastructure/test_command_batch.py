@@ -0,0 +1,198 @@
+import os
+import pytest
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from domain.exceptions import ConcurrencyConflict
+from domain.models import MovementType
+from infrastructure import command_batch
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+POSTGRES_URL = os.environ.get("WAREHOUSE_TEST_POSTGRES_URL")
+THREADS = 16
+BATCHES_PER_THREAD = 40
+
+@pytest.fixture
+def stocked(engine):
+    session_factory = sessionmaker(bind=engine)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        products = [service.create_product(name=f"Product {i}", quantity=100, price=10.0) for i in range(30)]
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=10_000)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=10_000)
+        for product in products:
+            service.add_stock_to_warehouse(product, moscow, 50)
+        uow.commit()
+    return session_factory, products, moscow, spb
+
+def run_batch(session_factory, engine, products, moscow, spb, all_or_nothing=False):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        batch = uow.batch(all_or_nothing)
+        for product in products:
+            batch.reserve(product, moscow, 5)
+            batch.transfer(product, moscow, spb, 20)
+            batch.receive(product, spb, 3)
+        batch.reserve(products[0], spb, 1000)
+        event.listen(engine, "before_cursor_execute", listener)
+        results = batch.execute()
+        event.remove(engine, "before_cursor_execute", listener)
+        uow.commit()
+    return results, statements
+
+@pytest.mark.parametrize("count", [1, 30])
+def test_batch_round_trips_do_not_grow_with_commands(engine, stocked, count):
+    session_factory, products, moscow, spb = stocked
+
+    results, statements = run_batch(session_factory, engine, products[:count], moscow, spb)
+
+    assert [r.applied for r in results] == [True] * 3 * count + [False]
+    assert results[-1].error == "Not enough stock available"
+    assert len(statements) <= 7
+
+def test_batch_writes_occupancy_before_stock(engine, stocked):
+    session_factory, products, moscow, spb = stocked
+
+    results, statements = run_batch(session_factory, engine, products[:2], moscow, spb)
+
+    writes = [s.split()[1] for s in statements if s.startswith(("UPDATE", "INSERT"))]
+    assert writes.index("warehouse_occupancy") < writes.index("stock_items")
+
+def test_batch_results_are_persisted(engine, stocked):
+    session_factory, products, moscow, spb = stocked
+
+    run_batch(session_factory, engine, products, moscow, spb)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        source = uow.stock_items.get_by_product_and_warehouse(products[0].id, moscow.id)
+        destination = uow.stock_items.get_by_product_and_warehouse(products[0].id, spb.id)
+        assert (source.quantity, source.reserved_quantity) == (30, 5)
+        assert (destination.quantity, destination.reserved_quantity) == (23, 0)
+        assert uow.warehouses.get_occupancy(moscow.id) == 30 * 30
+        assert uow.warehouses.get_occupancy(spb.id) == 23 * 30
+        movements = uow.stock_movements.list_by_product(products[0].id)
+        assert [m.movement_type for m in movements] == [
+            MovementType.RECEIPT, MovementType.RESERVATION, MovementType.TRANSFER, MovementType.RECEIPT
+        ]
+
+def test_all_or_nothing_batch_writes_nothing_on_failure(engine, stocked):
+    session_factory, products, moscow, spb = stocked
+
+    results, _ = run_batch(session_factory, engine, products[:3], moscow, spb, all_or_nothing=True)
+
+    assert not any(r.applied for r in results)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stock_item = uow.stock_items.get_by_product_and_warehouse(products[0].id, moscow.id)
+        assert (stock_item.quantity, stock_item.reserved_quantity) == (50, 0)
+        assert uow.warehouses.get_occupancy(spb.id) == 0
+        assert len(uow.stock_movements.list()) == 30
+
+def test_batch_raises_conflict_when_stock_changed_after_loading(engine, stocked, monkeypatch):
+    session_factory, products, moscow, spb = stocked
+    load = command_batch._load_stock_items
+
+    def load_then_race(session, batch, lock):
+        loaded = load(session, batch, lock)
+        with SqlAlchemyUnitOfWork(session_factory()) as other:
+            make_service(other).reserve_stock(products[0], moscow, 1)
+            other.commit()
+        return loaded
+
+    monkeypatch.setattr(command_batch, "_load_stock_items", load_then_race)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        batch = uow.batch().reserve(products[0], moscow, 5)
+        with pytest.raises(ConcurrencyConflict):
+            batch.execute()
+
+def test_batch_adds_to_stock_items_created_after_loading(engine, stocked, monkeypatch):
+    session_factory, products, moscow, spb = stocked
+    load = command_batch._load_stock_items
+
+    def load_then_race(session, batch, lock):
+        loaded = load(session, batch, lock)
+        with SqlAlchemyUnitOfWork(session_factory()) as other:
+            make_service(other).add_stock_to_warehouse(products[0], spb, 7)
+            other.commit()
+        return loaded
+
+    monkeypatch.setattr(command_batch, "_load_stock_items", load_then_race)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        results = uow.batch().transfer(products[0], moscow, spb, 10).execute()
+        uow.commit()
+
+    assert results[0].applied
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.stock_items.get_by_product_and_warehouse(products[0].id, spb.id).quantity == 17
+
+@pytest.fixture(params=[
+    "sqlite",
+    pytest.param("postgresql", marks=pytest.mark.skipif(
+        not POSTGRES_URL, reason="set WAREHOUSE_TEST_POSTGRES_URL to run against PostgreSQL"
+    )),
+])
+def locking_engine(request, tmp_path):
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}", connect_args={"timeout": 30})
+    else:
+        engine = create_engine(POSTGRES_URL, pool_size=THREADS)
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    if request.param != "sqlite":
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+
+# On SQLite locking batches serialise on the database write lock; against
+# PostgreSQL this exercises the ordered FOR UPDATE row locks.
+def test_locking_batches_of_opposing_transfers_never_deadlock(locking_engine):
+    session_factory = sessionmaker(bind=locking_engine)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        products = [service.create_product(name=f"Product {i}", quantity=0, price=10.0) for i in range(8)]
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=100_000)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=100_000)
+        for product in products:
+            service.add_stock_to_warehouse(product, moscow, 1000)
+            service.add_stock_to_warehouse(product, spb, 1000)
+        uow.commit()
+
+    errors = []
+    applied = []
+
+    def worker(source, destination):
+        try:
+            for _ in range(BATCHES_PER_THREAD):
+                with SqlAlchemyUnitOfWork(session_factory()) as uow:
+                    batch = uow.batch(lock=True)
+                    for product in products:
+                        batch.transfer(product, source, destination, 1)
+                    results = batch.execute()
+                    uow.commit()
+                applied.extend(r for r in results if r.applied)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [
+        threading.Thread(target=worker, args=(moscow, spb) if i % 2 else (spb, moscow))
+        for i in range(THREADS)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"{locking_engine.dialect.name}: {len(applied)} opposing transfers, {len(applied) / elapsed:,.0f}/s")
+
+    assert errors == []
+    assert len(applied) == THREADS * BATCHES_PER_THREAD * len(products)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        for product in products:
+            assert uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id).quantity == 1000
+            assert uow.stock_items.get_by_product_and_warehouse(product.id, spb.id).quantity == 1000
+        assert uow.warehouses.get_occupancy(moscow.id) == 1000 * len(products)
+        assert len(uow.stock_movements.list()) == 2 * len(products) + len(applied)
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import insert, inspect, select, text
+from infrastructure.database import create_engine_for, create_schema, create_session_factory, session_scope
+from infrastructure.orm import ProductORM, StockItemORM, WarehouseORM, WarehouseOccupancyORM
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine_for(f"sqlite:///{tmp_path / 'warehouse.db'}", pool_size=2, max_overflow=0)
+    yield engine
+    engine.dispose()
+
+def test_sqlite_connections_are_tuned_on_connect(engine):
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -64 * 1024
+    assert engine.pool.size() == 2
+
+def test_in_memory_engine_uses_default_pool():
+    engine = create_engine_for("sqlite:///:memory:")
+    create_schema(engine)
+    assert "products" in inspect(engine).get_table_names()
+
+def test_create_schema_is_idempotent(engine):
+    create_schema(engine)
+    create_schema(engine)
+    assert "uq_stock_items_product_warehouse" in {i["name"] for i in inspect(engine).get_indexes("stock_items")}
+
+def test_create_schema_backfills_missing_occupancy(engine):
+    create_schema(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductORM).values(id=1, name="Laptop", quantity=1, price=1.0))
+        connection.execute(insert(WarehouseORM), [
+            {"id": 1, "name": "Moscow", "location": "Moscow", "capacity": 100},
+            {"id": 2, "name": "SPb", "location": "SPb", "capacity": 100},
+            {"id": 3, "name": "Kazan", "location": "Kazan", "capacity": 100},
+        ])
+        connection.execute(insert(StockItemORM).values(product_id=1, warehouse_id=1, quantity=30, reserved_quantity=0))
+        connection.execute(insert(WarehouseOccupancyORM).values(warehouse_id=3, occupied=5))
+
+    create_schema(engine)
+
+    with engine.connect() as connection:
+        occupancy = connection.execute(select(WarehouseOccupancyORM.warehouse_id, WarehouseOccupancyORM.occupied)).all()
+    assert sorted(occupancy) == [(1, 30), (2, 0), (3, 5)]
+
+def test_session_scope_commits_or_rolls_back(engine):
+    create_schema(engine)
+    session_factory = create_session_factory(engine)
+
+    with session_scope(session_factory) as session:
+        session.add(ProductORM(name="Laptop", quantity=1, price=1.0))
+    with pytest.raises(RuntimeError):
+        with session_scope(session_factory) as session:
+            session.add(ProductORM(name="Phone", quantity=1, price=1.0))
+            raise RuntimeError
+
+    with session_scope(session_factory) as session:
+        assert session.scalars(select(ProductORM.name)).all() == ["Laptop"]
@@ -0,0 +1,78 @@
+import csv
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import update
+from infrastructure.archive import MovementArchive, archive_movements
+from infrastructure.export import export_movements, export_stock_items, pyarrow
+from infrastructure.ledger import take_snapshot
+from infrastructure.orm import StockMovementORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def history(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        laptop = service.create_product(name="Laptop", quantity=100, price=1000.0)
+        phone = service.create_product(name="Phone", quantity=100, price=500.0)
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+        for month in (1, 2, 3):
+            service.add_stock_to_warehouse(laptop, moscow, 10)
+            service.add_stock_to_warehouse(phone, spb, 5)
+            service.transfer_stock(laptop, moscow, spb, 4)
+            uow.session.execute(
+                update(StockMovementORM)
+                .where(StockMovementORM.timestamp > datetime(2026, 4, 1))
+                .values(timestamp=datetime(2026, month, 15, 12, 30))
+            )
+        uow.commit()
+    return laptop, phone, moscow, spb
+
+def read(path):
+    if path.suffix == ".csv":
+        with open(path, newline="") as export:
+            return [{k: v or None for k, v in row.items()} for row in csv.DictReader(export)]
+    if path.suffix == ".jsonl":
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    return pyarrow.ipc.open_file(str(path)).read_all().to_pylist()
+
+@pytest.mark.parametrize("suffix", [
+    ".csv",
+    ".jsonl",
+    pytest.param(".arrow", marks=pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed"))
+])
+def test_exports_filtered_movements_and_stock(tmp_path, session_factory, history, suffix):
+    laptop, phone, moscow, spb = history
+    movements = tmp_path / f"movements{suffix}"
+    stock = tmp_path / f"stock{suffix}"
+    with session_factory() as session:
+        assert export_movements(
+            session, movements, warehouse_id=spb.id, since=datetime(2026, 2, 1), chunk_size=2
+        ) == 4
+        assert export_stock_items(session, stock, product_id=laptop.id) == 2
+
+    rows = read(movements)
+    assert [int(r["id"]) for r in rows] == [5, 6, 8, 9]
+    assert [r["movement_type"] for r in rows] == ["RECEIPT", "TRANSFER"] * 2
+    assert str(rows[1]["source_warehouse_id"]) == str(moscow.id)
+    assert str(rows[0]["source_warehouse_id"]) == "None"
+    assert str(rows[0]["timestamp"]).startswith("2026-02-15")
+    assert [(int(r["warehouse_id"]), int(r["quantity"])) for r in read(stock)] == [(moscow.id, 18), (spb.id, 12)]
+
+def test_includes_archived_movements(tmp_path, session_factory, history):
+    archive = MovementArchive(tmp_path / "archive")
+    path = tmp_path / "movements.jsonl"
+    with session_factory() as session:
+        take_snapshot(session, taken_at=datetime(2026, 3, 1))
+        assert archive_movements(session, archive, before=datetime(2026, 3, 1)) == 6
+        session.commit()
+
+        assert export_movements(session, path, since=datetime(2026, 1, 20), archive=archive) == 6
+
+    assert [row["id"] for row in read(path)] == [4, 5, 6, 7, 8, 9]
+
+def test_rejects_unknown_formats(tmp_path, session_factory, history):
+    with session_factory() as session, pytest.raises(ValueError):
+        export_stock_items(session, tmp_path / "stock.xlsx")
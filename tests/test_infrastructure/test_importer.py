@@ -0,0 +1,106 @@
+import csv
+import json
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from infrastructure import importer
+from infrastructure.importer import import_file
+from infrastructure.ledger import audit_stock_levels
+from infrastructure.occupancy import reconcile_occupancy
+from infrastructure.orm import Base, JournalCheckpointORM, ProductORM, StockItemORM, WarehouseORM, WarehouseOccupancyORM
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+def write_products(path, rows):
+    with open(path, "w", newline="") as output:
+        writer = csv.writer(output)
+        writer.writerow(["name", "quantity", "price"])
+        writer.writerows(rows)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_imports_products_and_stock_with_an_error_report(engine, tmp_path, workers):
+    write_products(tmp_path / "products.csv", [
+        ["Laptop", "10", "1000.0"], ["", "1", "1.0"], ["Phone", "5", "cheap"], ["Mouse", "0", "20"], ["Tablet", "1", "inf"]
+    ])
+    with engine.begin() as connection:
+        connection.execute(WarehouseORM.__table__.insert(), [
+            {"id": 1, "name": "Moscow", "location": "Moscow", "capacity": 100}
+        ])
+        connection.execute(WarehouseOccupancyORM.__table__.insert(), [{"warehouse_id": 1, "occupied": 0}])
+    stock = [
+        {"product_id": 1, "warehouse_id": 1, "quantity": 30},
+        {"product_id": 2, "warehouse_id": 1, "quantity": 5},
+        {"product_id": 1, "warehouse_id": 1, "quantity": 40},
+        {"product_id": 9, "warehouse_id": 1, "quantity": 1},
+        {"product_id": 2, "warehouse_id": 2, "quantity": 1},
+        {"product_id": 2, "warehouse_id": 1, "quantity": 50},
+        {"product_id": 2, "warehouse_id": 1, "quantity": -1},
+    ]
+    (tmp_path / "stock.jsonl").write_text("".join(json.dumps(r) + "\n" for r in stock) + "[]\n")
+    report = tmp_path / "errors.csv"
+
+    products = import_file(
+        engine, "products", tmp_path / "products.csv", chunk_size=2, workers=workers, error_report=report
+    )
+    stock = import_file(engine, "stock", tmp_path / "stock.jsonl", chunk_size=3, workers=workers, error_report=report)
+
+    assert (products.rows, products.imported) == (5, 2)
+    assert (stock.rows, stock.imported) == (8, 3)
+    with open(report) as errors:
+        assert [(r["row"], r["error"]) for r in csv.DictReader(errors)] == [
+            ("2", "Missing name"),
+            ("3", "Invalid price: 'cheap'"),
+            ("5", "Invalid price: 'inf'"),
+            ("4", "Product 9 not found"),
+            ("5", "Warehouse 2 not found"),
+            ("6", "Not enough capacity in warehouse 1"),
+            ("7", "Quantity must be at least 1"),
+            ("8", "Record must be an object"),
+        ]
+    with Session(engine) as session:
+        assert session.execute(
+            select(StockItemORM.product_id, StockItemORM.quantity).order_by(StockItemORM.product_id)
+        ).all() == [(1, 70), (2, 5)]
+        assert audit_stock_levels(session) == []
+        assert reconcile_occupancy(session) == []
+
+def test_resumes_after_the_last_committed_chunk(engine, tmp_path, monkeypatch):
+    write_products(tmp_path / "products.csv", [[f"Product {i}", "1", "1.0"] for i in range(1, 8)])
+    write = importer.WRITERS["products"]
+    calls = []
+
+    def fail_on_third_chunk(connection, rows):
+        calls.append(rows)
+        if len(calls) == 3:
+            raise RuntimeError("Connection lost")
+        return write(connection, rows)
+
+    monkeypatch.setitem(importer.WRITERS, "products", fail_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        import_file(engine, "products", tmp_path / "products.csv", chunk_size=2)
+    monkeypatch.setitem(importer.WRITERS, "products", write)
+
+    result = import_file(engine, "products", tmp_path / "products.csv", chunk_size=2)
+
+    assert (result.skipped, result.rows, result.imported) == (4, 3, 3)
+    with engine.connect() as connection:
+        assert connection.scalars(select(ProductORM.name).order_by(ProductORM.id)).all() == [
+            f"Product {i}" for i in range(1, 8)
+        ]
+
+def test_a_new_file_with_the_same_name_is_imported_in_full(engine, tmp_path):
+    path = tmp_path / "products.csv"
+    write_products(path, [["a", "1", "1.0"], ["b", "1", "1.0"]])
+    import_file(engine, "products", path, chunk_size=1)
+    write_products(path, [["c", "1", "1.0"], ["d", "1", "1.0"], ["e", "1", "1.0"]])
+
+    result = import_file(engine, "products", path, chunk_size=1)
+
+    assert (result.skipped, result.imported) == (0, 3)
+    with engine.connect() as connection:
+        assert connection.scalars(select(ProductORM.name).order_by(ProductORM.id)).all() == list("abcde")
+        assert connection.scalar(select(func.count()).select_from(JournalCheckpointORM)) == 0
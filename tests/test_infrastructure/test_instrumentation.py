@@ -0,0 +1,70 @@
+import logging
+import pytest
+from sqlalchemy.orm import sessionmaker
+from domain.services import WarehouseService
+from infrastructure.instrumentation import Instrumentation, LoggingExporter
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def exported():
+    return []
+
+@pytest.fixture
+def instrumentation(engine, exported):
+    instrumentation = Instrumentation(exporter=exported.extend)
+    instrumentation.attach(engine)
+    instrumentation.attach(engine)
+    yield instrumentation
+    instrumentation.detach(engine)
+
+def instrumented_service(uow, instrumentation) -> WarehouseService:
+    return instrumentation.wrap(make_service(uow), "service")
+
+def test_records_statements_results_and_latency_per_operation(engine, instrumentation, exported):
+    with SqlAlchemyUnitOfWork(sessionmaker(bind=engine)(), instrumentation=instrumentation) as uow:
+        service = instrumented_service(uow, instrumentation)
+        product = service.create_product(name="Laptop", quantity=10, price=1000.0)
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+        service.add_stock_to_warehouse(product, moscow, 10)
+        service.transfer_stock(product, moscow, spb, 4)
+        with pytest.raises(ValueError):
+            service.reserve_stock(product, spb, 5)
+        assert len(list(uow.stock_items.iter_all(chunk_size=1))) == 2
+        uow.commit()
+
+    instrumentation.export()
+    stats = {s.name: s for s in exported}
+    transfer = stats["service.transfer_stock"]
+    assert transfer.calls == 1
+    assert transfer.statements >= stats["stock_items.withdraw"].statements + stats["stock_items.deposit"].statements
+    assert transfer.db_seconds > 0 and transfer.python_seconds > 0
+    assert transfer.p50_ms > 0 and transfer.p99_ms >= transfer.p50_ms
+    assert stats["service.reserve_stock"].errors == 1
+    assert stats["stock_items.iter_all"].results == 2
+    assert stats["stock_items.iter_all"].statements == 3
+    assert stats["warehouses.add"].calls == 2
+
+def test_untracked_statements_are_ignored_and_reset_clears(engine, instrumentation, exported):
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+    assert instrumentation.snapshot() == []
+
+    with SqlAlchemyUnitOfWork(sessionmaker(bind=engine)(), instrumentation=instrumentation) as uow:
+        uow.products.list()
+    assert [s.name for s in instrumentation.snapshot()] == ["products.list"]
+    instrumentation.reset()
+    assert instrumentation.snapshot() == []
+
+def test_logging_exporter(engine, caplog):
+    instrumentation = Instrumentation(exporter=LoggingExporter())
+    instrumentation.attach(engine)
+    with SqlAlchemyUnitOfWork(sessionmaker(bind=engine)(), instrumentation=instrumentation) as uow:
+        uow.warehouses.list()
+
+    with caplog.at_level(logging.INFO, logger="warehouse.metrics"):
+        instrumentation.export()
+
+    assert "warehouses.list calls=1 errors=0 statements=1 results=0" in caplog.text
+    instrumentation.detach(engine)
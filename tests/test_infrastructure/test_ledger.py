@@ -0,0 +1,53 @@
+from datetime import datetime
+from sqlalchemy import delete, update
+from infrastructure.ledger import StockLevel, audit_stock_levels, stock_level_at, stock_levels_at, take_snapshot
+from infrastructure.orm import StockItemORM, StockMovementORM
+from tests.helpers import make_service
+
+def test_stock_levels_are_rebuilt_from_snapshot_and_ledger(uow):
+    service = make_service(uow)
+    product = service.create_product(name="Laptop", quantity=100, price=1000.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+
+    service.add_stock_to_warehouse(product, moscow, 100)
+    service.reserve_stock(product, moscow, 30)
+    before_snapshot = datetime.now()
+    assert take_snapshot(uow.session) == 1
+
+    service.transfer_stock(product, moscow, spb, 50)
+    service.release_reserved_stock(product, moscow, 10)
+    after_transfer = datetime.now()
+    service.ship_stock(product, spb, 20)
+
+    assert stock_level_at(uow.session, product.id, moscow.id, before_snapshot) == StockLevel(product.id, moscow.id, 100, 30)
+    assert stock_levels_at(uow.session, after_transfer) == [
+        StockLevel(product.id, moscow.id, 50, 20),
+        StockLevel(product.id, spb.id, 50, 0)
+    ]
+    assert stock_level_at(uow.session, product.id, spb.id, datetime.now()) == StockLevel(product.id, spb.id, 30, 0)
+    assert audit_stock_levels(uow.session) == []
+
+def test_point_in_time_query_only_needs_movements_after_snapshot(uow):
+    service = make_service(uow)
+    product = service.create_product(name="Laptop", quantity=100, price=1000.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    for _ in range(20):
+        service.add_stock_to_warehouse(product, moscow, 1)
+    take_snapshot(uow.session)
+    uow.session.execute(delete(StockMovementORM))
+    service.add_stock_to_warehouse(product, moscow, 1)
+
+    assert stock_level_at(uow.session, product.id, moscow.id, datetime.now()).quantity == 21
+
+def test_audit_reports_stock_items_that_disagree_with_the_ledger(uow):
+    service = make_service(uow)
+    product = service.create_product(name="Laptop", quantity=100, price=1000.0)
+    moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+    service.add_stock_to_warehouse(product, moscow, 10)
+    uow.session.execute(update(StockItemORM).values(quantity=12))
+
+    [drift] = audit_stock_levels(uow.session)
+
+    assert drift.recorded == StockLevel(product.id, moscow.id, 12, 0)
+    assert drift.ledger == StockLevel(product.id, moscow.id, 10, 0)
@@ -0,0 +1,81 @@
+import pytest
+from domain.exceptions import StockItemNotFound
+from domain.models import MovementType, OrderLine
+from infrastructure.memory import MemoryStore, MemoryUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def store():
+    return MemoryStore()
+
+@pytest.fixture
+def stocked(store):
+    with MemoryUnitOfWork(store) as uow:
+        service = make_service(uow)
+        laptop = service.create_product(name="Laptop", quantity=0, price=1000.0)
+        phone = service.create_product(name="Phone", quantity=0, price=500.0)
+        moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=100)
+        spb = service.create_warehouse(name="SPb", location="SPb", capacity=100)
+        service.add_stock_to_warehouse(laptop, moscow, 50)
+        service.add_stock_to_warehouse(phone, moscow, 10)
+        uow.commit()
+    return laptop, phone, moscow, spb
+
+def test_service_operations_use_the_indexes(store, stocked):
+    laptop, phone, moscow, spb = stocked
+    with MemoryUnitOfWork(store) as uow:
+        service = make_service(uow)
+        service.transfer_stock(laptop, moscow, spb, 20)
+        service.reserve_stock(laptop, spb, 5)
+        order = service.create_order(lines=[OrderLine(product=laptop, quantity=40)])
+        allocations = service.allocate_order(order)
+        uow.commit()
+
+        assert sorted((a.warehouse.id, a.quantity) for a in allocations) == [(moscow.id, 30), (spb.id, 10)]
+        assert uow.warehouses.get_occupancy(spb.id) == 20
+        assert uow.stock_items.get_by_product_and_warehouse(laptop.id, spb.id).reserved_quantity == 15
+        assert [m.movement_type for m in uow.stock_movements.list_by_warehouse(spb.id)] == [
+            MovementType.TRANSFER, MovementType.RESERVATION, MovementType.RESERVATION
+        ]
+        assert uow.stock_items.list_available([laptop.id, laptop.id]) == [
+            uow.stock_items.get_by_product_and_warehouse(laptop.id, spb.id)
+        ]
+        assert service.available_quantity(laptop) == 5
+        assert uow.stock_items.available_by_warehouse([moscow.id, spb.id]) == {moscow.id: 10, spb.id: 5}
+        assert uow.stock_items.available_by_location([laptop.id]) == {
+            (laptop.id, "Moscow"): 0, (laptop.id, "SPb"): 5
+        }
+
+def test_rollback_undoes_every_change(store, stocked):
+    laptop, phone, moscow, spb = stocked
+    movements = len(store.movements)
+    with MemoryUnitOfWork(store) as uow:
+        service = make_service(uow)
+        service.transfer_stock(laptop, moscow, spb, 20)
+        service.reserve_stock(phone, moscow, 5)
+        service.create_warehouse(name="Kazan", location="Kazan", capacity=10)
+        uow.batch().receive(phone, spb, 7).execute()
+
+    with MemoryUnitOfWork(store) as uow:
+        source = uow.stock_items.get_by_product_and_warehouse(laptop.id, moscow.id)
+        assert (source.quantity, source.reserved_quantity) == (50, 0)
+        assert uow.stock_items.get_by_product_and_warehouse(phone.id, moscow.id).reserved_quantity == 0
+        with pytest.raises(StockItemNotFound):
+            uow.stock_items.get_by_product_and_warehouse(laptop.id, spb.id)
+        assert uow.warehouses.get_occupancy(moscow.id) == 60
+        assert len(uow.warehouses.list()) == 2
+        assert len(uow.stock_movements.list()) == movements
+        assert uow.stock_movements.list_by_warehouse(spb.id) == []
+        warehouse = make_service(uow).create_warehouse(name="Kazan", location="Kazan", capacity=10)
+        assert warehouse.id == 4
+
+def test_command_batch_writes_through_the_store(store, stocked):
+    laptop, phone, moscow, spb = stocked
+    with MemoryUnitOfWork(store) as uow:
+        results = uow.batch().transfer(laptop, moscow, spb, 30).reserve(phone, moscow, 11).execute()
+        uow.commit()
+
+    assert [r.applied for r in results] == [True, False]
+    assert store.stock_by_key[(laptop.id, spb.id)].quantity == 30
+    assert store.occupancy == {moscow.id: 30, spb.id: 30}
+    assert store.movements_by_product[laptop.id][-1] is results[0].movement
@@ -0,0 +1,157 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from domain.models import MovementType
+from infrastructure import movement_writer
+from infrastructure.movement_writer import MovementWriter, _encode
+from infrastructure.ledger import take_snapshot
+from infrastructure.orm import Base, JournalTransactionORM, StockItemORM, StockMovementORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+def count_movements(engine) -> int:
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(StockMovementORM))
+
+def movement(quantity: int) -> dict:
+    return {
+        "product_id": 1, "source_warehouse_id": None, "destination_warehouse_id": 1,
+        "quantity": quantity, "movement_type": MovementType.RECEIPT, "timestamp": datetime(2026, 1, 1)
+    }
+
+def test_movements_are_written_after_commit(engine, tmp_path):
+    session_factory = sessionmaker(bind=engine)
+    with MovementWriter(engine, tmp_path / "movements.journal", batch_size=2, flush_interval=0.01) as writer:
+        with SqlAlchemyUnitOfWork(session_factory(), movement_writer=writer) as uow:
+            service = make_service(uow)
+            product = service.create_product(name="Laptop", quantity=10, price=1000.0)
+            moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+            spb = service.create_warehouse(name="SPb", location="SPb", capacity=1000)
+            service.add_stock_to_warehouse(product, moscow, 10)
+            for _ in range(3):
+                service.transfer_stock(product, moscow, spb, 1)
+            uow.commit()
+
+        with SqlAlchemyUnitOfWork(session_factory(), movement_writer=writer) as uow:
+            make_service(uow).transfer_stock(product, moscow, spb, 1)
+
+        writer.flush(timeout=5)
+        assert count_movements(engine) == 4
+        assert writer.pending == 0
+
+    assert (tmp_path / "movements.journal").read_text() == ""
+
+def test_replay_inserts_only_committed_unwritten_movements(engine, tmp_path):
+    journal = tmp_path / "movements.journal"
+    with MovementWriter(engine, journal) as writer, Session(engine) as session:
+        transaction = writer.prepare(session, [movement(1)])
+        session.commit()
+        writer.submit(transaction, [movement(1)])
+        writer.flush(timeout=5)
+
+    # A crash leaves the written transaction in the journal alongside one that
+    # committed before its movements were written, one whose unit of work
+    # never committed and a torn line.
+    journal.write_text(
+        _encode(transaction, [movement(1)]) + _encode("committed", [movement(2), movement(3)])
+        + _encode("uncommitted", [movement(4)]) + '{"trans'
+    )
+    with engine.begin() as connection:
+        connection.execute(insert(JournalTransactionORM).values(id="committed", journal=str(journal.resolve())))
+
+    writer = MovementWriter(engine, journal)
+    assert writer.start() == 2
+    writer.close()
+
+    with engine.connect() as connection:
+        quantities = connection.scalars(select(StockMovementORM.quantity).order_by(StockMovementORM.id)).all()
+        assert connection.scalar(select(func.count()).select_from(JournalTransactionORM)) == 0
+    assert quantities == [1, 2, 3]
+    assert MovementWriter(engine, journal).replay() == 0
+
+def test_commit_fails_without_losing_movements_when_the_writer_stopped(engine, tmp_path):
+    session_factory = sessionmaker(bind=engine)
+    with MovementWriter(engine, tmp_path / "movements.journal") as writer:
+        with SqlAlchemyUnitOfWork(session_factory(), movement_writer=writer) as uow:
+            service = make_service(uow)
+            product = service.create_product(name="Laptop", quantity=10, price=1000.0)
+            moscow = service.create_warehouse(name="Moscow", location="Moscow", capacity=1000)
+            uow.commit()
+
+        writer._error = RuntimeError("database is gone")
+        with pytest.raises(RuntimeError):
+            with SqlAlchemyUnitOfWork(session_factory(), movement_writer=writer) as uow:
+                make_service(uow).add_stock_to_warehouse(product, moscow, 10)
+                uow.commit()
+        assert writer.pending == 0
+
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(StockItemORM)) == 0
+    assert count_movements(engine) == 0
+
+def test_snapshot_waits_for_write_behind_movements(engine, tmp_path):
+    with MovementWriter(engine, tmp_path / "movements.journal", flush_interval=0.5) as writer, Session(engine) as session:
+        transaction = writer.prepare(session, [movement(1)])
+        session.commit()
+        with pytest.raises(ValueError):
+            take_snapshot(session)
+
+        writer.submit(transaction, [movement(1)])
+        assert take_snapshot(session, movement_writer=writer) == 0
+        assert count_movements(engine) == 1
+
+def test_writers_only_replay_their_own_journal(engine, tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first = MovementWriter(engine, tmp_path / "a" / "movements.journal")
+    first.start()
+    with Session(engine) as session:
+        first.prepare(session, [movement(1)])
+        session.commit()
+    first._error = RuntimeError("crashed before the write")
+    first.close()
+
+    with MovementWriter(engine, tmp_path / "b" / "movements.journal") as second:
+        assert second.pending == 0
+    assert count_movements(engine) == 0
+
+    assert MovementWriter(engine, tmp_path / "a" / "movements.journal").replay() == 1
+    assert count_movements(engine) == 1
+
+def test_journal_drops_written_records_while_others_are_outstanding(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(movement_writer, "COMPACT_BYTES", 1)
+    journal = tmp_path / "movements.journal"
+    with MovementWriter(engine, journal, flush_interval=0.01) as writer, Session(engine) as session:
+        written = writer.prepare(session, [movement(1)])
+        outstanding = writer.prepare(session, [movement(2)])
+        session.commit()
+        writer.submit(written, [movement(1)])
+        writer.flush(timeout=5)
+        assert journal.read_text() == _encode(outstanding, [movement(2)])
+
+        writer.submit(outstanding, [movement(2)])
+        writer.flush(timeout=5)
+        assert journal.read_text() == ""
+    assert count_movements(engine) == 2
+
+def test_failed_prepare_does_not_keep_the_journal_growing(engine, tmp_path, monkeypatch):
+    journal = tmp_path / "movements.journal"
+    with MovementWriter(engine, journal, flush_interval=0.01) as writer, Session(engine) as session:
+        monkeypatch.setattr(session, "execute", lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            writer.prepare(session, [movement(1)])
+        monkeypatch.undo()
+        assert writer.pending == 0
+
+        transaction = writer.prepare(session, [movement(2)])
+        session.commit()
+        writer.submit(transaction, [movement(2)])
+        writer.flush(timeout=5)
+        assert journal.read_text() == ""
@@ -1,9 +1,11 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 from domain.models import MovementType
 from infrastructure.orm import Base, ProductORM, WarehouseORM, StockItemORM, StockMovementORM, OrderORM
+from infrastructure.migrations import upgrade_columns, upgrade_indexes
 
 @pytest.fixture
 def session():
@@ -110,3 +112,66 @@ def test_warehouse_stock_items_relationship(session):
     retrieved = session.query(WarehouseORM).first()
     assert len(retrieved.stock_items) == 1
     assert retrieved.stock_items[0].quantity == 5
+
+def test_stock_item_product_and_warehouse_are_unique(session):
+    product = ProductORM(name="Test Product", quantity=10, price=100.0)
+    warehouse = WarehouseORM(name="Main Warehouse", location="Moscow", capacity=1000)
+    session.add_all([product, warehouse])
+    session.commit()
+
+    session.add_all([
+        StockItemORM(product_id=product.id, warehouse_id=warehouse.id, quantity=5),
+        StockItemORM(product_id=product.id, warehouse_id=warehouse.id, quantity=3)
+    ])
+    with pytest.raises(IntegrityError):
+        session.commit()
+
+def _engine_without_indexes():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    for table in (StockItemORM.__table__, StockMovementORM.__table__):
+        for index in table.indexes:
+            index.drop(engine)
+    return engine
+
+def test_upgrade_indexes_creates_missing_indexes():
+    engine = _engine_without_indexes()
+
+    created = upgrade_indexes(engine)
+
+    inspector = inspect(engine)
+    stock_item_indexes = {i["name"]: i for i in inspector.get_indexes("stock_items")}
+    movement_indexes = {i["name"] for i in inspector.get_indexes("stock_movements")}
+    assert stock_item_indexes["uq_stock_items_product_warehouse"]["unique"]
+    assert "ix_stock_movements_timestamp" in movement_indexes
+    assert len(created) == 5
+    assert upgrade_indexes(engine) == []
+
+def test_upgrade_indexes_rejects_duplicate_stock_items():
+    engine = _engine_without_indexes()
+    with engine.begin() as connection:
+        connection.execute(StockItemORM.__table__.insert(), [
+            {"product_id": 1, "warehouse_id": 1, "quantity": 5},
+            {"product_id": 1, "warehouse_id": 1, "quantity": 3}
+        ])
+
+    with pytest.raises(ValueError, match="uq_stock_items_product_warehouse"):
+        upgrade_indexes(engine)
+
+def test_upgrade_columns_adds_version_columns():
+    engine = create_engine('sqlite:///:memory:')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE stock_items (id INTEGER PRIMARY KEY, product_id INTEGER, warehouse_id INTEGER, "
+            "quantity INTEGER, reserved_quantity INTEGER)"
+        )
+        connection.exec_driver_sql("INSERT INTO stock_items VALUES (1, 1, 1, 5, 0)")
+    Base.metadata.create_all(engine)
+
+    assert upgrade_columns(engine) == ["stock_items.version"]
+    assert upgrade_columns(engine) == []
+    with sessionmaker(bind=engine)() as session:
+        stock_item = session.get(StockItemORM, 1)
+        stock_item.quantity = 6
+        session.commit()
+        assert stock_item.version == 2
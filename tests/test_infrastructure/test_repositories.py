@@ -0,0 +1,252 @@
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from domain.exceptions import StockItemNotFound
+from domain.models import Product, Order, Warehouse, StockMovement, MovementType, ReceiptLine
+from infrastructure.orm import ProductORM, WarehouseORM, StockItemORM, StockMovementORM, OrderORM
+from infrastructure import repositories
+from infrastructure.repositories import (
+    SqlAlchemyProductRepository, SqlAlchemyOrderRepository, SqlAlchemyWarehouseRepository,
+    SqlAlchemyStockItemRepository, SqlAlchemyStockMovementRepository, LoadingStrategy
+)
+
+@pytest.fixture
+def session(engine):
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: executed.append(statement)
+    )
+    return executed
+
+@pytest.fixture
+def populated(session):
+    products = [ProductORM(name=f"Product {i}", quantity=10, price=10.0 * i) for i in range(20)]
+    warehouses = [WarehouseORM(name=f"Warehouse {i}", location="Moscow", capacity=1000) for i in range(5)]
+    session.add_all(products + warehouses)
+    session.flush()
+    for i, product in enumerate(products):
+        for warehouse in warehouses:
+            session.add(StockItemORM(
+                product_id=product.id,
+                warehouse_id=warehouse.id,
+                quantity=i + 1,
+                reserved_quantity=0
+            ))
+        session.add(StockMovementORM(
+            product_id=product.id,
+            source_warehouse_id=warehouses[0].id,
+            destination_warehouse_id=warehouses[i % 4 + 1].id,
+            quantity=i + 1,
+            movement_type=MovementType.TRANSFER,
+            timestamp=datetime.now()
+        ))
+        session.add(StockMovementORM(
+            product_id=product.id,
+            source_warehouse_id=None,
+            destination_warehouse_id=warehouses[0].id,
+            quantity=i + 1,
+            movement_type=MovementType.RECEIPT,
+            timestamp=datetime.now()
+        ))
+    session.commit()
+    product_ids = [p.id for p in products]
+    warehouse_ids = [w.id for w in warehouses]
+    session.expunge_all()
+    return product_ids, warehouse_ids
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_stock_item_list_issues_constant_number_of_queries(session, populated, statements, strategy):
+    repo = SqlAlchemyStockItemRepository(session, strategy)
+
+    stock_items = repo.list()
+
+    assert len(stock_items) == 100
+    assert len(statements) <= 3
+    assert all(si.product.name.startswith("Product") for si in stock_items)
+    assert all(si.warehouse.location == "Moscow" for si in stock_items)
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_stock_movement_lists_issue_constant_number_of_queries(session, populated, statements, strategy):
+    product_ids, warehouse_ids = populated
+    repo = SqlAlchemyStockMovementRepository(session, strategy)
+
+    movements = repo.list()
+    by_product = repo.list_by_product(product_ids[3])
+    by_warehouse = repo.list_by_warehouse(warehouse_ids[0])
+
+    assert len(movements) == 40
+    assert len(by_product) == 2
+    assert len(by_warehouse) == 40
+    assert len(statements) <= 3 * 4
+    receipts = [m for m in movements if m.movement_type == MovementType.RECEIPT]
+    assert all(m.source_warehouse is None for m in receipts)
+    assert all(m.destination_warehouse.id == warehouse_ids[0] for m in receipts)
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_rows_of_one_query_share_reference_objects(session, populated, strategy):
+    stock_items = SqlAlchemyStockItemRepository(session, strategy).list()
+    movements = list(SqlAlchemyStockMovementRepository(session, strategy).iter_all(chunk_size=7))
+
+    assert len({id(si.product) for si in stock_items}) == 20
+    assert len({id(si.warehouse) for si in stock_items}) == 5
+    assert len({id(m.destination_warehouse) for m in movements}) == 5
+    assert not hasattr(stock_items[0], "__dict__")
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_get_by_product_and_warehouse_maps_relationships(session, populated, strategy):
+    product_ids, warehouse_ids = populated
+    repo = SqlAlchemyStockItemRepository(session, strategy)
+
+    stock_item = repo.get_by_product_and_warehouse(product_ids[2], warehouse_ids[1])
+
+    assert stock_item.quantity == 3
+    assert stock_item.product.id == product_ids[2]
+    assert stock_item.warehouse.id == warehouse_ids[1]
+
+def test_get_by_product_and_warehouse_raises_when_missing(session, populated):
+    repo = SqlAlchemyStockItemRepository(session)
+
+    with pytest.raises(StockItemNotFound):
+        repo.get_by_product_and_warehouse(-1, -1)
+
+@pytest.mark.parametrize("upsert", [True, False])
+def test_receive_batch_increments_and_inserts_in_bulk(session, populated, statements, monkeypatch, upsert):
+    product_ids, warehouse_ids = populated
+    if not upsert:
+        monkeypatch.setattr(repositories, "UPSERT_INSERTS", {})
+    new_warehouse = WarehouseORM(name="New Warehouse", location="Kazan", capacity=1000)
+    session.add(new_warehouse)
+    session.flush()
+    statements.clear()
+    existing = [Product(id=pid, name="", quantity=0, price=0.0) for pid in product_ids]
+    warehouse = Warehouse(id=warehouse_ids[0], name="", location="", capacity=0)
+    kazan = Warehouse(id=new_warehouse.id, name="", location="", capacity=0)
+    lines = [ReceiptLine(product=p, warehouse=warehouse, quantity=100) for p in existing]
+    lines += [ReceiptLine(product=p, warehouse=kazan, quantity=7) for p in existing]
+    lines.append(ReceiptLine(product=existing[0], warehouse=kazan, quantity=3))
+
+    repo = SqlAlchemyStockItemRepository(session)
+    repo.receive_batch(lines)
+
+    assert len(statements) <= 3
+    assert repo.get_by_product_and_warehouse(product_ids[0], warehouse_ids[0]).quantity == 101
+    assert repo.get_by_product_and_warehouse(product_ids[0], new_warehouse.id).quantity == 10
+    assert repo.get_by_product_and_warehouse(product_ids[5], new_warehouse.id).quantity == 7
+    assert len(repo.list()) == 120
+
+def test_add_many_inserts_movements_without_source(session, populated):
+    product_ids, warehouse_ids = populated
+    repo = SqlAlchemyStockMovementRepository(session)
+    product = Product(id=product_ids[0], name="", quantity=0, price=0.0)
+    warehouse = Warehouse(id=warehouse_ids[1], name="", location="", capacity=0)
+
+    repo.add_many([
+        StockMovement(id=None, product=product, source_warehouse=None, destination_warehouse=warehouse,
+                      quantity=q, movement_type=MovementType.RECEIPT, timestamp=datetime.now())
+        for q in (1, 2, 3)
+    ])
+
+    receipts = [
+        m for m in repo.list_by_product(product_ids[0])
+        if m.movement_type == MovementType.RECEIPT and m.destination_warehouse.id == warehouse_ids[1]
+    ]
+    assert sorted(m.quantity for m in receipts) == [1, 2, 3]
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_iter_all_pages_through_stock_items_by_id(session, populated, statements, strategy):
+    repo = SqlAlchemyStockItemRepository(session, strategy)
+
+    iterator = repo.iter_all(chunk_size=30)
+    assert statements == []
+    stock_items = list(iterator)
+
+    assert [si.id for si in stock_items] == sorted(si.id for si in repo.list())
+    assert len(stock_items) == 100
+    pages = [s for s in statements if "stock_items" in s and "LIMIT" in s]
+    assert len(pages) == 4
+
+@pytest.mark.parametrize("strategy", list(LoadingStrategy))
+def test_movement_iterators_match_lists(session, populated, strategy):
+    product_ids, warehouse_ids = populated
+    repo = SqlAlchemyStockMovementRepository(session, strategy)
+
+    assert [m.id for m in repo.iter_all(chunk_size=7)] == sorted(m.id for m in repo.list())
+    assert (
+        [m.id for m in repo.iter_by_product(product_ids[4], chunk_size=1)]
+        == sorted(m.id for m in repo.list_by_product(product_ids[4]))
+    )
+    assert (
+        [m.id for m in repo.iter_by_warehouse(warehouse_ids[1], chunk_size=3)]
+        == sorted(m.id for m in repo.list_by_warehouse(warehouse_ids[1]))
+    )
+
+def test_reference_iterators_match_lists(session, populated):
+    products = SqlAlchemyProductRepository(session)
+    warehouses = SqlAlchemyWarehouseRepository(session)
+    orders = SqlAlchemyOrderRepository(session)
+    for i in range(5):
+        order = OrderORM()
+        order.products = session.query(ProductORM).limit(i + 1).all()
+        session.add(order)
+    session.commit()
+
+    assert [p.id for p in products.iter_all(chunk_size=6)] == [p.id for p in products.list()]
+    assert [w.id for w in warehouses.iter_all(chunk_size=2)] == [w.id for w in warehouses.list()]
+    assert [len(o.products) for o in orders.iter_all(chunk_size=2)] == [1, 2, 3, 4, 5]
+
+def test_add_many_orders_uses_constant_number_of_statements(session, populated, statements):
+    product_ids, _ = populated
+    products = [Product(id=pid, name="", quantity=0, price=0.0) for pid in product_ids]
+    orders = [Order(id=None, products=products[:i + 1]) for i in range(len(products))]
+    statements.clear()
+
+    SqlAlchemyOrderRepository(session).add_many(orders)
+
+    assert len(statements) <= 4
+    session.expunge_all()
+    stored = SqlAlchemyOrderRepository(session).get(orders[9].id)
+    assert [p.id for p in stored.products] == product_ids[:10]
+
+def test_orders_are_inserted_with_default_ids_on_postgresql():
+    statement = repositories._insert_default_orders(3).compile(dialect=postgresql.dialect())
+    assert str(statement) == "INSERT INTO orders (id) VALUES (DEFAULT), (DEFAULT), (DEFAULT) RETURNING orders.id"
+    assert not statement.params
+
+def test_add_order_rejects_unknown_products(session, populated):
+    product_ids, _ = populated
+    order = Order(id=None, products=[
+        Product(id=product_ids[0], name="", quantity=0, price=0.0),
+        Product(id=-1, name="", quantity=0, price=0.0)
+    ])
+
+    with pytest.raises(NoResultFound):
+        SqlAlchemyOrderRepository(session).add(order)
+
+def test_availability_is_aggregated_in_one_query(session, populated, statements):
+    product_ids, warehouse_ids = populated
+    session.get(WarehouseORM, warehouse_ids[0]).location = "SPb"
+    stock_item = session.scalars(select(StockItemORM).where(
+        StockItemORM.product_id == product_ids[1], StockItemORM.warehouse_id == warehouse_ids[1]
+    )).one()
+    stock_item.reserved_quantity = 2
+    session.flush()
+    repository = SqlAlchemyStockItemRepository(session)
+    statements.clear()
+
+    assert repository.available_by_product([product_ids[0], product_ids[1], 999]) == {
+        product_ids[0]: 5, product_ids[1]: 8, 999: 0
+    }
+    assert len(statements) == 1
+    assert repository.available_by_warehouse(warehouse_ids[:2]) == {warehouse_ids[0]: 210, warehouse_ids[1]: 208}
+    assert repository.available_by_location([product_ids[1]]) == {
+        (product_ids[1], "Moscow"): 6, (product_ids[1], "SPb"): 2
+    }
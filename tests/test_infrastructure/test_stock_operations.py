@@ -0,0 +1,189 @@
+import pytest
+import threading
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from domain.exceptions import ConcurrencyConflict
+from domain.models import OrderLine
+from infrastructure.occupancy import reconcile_occupancy, OccupancyDrift
+from infrastructure.orm import Base, StockItemORM, WarehouseOccupancyORM
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from tests.helpers import make_service
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'warehouse.db'}",
+        connect_args={"timeout": 30}
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+@pytest.fixture
+def stocked(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        service.create_product(name="Laptop", quantity=100, price=1000.0)
+        service.create_warehouse(name="Moscow Warehouse", location="Moscow", capacity=1000)
+        service.create_warehouse(name="St. Petersburg Warehouse", location="St. Petersburg", capacity=1000)
+        uow.commit()
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        product = uow.products.list()[0]
+        moscow, spb = uow.warehouses.list()
+        make_service(uow).add_stock_to_warehouse(product, moscow, 100)
+        uow.commit()
+    return product, moscow, spb
+
+def test_stock_operations_are_persisted(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        service.add_stock_to_warehouse(product, moscow, 20)
+        service.reserve_stock(product, moscow, 30)
+        service.release_reserved_stock(product, moscow, 10)
+        service.transfer_stock(product, moscow, spb, 40)
+        uow.commit()
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        source = uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+        destination = uow.stock_items.get_by_product_and_warehouse(product.id, spb.id)
+        assert (source.quantity, source.reserved_quantity) == (80, 20)
+        assert (destination.quantity, destination.reserved_quantity) == (40, 0)
+
+def test_failed_reservation_leaves_stock_untouched(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        with pytest.raises(ValueError):
+            service.reserve_stock(product, moscow, 101)
+        with pytest.raises(ValueError):
+            service.release_reserved_stock(product, moscow, 1)
+        with pytest.raises(ValueError):
+            service.reserve_stock(product, spb, 1)
+        stock_item = uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+        assert stock_item.reserved_quantity == 0
+
+def test_order_lines_are_stored_and_allocated(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        service.add_stock_to_warehouse(product, spb, 10)
+        order = service.create_order(lines=[OrderLine(product=product, quantity=105)])
+        allocations = service.allocate_order(order)
+        uow.commit()
+
+    assert sorted((a.warehouse.id, a.quantity) for a in allocations) == [(moscow.id, 100), (spb.id, 5)]
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stored = uow.orders.get(order.id)
+        assert [(line.product.id, line.quantity) for line in stored.lines] == [(product.id, 105)]
+        assert uow.stock_items.get_by_product_and_warehouse(product.id, spb.id).reserved_quantity == 5
+
+def test_occupancy_is_maintained_and_enforced(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        service.transfer_stock(product, moscow, spb, 40)
+        with pytest.raises(ValueError):
+            service.add_stock_to_warehouse(product, spb, 961)
+        uow.commit()
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.warehouses.get_occupancy(moscow.id) == 60
+        assert uow.warehouses.get_occupancy(spb.id) == 40
+        assert reconcile_occupancy(uow.session) == []
+
+def test_occupancy_never_goes_negative(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert not uow.warehouses.vacate(spb.id, 1)
+        assert uow.warehouses.vacate(moscow.id, 100)
+        assert uow.warehouses.get_occupancy(spb.id) == 0
+        assert uow.warehouses.get_occupancy(moscow.id) == 0
+
+def test_reconcile_occupancy_repairs_drift(session_factory, stocked):
+    product, moscow, spb = stocked
+    with session_factory() as session:
+        session.get(WarehouseOccupancyORM, moscow.id).occupied = 7
+        session.delete(session.get(WarehouseOccupancyORM, spb.id))
+        session.commit()
+
+        drifts = reconcile_occupancy(session)
+        session.commit()
+
+        assert drifts == [
+            OccupancyDrift(warehouse_id=moscow.id, recorded=7, actual=100),
+            OccupancyDrift(warehouse_id=spb.id, recorded=None, actual=0)
+        ]
+        assert reconcile_occupancy(session) == []
+
+def test_concurrent_reservations_never_oversell(session_factory, stocked):
+    product, moscow, _ = stocked
+    attempts_per_thread = 40
+    successes = []
+
+    def worker():
+        for _ in range(attempts_per_thread):
+            with SqlAlchemyUnitOfWork(session_factory()) as uow:
+                try:
+                    make_service(uow).reserve_stock(product, moscow, 1)
+                except ValueError:
+                    continue
+                uow.commit()
+                successes.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stock_item = uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+    assert len(successes) == 100
+    assert stock_item.reserved_quantity == 100
+
+def test_stale_stock_item_write_raises_concurrency_conflict(session_factory, stocked):
+    product, moscow, spb = stocked
+    first = SqlAlchemyUnitOfWork(session_factory())
+    second = SqlAlchemyUnitOfWork(session_factory())
+    with first, second:
+        mine = first.session.get(StockItemORM, 1)
+        theirs = second.session.get(StockItemORM, 1)
+        mine.reserved_quantity += 10
+        first.commit()
+        theirs.reserved_quantity += 20
+        with pytest.raises(ConcurrencyConflict):
+            second.commit()
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stock_item = uow.stock_items.get_by_product_and_warehouse(product.id, moscow.id)
+        assert stock_item.reserved_quantity == 10
+
+def test_stale_write_raises_concurrency_conflict_when_flushed(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stale = uow.session.get(StockItemORM, 1)
+        with SqlAlchemyUnitOfWork(session_factory()) as other:
+            other.session.get(StockItemORM, 1).reserved_quantity += 10
+            other.commit()
+        stale.reserved_quantity += 20
+        with pytest.raises(ConcurrencyConflict):
+            uow.flush()
+        uow.rollback()
+        stale = uow.session.get(StockItemORM, 1)
+        with SqlAlchemyUnitOfWork(session_factory()) as other:
+            other.session.get(StockItemORM, 1).reserved_quantity += 10
+            other.commit()
+        stale.reserved_quantity += 20
+        with pytest.raises(ConcurrencyConflict):
+            uow.batch().reserve(product, spb, 1).execute()
+
+def test_atomic_updates_bump_the_version(session_factory, stocked):
+    product, moscow, spb = stocked
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stale = uow.session.get(StockItemORM, 1)
+        with SqlAlchemyUnitOfWork(session_factory()) as other:
+            make_service(other).reserve_stock(product, moscow, 5)
+            other.commit()
+        stale.quantity += 1
+        with pytest.raises(ConcurrencyConflict):
+            uow.commit()